@@ -1,13 +1,25 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import numpy as np
-import math
+
+import cache
+import cube
+import moteur
+import profilage
+import referentiel
+import scenarios
+from referentiel import normes, norme_standard
 
 # --- 1. CONFIGURATION AVANCÉE ---
 st.set_page_config(page_title="SAD UPDIA - Vision 2040", layout="wide")
 
+# Entrepôt du référentiel (entrepot.py, dossier donnees/referentiel) et dernière calibration
+# (calibration.py, dossier donnees/calibration) : à chaque rerun, un simple contrôle des dates
+# de modification ; seules les partitions modifiées sont relues.
+try:
+    referentiel.synchroniser()
+except (OSError, ValueError, KeyError) as erreur:
+    st.sidebar.error(f"Référentiel ou calibration illisible, données précédentes conservées : {erreur}")
+
 # --- 2. STYLE OFFICIEL (VERT FORÊT & OR) ---
 st.markdown("""
     <style>
@@ -20,79 +32,171 @@ st.markdown("""
     """, unsafe_allow_html=True)
 
 # --- 3. BASE DE DONNÉES MULTI-FILIÈRES (PNIASAN) ---
-# Note : J'ai ajouté 'seuil_fao' pour que l'onglet 3 fonctionne aussi en mode "Tout"
-filières_db = {
-    'Riz': {'prod': 2250000, 'obj_2040': 5000000, 'ratio_besoin': 1.6, 'coef_roi': 850, 'seuil_fao': 100},
-    'Maïs': {'prod': 850000, 'obj_2040': 2000000, 'ratio_besoin': 1.4, 'coef_roi': 650, 'seuil_fao': 55},
-    'Fonio': {'prod': 550000, 'obj_2040': 1300000, 'ratio_besoin': 1.2, 'coef_roi': 450, 'seuil_fao': 40},
-    'Cassave': {'prod': 1200000, 'obj_2040': 3000000, 'ratio_besoin': 1.3, 'coef_roi': 550, 'seuil_fao': 80}
-}
+# Les données (filières_db, normes) sont dans referentiel.py et les formules dans moteur.py :
+# cette page n'est qu'un client d'affichage du moteur.
 
 # --- 4. BARRE LATÉRALE DE PILOTAGE ---
 st.sidebar.image("https://upload.wikimedia.org/wikipedia/commons/thumb/e/ed/Flag_of_Guinea.svg/1200px-Flag_of_Guinea.svg.png", width=150)
 st.sidebar.title("Pilotage Stratégique")
 
-# Variable Maîtresse : Ajout de l'option "Tout"
-options_culture = ["Tout"] + list(filières_db.keys())
-culture_select = st.sidebar.selectbox("Filière Agricole Prioritaire", options_culture, key="filiere_master")
+# Variable Maîtresse : option "Tout" + filières du référentiel
+culture_select = st.sidebar.selectbox("Filière Agricole Prioritaire", referentiel.options_culture, key="filiere_master")
+
+
 
-scénario = st.sidebar.selectbox("Scénario d'investissement", ["Stagnation", "PNIASAN (Modéré)", "Vision 2040 (Ambitieux)"])
-budget_total = st.sidebar.number_input("Budget Total (Milliards GNF)", min_value=1, value=2500)
+def appliquer_scenario():
+    """Scénario choisi : sa croissance remplace la valeur courante du curseur de l'onglet 3.
+
+    Les curseurs des onglets 4 et 5 (sans clé) prennent les valeurs du scénario comme
+    valeurs par défaut : changer de scénario les réinitialise.
+    """
+    nom = st.session_state["scenario"]
+    if nom is not None:
+        st.session_state["growth_v"] = scenarios.PARAMETRES[nom]['tx_croissance']
+
+
+scénario = st.sidebar.selectbox(
+    "Scénario d'investissement", moteur.SCENARIOS, index=None, key="scenario", on_change=appliquer_scenario,
+    placeholder="Personnalisé (curseurs des onglets)",
+    help="Applique un jeu de paramètres aux curseurs des onglets 3, 4 et 5 ; ils restent modifiables ensuite."
+)
+# Paramètres du scénario choisi ({} : valeurs par défaut de chaque curseur)
+parametres_scenario = scenarios.PARAMETRES[scénario] if scénario else {}
+budget_total = st.sidebar.number_input("Budget Total (Milliards GNF)", min_value=1, value=2500, key="budget_total")
+if scénario:
+    st.sidebar.caption(
+        f"{scénario} : croissance {parametres_scenario['tx_croissance']:.1f} %/an, semences "
+        f"{parametres_scenario['part_semences']:.0%} / engrais {parametres_scenario['part_engrais']:.0%} du budget, "
+        f"pertes {parametres_scenario['taux_perte']} %, transformation {parametres_scenario['transfo']}."
+    )
+rendu_paresseux = st.sidebar.toggle(
+    "⚡ Rendu paresseux", value=True, key="rendu_paresseux",
+    help="Seul l'onglet affiché est calculé ; désactiver pour calculer tous les onglets à chaque interaction."
+)
+# Chronométrage par section (profilage.py) : sans aucun effet tant que le panneau est désactivé
+profileur = st.session_state.setdefault("profileur", profilage.Profileur())
+# Hypothèses courantes des onglets 2, 4 et 5, reprises par la trajectoire couplée de l'onglet 3
+# (hors widgets : elles survivent au rendu paresseux, qui ne dessine que l'onglet affiché)
+hypotheses = st.session_state.setdefault("hypotheses", {})
+profileur.actif = st.sidebar.toggle(
+    "📈 Panneau performance", value=False, key="profilage",
+    help="Chronomètre chaque section des onglets (cumul sur la session) ; export JSON en bas de la barre latérale."
+)
+
+st.sidebar.caption(f"Référentiel : {referentiel.SOURCE} (version {referentiel.VERSION})"
+                   + (f" · calibration {referentiel.CALIBRATION}" if referentiel.CALIBRATION else ""))
 
 st.sidebar.markdown("---")
 st.sidebar.info("Auteur : Almamy BANGOURA Economiste statisticien, Expert en Data science et évaluation d'impact des politiques publiques")
 
 # --- EXTRACTION ET CALCULS DYNAMIQUES (Le nouveau bloc logique) ---
-if culture_select == "Tout":
-    # On additionne les volumes pour la vision nationale
-    base_prod = sum(f['prod'] for f in filières_db.values())
-    obj_2040 = sum(f['obj_2040'] for f in filières_db.values())
-    
-    # On fait la moyenne pour les indicateurs de rendement/besoin
-    d = {
-        'prod': base_prod,
-        'obj_2040': obj_2040,
-        'ratio_besoin': np.mean([f['ratio_besoin'] for f in filières_db.values()]),
-        'coef_roi': np.mean([f['coef_roi'] for f in filières_db.values()]),
-        'seuil_fao': np.mean([f['seuil_fao'] for f in filières_db.values()])
-    }
-    r_besoin = d['ratio_besoin']
-else:
-    # Extraction classique pour une seule filière
-    d = filières_db[culture_select]
-    base_prod = d['prod']
-    obj_2040 = d['obj_2040']
-    r_besoin = d['ratio_besoin']
+# "Tout" : volumes additionnés et moyenne des indicateurs de rendement/besoin
+d = referentiel.profil_filiere(culture_select)
+base_prod = d['prod']
+obj_2040 = d['obj_2040']
+r_besoin = d['ratio_besoin']
+rendement_moyen = base_prod / moteur.SURFACE_REFERENCE_HA
 
 # --- 5. HEADER DYNAMIQUE ---
-titre_header = "Toutes les filières" if culture_select == "Tout" else f"la filière {culture_select}"
-st.title(f"SAD UPDIA : Pilotage de {titre_header}")
-st.markdown(f"Analyse de souveraineté alimentaire basée sur les objectifs **Vision 2040**. Gouvernance de la politique agricole par les **données**.")
+with profileur.section("En-tête"):
+    titre_header = "Toutes les filières" if culture_select == "Tout" else f"la filière {culture_select}"
+    st.title(f"SAD UPDIA : Pilotage de {titre_header}")
+    st.markdown(f"Analyse de souveraineté alimentaire basée sur les objectifs **Vision 2040**. Gouvernance de la politique agricole par les **données**.")
 
 # --- 6. ONGLETS STRATÉGIQUES ---
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
+libelles_onglets = [
     "📊 Diagnostic : Statistiques nationales", 
     "🤖 IA & Rendements : Résilience", 
     "🎯 Simulateur Vision : Guinée 2040", 
     "💰 Finance : Efficacité Budgétaire", 
-    "🏭 Transformation & Valeur Ajoutée"
-])
+    "🏭 Transformation & Valeur Ajoutée",
+    "⚖️ Scénarios : Comparaison"
+]
+if rendu_paresseux:
+    # Les onglets suivent leur état : changer d'onglet relance le script et .open indique l'onglet affiché
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(libelles_onglets, key="onglet_actif", on_change="rerun")
+else:
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(libelles_onglets)
+
+
+def onglet_visible(onglet):
+    """En mode complet, .open vaut None : tous les onglets sont calculés."""
+    return onglet.open is not False
+
+
+# --- IMPORTS DIFFÉRÉS ---
+# pandas et Plotly (figures.py) sont les imports les plus lourds du démarrage à froid :
+# ils n'arrivent qu'une fois l'en-tête, la barre latérale et les onglets envoyés au
+# navigateur (python benchmarks/demarrage.py). Le rapport national (batch.py, rapport.py,
+# pyarrow.parquet) n'est importé que par sa section d'export.
+import pandas as pd
+
+import carte
+import climat
+import figures
+import logistique
+import ndvi
+import optimisation
+import sensibilite
+import taches
+
 
 # --- 1. DÉFINITION DES DONNÉES (À placer avant les onglets) ---
-# Ce dictionnaire assure la cohérence entre les barres, la synthèse et la carte
-potentiels_regionaux = {
-    'Riz': {'Boké': 0.12, 'Kindia': 0.15, 'Mamou': 0.08, 'Faranah': 0.15, 'Kankan': 0.25, 'Labé': 0.10, "N'Zérékoré": 0.14, 'Conakry': 0.01},
-    'Maïs': {'Boké': 0.10, 'Kindia': 0.12, 'Mamou': 0.15, 'Faranah': 0.20, 'Kankan': 0.18, 'Labé': 0.10, "N'Zérékoré": 0.14, 'Conakry': 0.01},
-    'Fonio': {'Boké': 0.05, 'Kindia': 0.08, 'Mamou': 0.20, 'Faranah': 0.15, 'Kankan': 0.12, 'Labé': 0.30, "N'Zérékoré": 0.09, 'Conakry': 0.01},
-    'Cassave': {'Boké': 0.15, 'Kindia': 0.18, 'Mamou': 0.05, 'Faranah': 0.10, 'Kankan': 0.08, 'Labé': 0.07, "N'Zérékoré": 0.35, 'Conakry': 0.02},
-    'Tout': {'Boké': 0.12, 'Kindia': 0.14, 'Mamou': 0.10, 'Faranah': 0.15, 'Kankan': 0.20, 'Labé': 0.12, "N'Zérékoré": 0.16, 'Conakry': 0.01}
-}
-
-# --- 2. CODE DU TAB 1 ---
-
-with tab1:
+# potentiels_regionaux, prefectures_base et les poids par culture sont dans referentiel.py :
+# ils assurent la cohérence entre les barres, la synthèse et la carte.
+
+# --- TÂCHES DE FOND (taches.py) ---
+# Les simulations longues tournent hors du script : la section affiche leur progression
+# et leurs résultats partiels, interrogés par un fragment qui se relance seul. Changer
+# une entrée abandonne la tâche en cours (annulée si aucune autre session ne l'attend) ;
+# des entrées déjà calculées, dans cette session ou une autre, s'affichent aussitôt.
+
+def suivre_tache(nom, fonction, *args, **kwargs):
+    """Tâche de l'emplacement `nom` de la session, clé complétée par la version du référentiel."""
+    emplacements = st.session_state.setdefault("taches", {})
+    return taches.suivre(emplacements, nom, fonction, *args, contexte=referentiel.VERSION, **kwargs)
+
+
+def abandonner_tache(nom, oublier=False):
+    taches.abandonner(st.session_state.setdefault("taches", {}), nom, oublier)
+
+
+def afficher_tache(nom, tache, afficher):
+    """Résultat d'une tâche terminée, sinon son suivi ; `afficher(resultat, partiel)` dessine un résultat."""
+    if tache.etat == taches.TERMINEE:
+        afficher(tache.resultat, False)
+    elif tache.etat == taches.ERREUR:
+        st.error(f"Échec du calcul : {tache.erreur}")
+    elif tache.etat == taches.ANNULEE:
+        st.warning(f"Calcul annulé à {tache.progression:.0%}.")
+        st.button("🔁 Relancer", key=f"relancer_{nom}", on_click=abandonner_tache, args=(nom, True))
+    else:
+        progression_tache(nom, tache, afficher)
+
+
+@st.fragment(run_every=0.5)
+def progression_tache(nom, tache, afficher):
+    """Progression, annulation et résultat partiel ; relance la page quand la tâche s'achève."""
+    if tache.terminee:
+        st.rerun()
+    c_p1, c_p2 = st.columns([5, 1])
+    c_p1.progress(tache.progression, text=f"{tache.message or 'Calcul en cours'} : {tache.progression:.0%} "
+                                          f"({tache.duree:.1f} s)")
+    c_p2.button("⏹ Annuler", key=f"annuler_{nom}", on_click=abandonner_tache, args=(nom,))
+    if tache.partiel is not None:
+        st.caption("Résultat partiel, affiné à chaque lot :")
+        afficher(tache.partiel, True)
+
+
+# --- 2. CODE DES ONGLETS ---
+# Chaque onglet est une fonction. Les sections qui portent leurs propres curseurs sont des
+# fragments (@st.fragment) : ces curseurs ne relancent que leur section, pas tout le script.
+
+@profileur.mesurer("Onglet 1 · Diagnostic")
+def diagnostic_territorial(culture_select, d, base_prod, rendement_moyen):
     st.subheader(f"📊 Analyse Territoriale de la Production : {culture_select}")
     
+    profileur.etape("A. Métriques")
     # --- SECTION A : MÉTRIQUES DE PERFORMANCE (Source: Modèle Agro-Économique) ---
     m1, m2, m3 = st.columns(3)
     m1.metric(f"Production {culture_select}", f"{base_prod:,} T", "+4.2%")
@@ -102,125 +206,77 @@ with tab1:
 
     st.write("---")
 
+    profileur.etape("B. Yield gap")
     # --- SECTION B : RENDEMENTS & YIELD GAP ---
     col_kpi1, col_kpi2, col_kpi3 = st.columns(3)
-    rendement_moyen = base_prod / 800000 
-    objectif_rendement = d['obj_2040'] / 800000
+    objectif_rendement = d['obj_2040'] / moteur.SURFACE_REFERENCE_HA
     gap_rendement = ((objectif_rendement - rendement_moyen) / rendement_moyen) * 100
     
     col_kpi1.metric("Rendement Actuel", f"{rendement_moyen:.2f} T/Ha")
     col_kpi2.metric("Yield Gap (Écart)", f"{gap_rendement:.1f}%", delta=f"{objectif_rendement:.2f} visé", delta_color="inverse")
     col_kpi3.metric("Souveraineté Actuelle", f"{(1/d['ratio_besoin'])*100:.1f}%")
 
+    profileur.etape("C. Tableau préfectures")
     # --- SECTION C : LOGIQUE DE SPÉCIALISATION RÉGIONALE (33 Préfectures) ---
-    prefectures_base = [
-        # Basse Guinée
-        {'Region': 'Boké', 'Pref': 'Boké', 'lat': 11.05, 'lon': -14.28},
-        {'Region': 'Boké', 'Pref': 'Boffa', 'lat': 10.17, 'lon': -14.03},
-        {'Region': 'Boké', 'Pref': 'Fria', 'lat': 10.45, 'lon': -13.58},
-        {'Region': 'Boké', 'Pref': 'Gaoual', 'lat': 11.75, 'lon': -13.20},
-        {'Region': 'Boké', 'Pref': 'Koundara', 'lat': 12.48, 'lon': -13.30},
-        {'Region': 'Kindia', 'Pref': 'Kindia', 'lat': 10.05, 'lon': -12.85},
-        {'Region': 'Kindia', 'Pref': 'Coyah', 'lat': 9.70, 'lon': -13.38},
-        {'Region': 'Kindia', 'Pref': 'Dubréka', 'lat': 9.78, 'lon': -13.52},
-        {'Region': 'Kindia', 'Pref': 'Forécariah', 'lat': 9.43, 'lon': -13.08},
-        {'Region': 'Kindia', 'Pref': 'Télimélé', 'lat': 10.90, 'lon': -13.03},
-        # Moyenne Guinée
-        {'Region': 'Mamou', 'Pref': 'Mamou', 'lat': 10.38, 'lon': -12.08},
-        {'Region': 'Mamou', 'Pref': 'Dalaba', 'lat': 10.68, 'lon': -12.25},
-        {'Region': 'Mamou', 'Pref': 'Pita', 'lat': 11.05, 'lon': -12.40},
-        {'Region': 'Labé', 'Pref': 'Labé', 'lat': 11.32, 'lon': -12.28},
-        {'Region': 'Labé', 'Pref': 'Koubia', 'lat': 11.58, 'lon': -11.89},
-        {'Region': 'Labé', 'Pref': 'Lélouma', 'lat': 11.42, 'lon': -12.51},
-        {'Region': 'Labé', 'Pref': 'Mali', 'lat': 12.08, 'lon': -12.29},
-        {'Region': 'Labé', 'Pref': 'Tougué', 'lat': 11.44, 'lon': -11.66},
-        # Haute Guinée
-        {'Region': 'Faranah', 'Pref': 'Faranah', 'lat': 10.03, 'lon': -10.74},
-        {'Region': 'Faranah', 'Pref': 'Dabola', 'lat': 10.74, 'lon': -11.11},
-        {'Region': 'Faranah', 'Pref': 'Dinguiraye', 'lat': 11.48, 'lon': -10.71},
-        {'Region': 'Faranah', 'Pref': 'Kissidougou', 'lat': 9.18, 'lon': -10.11},
-        {'Region': 'Kankan', 'Pref': 'Kankan', 'lat': 10.38, 'lon': -9.30},
-        {'Region': 'Kankan', 'Pref': 'Kérouané', 'lat': 9.26, 'lon': -9.01},
-        {'Region': 'Kankan', 'Pref': 'Kouroussa', 'lat': 10.65, 'lon': -9.88},
-        {'Region': 'Kankan', 'Pref': 'Siguiri', 'lat': 11.42, 'lon': -9.17},
-        {'Region': 'Kankan', 'Pref': 'Mandiana', 'lat': 10.63, 'lon': -8.68},
-        # Guinée Forestière
-        {'Region': 'N\'Zérékoré', 'Pref': 'N\'Zérékoré', 'lat': 7.75, 'lon': -8.82},
-        {'Region': 'N\'Zérékoré', 'Pref': 'Beyla', 'lat': 8.68, 'lon': -8.63},
-        {'Region': 'N\'Zérékoré', 'Pref': 'Guéckédou', 'lat': 8.57, 'lon': -10.13},
-        {'Region': 'N\'Zérékoré', 'Pref': 'Lola', 'lat': 7.80, 'lon': -8.53},
-        {'Region': 'N\'Zérékoré', 'Pref': 'Macenta', 'lat': 8.54, 'lon': -9.47},
-        {'Region': 'N\'Zérékoré', 'Pref': 'Yomou', 'lat': 7.56, 'lon': -9.26},
-        # Zone Spéciale
-        {'Region': 'Conakry', 'Pref': 'Conakry', 'lat': 9.53, 'lon': -13.67}
-    ]
-
-    # Attribution des coefficients de poids par culture
-    if culture_select == 'Fonio':
-        poids_map = {'Labé': 0.12, 'Mamou': 0.09, 'Faranah': 0.05, 'Boké': 0.03, 'Kindia': 0.02, 'Kankan': 0.015, 'N\'Zérékoré': 0.01, 'Conakry': 0.005}
-    elif culture_select == 'Riz':
-        poids_map = {'Kankan': 0.08, 'Boké': 0.05, 'Kindia': 0.04, 'N\'Zérékoré': 0.04, 'Faranah': 0.03, 'Labé': 0.01, 'Mamou': 0.01, 'Conakry': 0.005}
-    elif culture_select == 'Cassave':
-        poids_map = {'N\'Zérékoré': 0.09, 'Kindia': 0.07, 'Boké': 0.06, 'Faranah': 0.04, 'Kankan': 0.02, 'Labé': 0.015, 'Mamou': 0.01, 'Conakry': 0.005}
-    else:
-        poids_map = {'Faranah': 0.07, 'Kankan': 0.06, 'N\'Zérékoré': 0.05, 'Kindia': 0.04, 'Boké': 0.03, 'Labé': 0.02, 'Mamou': 0.02, 'Conakry': 0.005}
-
-    df_pref = pd.DataFrame(prefectures_base)
-    df_pref['poids'] = df_pref['Region'].map(poids_map).fillna(0.01)
-    df_pref['Production'] = df_pref['poids'] * base_prod
-    df_pref['Efficacité'] = (df_pref['poids'] / df_pref['poids'].max()) * 100
-    df_reg = df_pref.groupby('Region')['Production'].sum().reset_index().sort_values('Production', ascending=False)
+    # Tableaux et figures mémoïsés (figures.py) : reconstruits seulement si la filière change
+    df_pref, df_reg = figures.tableau_territorial(culture_select, base_prod)
 
+    profileur.etape("D. Carte")
     # --- SECTION D : CARTE DYNAMIQUE (Tête de page) ---
     st.write("---")
     st.subheader(f"📍 Carte de l'Efficacité Territoriale : {culture_select} (Niveau Préfectures)")
 
-    fig_map = px.scatter_mapbox(
-        df_pref, lat="lat", lon="lon", 
-        color="Efficacité", size="Production",
-        hover_name="Pref", 
-        hover_data={"Region": True, "Production": ":,.0f T", "lat": False, "lon": False, "Efficacité": ":.1f%"},
-        color_continuous_scale="RdYlGn", size_max=18, zoom=5.8,
-        mapbox_style="carto-positron"
-    )
-    fig_map.update_layout(
-        height=500, margin={"r":0,"t":0,"l":0,"b":0},
-        mapbox=dict(center=dict(lat=10.5, lon=-11.0))
-    )
+    # Hors ligne : choroplèthe sur géométrie locale (carte.py), aucune tuile distante
+    mode_carte = st.radio("Fond de carte", ["Hors ligne (préfectures)", "En ligne (tuiles)", "Grille (production par maille)"],
+                          horizontal=True, key="mode_carte")
+    geometrie_servie = bool(st.get_option("server.enableStaticServing"))
+    if mode_carte.startswith("Hors ligne"):
+        fig_map, octets_carte = figures.carte_prefectures(culture_select, base_prod, geometrie_servie)
+    elif mode_carte.startswith("Grille"):
+        # Aperçu agrégé de la grille projetée en mémoire (grille.py) : la couche n'est jamais chargée en entier
+        fig_map, octets_carte = figures.carte_grille(culture_select, base_prod)
+    else:
+        fig_map, octets_carte = figures.carte_territoriale(culture_select, base_prod)
     st.plotly_chart(fig_map, use_container_width=True)
+    note_geometrie = f" ; géométrie ({carte.octets_geometrie() / 1024:.1f} Ko) servie une seule fois par static/" if mode_carte.startswith("Hors ligne") and geometrie_servie else ""
+    st.caption(f"📦 Charge utile de la carte à chaque rerun : {octets_carte / 1024:.1f} Ko{note_geometrie}.")
 
     st.write("---")
 
+    profileur.etape("E. Graphiques")
     # --- SECTION E : ANALYSE GRAPHIQUE (Répartition & Objectif) ---
     c_left, c_right = st.columns(2)
 
     with c_left:
         st.write("**📊 Répartition par Région Administrative**")
-        fig_prod = px.bar(
-            df_reg, x='Region', y='Production', 
-            color='Production', color_continuous_scale='Greens',
-            text_auto='.2s'
-        )
-        fig_prod.update_layout(height=380, showlegend=False, coloraxis_showscale=False, margin=dict(t=20, b=20))
+        fig_prod = figures.barres_regions(culture_select, base_prod)
         st.plotly_chart(fig_prod, use_container_width=True)
 
     with c_right:
         st.write("**🎯 Analyse de l'Objectif 2040**")
-        df_gap = pd.DataFrame({
-            'Indicateur': ['Production Actuelle', 'Déficit à combler'],
-            'Valeur': [base_prod, max(0, d['obj_2040'] - base_prod)]
-        })
-        fig_gap = px.pie(
-            df_gap, values='Valeur', names='Indicateur', hole=0.5,
-            color='Indicateur',
-            color_discrete_map={'Production Actuelle': '#009460', 'Déficit à combler': '#ce1126'}
-        )
-        fig_gap.update_layout(
-            height=380, margin=dict(t=20, b=20, l=0, r=0),
-            legend=dict(orientation="h", yanchor="bottom", y=-0.15, xanchor="center", x=0.5)
-        )
+        fig_gap = figures.anneau_objectif(base_prod, d['obj_2040'])
         st.plotly_chart(fig_gap, use_container_width=True)
 
+    with st.expander("🔁 Excédents et déficits : préfecture excédentaire la plus proche"):
+        if st.toggle("Afficher l'appariement des préfectures", key="appariement_actif"):
+            df_transferts, bilan_app = figures.appariement_prefectures(culture_select, base_prod, d['ratio_besoin'])
+            st.caption(f"{bilan_app['excedentaires']} préfecture(s) excédentaire(s), {bilan_app['deficitaires']} "
+                       f"déficitaire(s) ; besoin national réparti à parts égales (pas de population par préfecture "
+                       f"dans le référentiel). Chaque déficitaire est servie par ses 5 excédentaires les plus proches, "
+                       f"paires les plus courtes d'abord : {bilan_app['couvert']:,.0f} T sur {bilan_app['deficit']:,.0f} T "
+                       f"de déficit couverts, à {bilan_app['distance_moyenne']:,.0f} km en moyenne ; le reste relève "
+                       f"des importations.")
+            st.dataframe(df_transferts.round(), use_container_width=True, hide_index=True, height=250, column_config={
+                'Distance (km)': st.column_config.NumberColumn(format="localized"),
+                'Volume (T)': st.column_config.NumberColumn(format="localized")})
+
+    # Communes : présentes seulement si l'entrepôt fournit des partitions communes/
+    if len(referentiel.COMMUNES['commune']):
+        with st.expander(f"🏘️ Détail par commune ({len(referentiel.COMMUNES['commune'])} communes)"):
+            df_com = figures.tableau_communes(culture_select, base_prod)
+            st.dataframe(df_com.style.format({'Production': "{:,.0f} T"}), use_container_width=True, height=350)
+
+    profileur.etape("F. Synthèse")
     # --- SECTION F : SYNTHÈSE ET EXPORT ---
     st.write("---")
     st.subheader("📝 Synthèse du Diagnostic Stratégique")
@@ -236,85 +292,95 @@ with tab1:
         * **Recommandation :** Cibler les zones affichées en jaune/rouge sur la carte pour une mise à niveau technique immédiate.
     """)
 
-    # --- SECTION : PLAN DE RATTRAPAGE TECHNIQUE & CHRONOGRAMME (Tab 1) ---
-st.write("---")
-st.subheader(f"🚀 Stratégie de Rattrapage 2026 - 2040 : {culture_select}")
-
-# 1. Paramètres temporels fixes
-annee_actuelle = 2026
-annee_cible = 2040
-nombre_annees = annee_cible - annee_actuelle
-
-deficit_t = max(0, d['obj_2040'] - base_prod)
-
-if deficit_t > 0:
-    # 2. Calcul du CAGR (Taux de Croissance Annuel Composé) requis pour 2040
-    # C'est ce taux qui garantit que l'autosuffisance arrive en 2040 et pas avant
-    taux_croissance = ((d['obj_2040'] / base_prod) ** (1 / nombre_annees)) - 1
-    taux_pourcentage = taux_croissance * 100
-
-    # 3. Affichage des indicateurs de performance temporelle
-    c_time1, c_time2 = st.columns(2)
-    c_time1.metric("Horizon Stratégique", f"{nombre_annees} ans", f"Cible {annee_cible}")
-    # On affiche ce taux comme l'exigence minimale pour respecter l'échéance 2040
-    c_time2.metric("Taux de Croissance Requis", f"{taux_pourcentage:.2f} %", "par an pour 2040", delta_color="normal")
-
-    st.write("") 
-
-    # 4. Besoins en ressources basés sur ce déficit
-    normes = {
-        'Riz': {'semences': 60, 'engrais': 200, 'label': 'Riziculture intensive'},
-        'Fonio': {'semences': 25, 'engrais': 50, 'label': 'Culture résiliente'},
-        'Maïs': {'semences': 20, 'engrais': 250, 'label': 'Exigence azotée'},
-        'Cassave': {'semences': 1000, 'engrais': 100, 'label': 'Boutures'}
-    }
-    tech = normes.get(culture_select, {'semences': 30, 'engrais': 150, 'label': 'Standard'})
-    
-    col_plan1, col_plan2, col_plan3 = st.columns(3)
-    ha_supp = deficit_t / rendement_moyen
-    semences_totales = (ha_supp * tech['semences']) / 1000
-    engrais_total = (ha_supp * tech['engrais']) / 1000
-
-    col_plan1.metric("Terres à mobiliser", f"{ha_supp:,.0f} Ha")
-    unit_s = "T de Boutures" if culture_select == "Cassave" else "T de Semences"
-    col_plan2.metric(f"Besoins {unit_s}", f"{semences_totales:,.1f} T")
-    col_plan3.metric("Besoins Engrais (NPK)", f"{engrais_total:,.1f} T")
-
-    # 5. Trajectoire de référence (Cible 2040)
-    annees_projection = list(range(annee_actuelle, annee_cible + 1))
-    prod_projection = [base_prod * ((1 + taux_croissance) ** (i - annee_actuelle)) for i in annees_projection]
-    
-    df_traj = pd.DataFrame({'Année': annees_projection, 'Production (T)': prod_projection})
-    fig_traj = px.line(df_traj, x='Année', y='Production (T)', 
-                      title=f"Trajectoire de Référence pour l'Indépendance en {annee_cible}")
-    
-    # Ligne d'objectif
-    fig_traj.add_hline(y=d['obj_2040'], line_dash="dash", line_color="red", annotation_text="Objectif 2040")
-    
-    # Point d'arrivée (Validation visuelle de la cohérence)
-    fig_traj.add_scatter(x=[annee_cible], y=[d['obj_2040']], mode='markers+text', 
-                         text=["Cible"], textposition="top center", name="Objectif")
+    profileur.etape("G. Rattrapage")
+    # --- SECTION G : PLAN DE RATTRAPAGE TECHNIQUE & CHRONOGRAMME (Tab 1) ---
+    st.write("---")
+    st.subheader(f"🚀 Stratégie de Rattrapage 2026 - 2040 : {culture_select}")
+
+    # 1. Paramètres temporels fixes
+    annee_actuelle = moteur.ANNEE_ACTUELLE
+    annee_cible = moteur.ANNEE_CIBLE
+    nombre_annees = annee_cible - annee_actuelle
+
+    deficit_t = max(0, d['obj_2040'] - base_prod)
+
+    if deficit_t > 0:
+        # 2. Calcul du CAGR (Taux de Croissance Annuel Composé) requis pour 2040
+        # C'est ce taux qui garantit que l'autosuffisance arrive en 2040 et pas avant
+        taux_croissance = float(moteur.taux_croissance_requis(d['obj_2040'], base_prod, nombre_annees))
+        taux_pourcentage = taux_croissance * 100
+
+        # 3. Affichage des indicateurs de performance temporelle
+        c_time1, c_time2 = st.columns(2)
+        c_time1.metric("Horizon Stratégique", f"{nombre_annees} ans", f"Cible {annee_cible}")
+        # On affiche ce taux comme l'exigence minimale pour respecter l'échéance 2040
+        c_time2.metric("Taux de Croissance Requis", f"{taux_pourcentage:.2f} %", "par an pour 2040", delta_color="normal")
+
+        st.write("") 
+
+        # 4. Besoins en ressources basés sur ce déficit
+        tech = normes.get(culture_select, norme_standard)
     
-    st.plotly_chart(fig_traj, use_container_width=True)
+        col_plan1, col_plan2, col_plan3 = st.columns(3)
+        ha_supp, semences_totales, engrais_total = moteur.besoins_ressources(
+            deficit_t, rendement_moyen, tech['semences'], tech['engrais']
+        )
 
-    st.info(f"""
-        **Verdict Cohérent :** Pour combler le déficit d'ici **{annee_cible}** (dans **{nombre_annees} ans**), un taux de **{taux_pourcentage:.2f}%** est strictement nécessaire. 
-        Toute simulation dans l'onglet 'Vision 2040' avec un taux supérieur (ex: 7%) avancera logiquement la date d'autosuffisance.
-    """)
-else:
-    st.success(f"✅ L'objectif 2040 pour le {culture_select} est déjà couvert par la production actuelle.")
-    # Exportation CSV
-    export_df = df_pref[['Region', 'Pref', 'Production', 'Efficacité']].copy()
-    csv = export_df.to_csv(index=False).encode('utf-8')
-    st.download_button(
-        label="📥 Télécharger le rapport détaillé (.csv)",
-        data=csv,
-        file_name=f"Analyse_Territoriale_{culture_select}.csv",
-        mime='text/csv'
-    )
+        col_plan1.metric("Terres à mobiliser", f"{ha_supp:,.0f} Ha")
+        unit_s = "T de Boutures" if culture_select == "Cassave" else "T de Semences"
+        col_plan2.metric(f"Besoins {unit_s}", f"{semences_totales:,.1f} T")
+        col_plan3.metric("Besoins Engrais (NPK)", f"{engrais_total:,.1f} T")
+
+        # 5. Trajectoire de référence (Cible 2040) avec ligne d'objectif et point d'arrivée
+        fig_traj = figures.trajectoire_reference(base_prod, d['obj_2040'], taux_croissance, annee_actuelle, annee_cible)
     
+        st.plotly_chart(fig_traj, use_container_width=True)
+
+        st.info(f"""
+            **Verdict Cohérent :** Pour combler le déficit d'ici **{annee_cible}** (dans **{nombre_annees} ans**), un taux de **{taux_pourcentage:.2f}%** est strictement nécessaire. 
+            Toute simulation dans l'onglet 'Vision 2040' avec un taux supérieur (ex: 7%) avancera logiquement la date d'autosuffisance.
+        """)
+    else:
+        st.success(f"✅ L'objectif 2040 pour le {culture_select} est déjà couvert par la production actuelle.")
+
+    profileur.etape("H. Exports")
+    # --- SECTION H : EXPORTS (hors du test de déficit : toujours disponibles) ---
+    st.write("---")
+    c_exp1, c_exp2 = st.columns(2)
+    with c_exp1:
+        # Exportation CSV
+        export_df = df_pref[['Region', 'Pref', 'Production', 'Efficacité']].copy()
+        csv = export_df.to_csv(index=False).encode('utf-8')
+        st.download_button(
+            label="📥 Télécharger le rapport détaillé (.csv)",
+            data=csv,
+            file_name=f"Analyse_Territoriale_{culture_select}.csv",
+            mime='text/csv'
+        )
+    with c_exp2:
+        # Rapport national (rapport.py) : grille et fichier construits au clic seulement, par blocs
+        import batch
+        import rapport
+
+        formats = ["Parquet", "CSV"] if batch.pq is not None else ["CSV"]
+        format_rapport = st.radio("Format du rapport complet", formats, horizontal=True, key="format_rapport")
+        n_scenarios = rapport.nombre_scenarios()
+        n_lignes = n_scenarios * rapport.lignes_par_scenario()
+        extension = format_rapport.lower()
+        st.download_button(
+            label=f"📦 Rapport complet filière × préfecture × année (.{extension})",
+            data=lambda: rapport.fichier_rapport(rapport.grille_nationale(budget=budget_total), extension),
+            file_name=f"Rapport_National_2026_{moteur.ANNEE_CIBLE}.{extension}",
+            mime="application/vnd.apache.parquet" if extension == "parquet" else "text/csv",
+            on_click="ignore"
+        )
+        st.caption(f"{n_scenarios} scénarios (sol × intensification × irrigation × pluie × croissance), "
+                   f"{n_lignes:,} lignes : trajectoires, rendement climatique, gains d'investissement et pertes.")
+
 
-with tab2:
+@st.fragment
+@profileur.mesurer("Onglet 2 · Simulateur")
+def simulateur_agro_climatique(culture_select, base_prod, rendement_moyen):
     st.subheader(f"📊 Simulateur Agro-Climatique Avancé : {culture_select}")
     
     col_a, col_b = st.columns([1, 2])
@@ -323,47 +389,32 @@ with tab2:
         st.write("**🌍 Caractéristiques du Terroir**")
         type_sol = st.selectbox(
             "Type de Sol", 
-            ["Alluvial (Fertile)", "Latéritique (Ferralitique)", "Sableux/Limoneux"], 
+            moteur.TYPES_SOL, 
             help="Le type de sol influence la rétention d'eau et la réponse aux intrants."
         )
         
         st.write("**⚙️ Configuration Technique**")
         intrants = st.select_slider(
             "Niveau d'intensification", 
-            options=["Traditionnel", "Semi-Mécanisé", "Intensif"], 
+            options=moteur.NIVEAUX_INTRANTS, 
             key="ia_tech"
         )
         irrigation = st.checkbox("Irrigation Maîtrisée", help="Essentiel pour sécuriser le rendement face aux aléas.")
         
         st.write("---")
         st.write("**☁️ Facteur Pluviométrique**")
-        meteo_actuelle = st.slider("Variation de la pluie (%)", -50, 50, 0)
+        meteo_actuelle = st.slider("Variation de la pluie (%)", -50, 50, 0, key="meteo_actuelle")
         
-        # --- LOGIQUE DE CALCUL (PARAMÈTRES INRAE) ---
-        # 1. Facteur Sol
-        f_sol = {"Alluvial (Fertile)": 1.2, "Latéritique (Ferralitique)": 0.8, "Sableux/Limoneux": 0.9}[type_sol]
-        
-        # 2. Boost technique de base
-        boost_base = {"Traditionnel": 1.0, "Semi-Mécanisé": 1.4, "Intensif": 1.9}[intrants] * f_sol
-        
-        def calculer_rendement_complet(v_pluie, irrig, b_base, s_type):
-            if irrig: 
-                b_base += 0.3 # Bonus fixe irrigation
-            
-            impact = v_pluie / 100
-            # Sensibilité selon le sol (Sableux = très sensible au manque d'eau)
-            sens_sol = {"Alluvial (Fertile)": 1.0, "Latéritique (Ferralitique)": 1.3, "Sableux/Limoneux": 1.6}[s_type]
-            
-            if v_pluie < 0:
-                if irrig:
-                    impact = impact / 3 # Protection par l'eau maîtrisée
-                else:
-                    impact = impact * sens_sol # Impact aggravé par la nature du sol
-            return max(0.1, b_base + impact)
-
-        # Calcul des résultats basés sur la sélection dynamique
-        rendement_final = calculer_rendement_complet(meteo_actuelle, irrigation, boost_base, type_sol)
+        profileur.etape("Calcul rendement")
+        # --- LOGIQUE DE CALCUL (PARAMÈTRES INRAE, voir moteur.py) ---
+        # 1. Facteur Sol et 2. Boost technique de base
+        i_sol = moteur.codes(type_sol, moteur.TYPES_SOL)
+        i_intrants = moteur.codes(intrants, moteur.NIVEAUX_INTRANTS)
+
+        # Calcul des résultats basés sur la sélection dynamique (lecture dans le cube précalculé, cube.py)
+        rendement_final = cube.rendement(i_sol, i_intrants, irrigation, meteo_actuelle)
         prod_simulee = base_prod * rendement_final
+        hypotheses.update(sol=type_sol, intrants=intrants, irrigation=irrigation, pluie=meteo_actuelle)
 
         st.metric(
             f"Production {culture_select} Projetée", 
@@ -379,75 +430,173 @@ with tab2:
             st.warning("🌊 **RISQUE D'INONDATION** : Un excès de pluie peut saturer les sols et détruire les récoltes.")
 
     with col_b:
+        profileur.etape("Comparaison & sensibilité")
         # 1. GRAPHIQUE DE COMPARAISON
-        fig_comp = px.bar(
-            x=['Production Actuelle', f'Projection IA ({culture_select})'], 
-            y=[base_prod, prod_simulee], 
-            color=['Actuel', 'IA'],
-            color_discrete_map={'Actuel': '#fcd116', 'IA': '#009460' if prod_simulee >= base_prod else '#ce1126'},
-            title=f"Comparaison : Actuel vs Simulation {culture_select}"
-        )
+        fig_comp = figures.comparaison_simulation(culture_select, base_prod, prod_simulee)
         st.plotly_chart(fig_comp, use_container_width=True)
 
         # 2. COURBE DE SENSIBILITÉ (RÉSILIENCE)
-        pluie_range = np.linspace(-50, 50, 21)
-        rendements_courbe = [base_prod * calculer_rendement_complet(p, irrigation, boost_base, type_sol) for p in pluie_range]
-        
-        df_sens = pd.DataFrame({'Pluie (%)': pluie_range, 'Production (T)': rendements_courbe})
-        fig_sens = px.line(
-            df_sens, x='Pluie (%)', y='Production (T)', 
-            title=f"Courbe de Résilience : Impact de la Pluie sur Sol {type_sol}",
-            markers=True
-        )
-        fig_sens.add_vline(x=meteo_actuelle, line_dash="dot", line_color="red", annotation_text="Position Curseur")
-        fig_sens.add_hline(y=base_prod, line_dash="dash", line_color="orange", annotation_text="Seuil Actuel")
+        fig_sens = figures.courbe_resilience(base_prod, type_sol, intrants, irrigation, meteo_actuelle)
         
         st.plotly_chart(fig_sens, use_container_width=True)
 
     st.success(f"**Synthèse IA :** L'interaction entre le sol **{type_sol}** et une variation pluviométrique de **{meteo_actuelle}%** donne un rendement équivalent de **{(rendement_moyen * rendement_final):.2f} T/Ha**.")
 
-    st.write("---")
+    profileur.etape("Monte Carlo")
+    # --- MODE STOCHASTIQUE : RISQUE CLIMATIQUE (Monte Carlo, climat.py) ---
+    with st.expander(f"🎲 Mode stochastique : risque climatique {moteur.ANNEE_ACTUELLE}-{moteur.ANNEE_CIBLE}"):
+        mode_stochastique = st.toggle("Activer la simulation Monte Carlo", key="mc_actif")
+        c_mc1, c_mc2, c_mc3, c_mc4 = st.columns(4)
+        loi = c_mc1.selectbox("Loi des anomalies de pluie", climat.LOIS, key="mc_loi")
+        ecart_type = c_mc2.slider("Écart-type de la pluie (%)", 5, 50, 20, key="mc_ecart")
+        correlation = c_mc3.slider("Corrélation inter-régionale", 0.0, 1.0, 0.5, key="mc_corr")
+        tendance = c_mc4.slider("Tendance (points de %/an)", -3.0, 3.0, 0.0, 0.5, key="mc_tendance")
+        n_tirages = st.select_slider(
+            "Nombre de tirages (régions × années 2026-2040 par tirage)",
+            options=[10_000, 50_000, 100_000, 200_000], value=100_000, key="mc_tirages"
+        )
+        hypotheses.update(loi_climat=(loi, ecart_type, correlation, tendance))
+
+        if mode_stochastique:
+            def afficher_risque(resume, partiel):
+                df_risque, fig_risque = figures.risque_climatique(culture_select, resume)
+                st.write(f"**Risque à l'horizon {moteur.ANNEE_CIBLE} par filière** (sol {type_sol}, {intrants})")
+                st.dataframe(
+                    df_risque.style.format({
+                        'P5 (T)': '{:,.0f}', 'P50 (T)': '{:,.0f}', 'P95 (T)': '{:,.0f}',
+                        'P(< Actuel)': '{:.1%}', 'Déficit attendu (T)': '{:,.0f}', 'ES 5% (T)': '{:,.0f}'
+                    }),
+                    hide_index=True, use_container_width=True
+                )
+                st.plotly_chart(fig_risque, use_container_width=True, key="mc_figure_partielle" if partiel else None)
+
+            tache = suivre_tache("monte_carlo", figures.calcul_risque, type_sol, intrants, irrigation,
+                                 loi, ecart_type, correlation, tendance, n_tirages)
+            afficher_tache("monte_carlo", tache, afficher_risque)
+        else:
+            abandonner_tache("monte_carlo", oublier=True)
+
+
+@st.fragment
+@profileur.mesurer("Onglet 2 · NDVI")
+def anticipation_crises(culture_select):
     st.subheader("📡 Anticipation des Crises (Imagerie Satellite & NDVI)")
 
+    seuil_alerte = 0.45
+    # Rasters NDVI locaux (ndvi.py) : alertes par préfecture ; sinon, simulation nationale
+    try:
+        source = ndvi.ouvrir()
+    except ImportError as erreur:  # Série GeoTIFF sans rasterio : simulation, avec la raison
+        source, absence = None, f"Rasters NDVI illisibles ({erreur}) : valeurs simulées."
+    else:
+        absence = ("Aucun raster NDVI local (dossier `donnees/ndvi`) : valeurs simulées. "
+                   "`python ndvi.py --demo donnees/ndvi/demo.npy` crée une pile d'essai.")
+    if source is not None:
+        ndvi_par_prefecture(culture_select, source, seuil_alerte)
+        return
+
     col_s1, col_s2 = st.columns([1, 2])
 
     with col_s1:
         st.write("**Analyse Sentinel-2 (Simulation)**")
         ndvi_obs = st.slider(
-            "Indice de Végétation observé (NDVI)", 0.1, 0.9, 0.5, 
+            "Indice de Végétation observé (NDVI)", 0.1, 0.9, 0.5, key="ndvi_obs",
             help="Un NDVI < 0.4 indique un stress hydrique ou une anomalie de croissance."
         )
         
-        seuil_alerte = 0.45
         if ndvi_obs < seuil_alerte:
             st.error(f"🚨 **ALERTE PRÉCOCE** : NDVI bas ({ndvi_obs}). Risque de crise détecté pour le {culture_select}.")
         else:
             st.success(f"✅ **Vigueur Optimale** : Le couvert végétal ({ndvi_obs}) est sain.")
 
     with col_s2:
-        mois = ["Jan", "Fév", "Mar", "Avr", "Mai", "Juin"]
-        tendance_ndvi = [0.3, 0.35, 0.42, 0.48, 0.52, ndvi_obs]
-        
-        fig_satellite = px.area(
-            x=mois, y=tendance_ndvi, 
-            title=f"Suivi Satellite NDVI (Tendance 6 mois) - {culture_select}",
-            labels={'x': 'Mois', 'y': 'Indice NDVI'},
-            color_discrete_sequence=['#1e4d2b']
-        )
-        fig_satellite.add_hrect(y0=0.1, y1=0.4, line_width=0, fillcolor="red", opacity=0.2, annotation_text="ZONE DE CRISE")
+        tendance_ndvi = (0.3, 0.35, 0.42, 0.48, 0.52, ndvi_obs)
+        fig_satellite = figures.suivi_ndvi(culture_select, tendance_ndvi)
         st.plotly_chart(fig_satellite, use_container_width=True)
 
     st.info(f"**Note Scientifique :** En cas de NDVI < {seuil_alerte}, le modèle UPDIA recommande l'activation des stocks de sécurité pour la filière **{culture_select}**.")
+    st.caption(absence)
+
+
+@st.fragment
+@profileur.mesurer("Onglet 2 · Sensibilité")
+def analyse_sensibilite(culture_select, d, base_prod):
+    # --- SENSIBILITÉ GLOBALE DES COEFFICIENTS DU MODÈLE (sensibilite.py) ---
+    with st.expander("🧭 Sensibilité globale des coefficients du modèle (Sobol / Morris)"):
+        actif = st.toggle("Activer l'analyse de sensibilité", key="sensibilite_actif")
+        c_s1, c_s2, c_s3 = st.columns(3)
+        methode = c_s1.radio("Méthode", ["Sobol", "Morris"], horizontal=True, key="sensibilite_methode",
+                             help="Sobol : part de variance (S1, ST). Morris : criblage rapide (μ*, σ).")
+        sortie = c_s2.selectbox("Sortie étudiée", list(sensibilite.SORTIES), format_func=sensibilite.SORTIES.get,
+                                key="sensibilite_sortie")
+        amplitude = c_s3.slider("Variation des coefficients (± %)", 5, 50, 25, 5, key="sensibilite_amplitude") / 100
+        if methode == "Sobol":
+            taille = st.select_slider("Échantillons de base N (N × 18 évaluations)", options=[2 ** p for p in range(10, 17)],
+                                      value=2 ** 13, key="sensibilite_n")
+        else:
+            taille = st.select_slider("Trajectoires r (r × 17 évaluations)", options=[100, 500, 1000, 2000, 5000],
+                                      value=1000, key="sensibilite_r")
+
+        if actif:
+            def afficher_sensibilite(res, partiel):
+                df_sens, fig_sens, bilan = figures.analyse_sensibilite(methode, sortie, amplitude, res)
+                st.plotly_chart(fig_sens, use_container_width=True, key="sensibilite_figure_partielle" if partiel else None)
+                st.dataframe(df_sens.style.format(precision=3 if methode == "Sobol" else 0, thousands=" "),
+                             hide_index=True, use_container_width=True)
+                st.caption(f"{culture_select} : {bilan['evaluations']:,} évaluations du modèle en {bilan['duree_s']:.2f} s, "
+                           f"moyennées sur sols × intensification × irrigation × pluie (-30 % à +30 %).")
+
+            tache = suivre_tache("sensibilite", figures.calcul_sensibilite, methode, sortie, base_prod,
+                                 float(d.get('coef_roi', 500)), taille, amplitude)
+            afficher_tache("sensibilite", tache, afficher_sensibilite)
+        else:
+            abandonner_tache("sensibilite", oublier=True)
+
+
+def ndvi_par_prefecture(culture_select, source, seuil_alerte):
+    """Statistiques zonales du raster local et alertes par préfecture."""
+    col_s1, col_s2 = st.columns([1, 2])
+
+    with col_s1:
+        st.write(f"**Analyse Sentinel-2 ({source.origine.name})**")
+        date = st.select_slider("Date d'observation", source.dates, value=source.dates[-1], key="ndvi_date")
+        rayon = st.slider("Rayon de vigilance autour des alertes (km)", 0, 300, 100, step=25, key="ndvi_rayon")
+        df_ndvi, fig_satellite = figures.ndvi_prefectures(
+            culture_select, str(source.origine), source.signature(),
+            source.dates.index(date), seuil_alerte, rayon
+        )
+        en_alerte = df_ndvi[df_ndvi['Alerte']]
+        if len(en_alerte):
+            st.error(f"🚨 **ALERTE PRÉCOCE** : NDVI < {seuil_alerte} dans **{len(en_alerte)} préfecture(s)** : "
+                     f"{', '.join(en_alerte['Pref'])}. Risque de crise pour le {culture_select}.")
+        else:
+            st.success(f"✅ **Vigueur Optimale** : Aucune préfecture sous le seuil de {seuil_alerte}.")
+        en_vigilance = df_ndvi[df_ndvi['Vigilance']].sort_values('Alerte à (km)')
+        if len(en_vigilance):
+            st.warning(f"⚠️ **Vigilance** : {len(en_vigilance)} préfecture(s) à moins de {rayon} km d'une zone en "
+                       f"alerte : {', '.join(f'{p} ({d:.0f} km)' for p, d in zip(en_vigilance['Pref'], en_vigilance['Alerte à (km)']))}.")
 
-with tab3:
+    with col_s2:
+        st.plotly_chart(fig_satellite, use_container_width=True)
+
+    st.dataframe(
+        df_ndvi.style.format({'NDVI moyen': "{:.3f}", 'NDVI min': "{:.3f}", 'Anomalie': "{:+.3f}",
+                              'Alerte à (km)': "{:.0f}"}, na_rep="—"),
+        use_container_width=True, height=250
+    )
+    st.info(f"**Note Scientifique :** En cas de NDVI < {seuil_alerte}, le modèle UPDIA recommande l'activation des stocks de sécurité pour la filière **{culture_select}** dans les préfectures concernées.")
+
+
+@st.fragment
+@profileur.mesurer("Onglet 3 · Vision 2040")
+def vision_2040(culture_select, d, base_prod, budget_total):
     st.subheader(f"🎯 Trajectoire de Souveraineté 2026-2040 : {culture_select}")
     
+    profileur.etape("1. Paramètres")
     # --- 1. PARAMÈTRES DE SIMULATION (AJUSTÉS POUR LA COHÉRENCE) ---
     # Calcul dynamique du taux nécessaire pour 2040 pour guider l'utilisateur
-    annee_actuelle = 2026
-    annee_cible = 2040
-    nb_annees = annee_cible - annee_actuelle
-    taux_requis_2040 = ((d['obj_2040'] / base_prod) ** (1 / nb_annees)) - 1
+    nb_annees = moteur.ANNEE_CIBLE - moteur.ANNEE_ACTUELLE
+    taux_requis_2040 = float(moteur.taux_croissance_requis(d['obj_2040'], base_prod, nb_annees))
     
     # On affiche l'information pour que l'utilisateur comprenne le point de départ
     st.info(f"💡 Note : Le taux requis pour atteindre l'objectif en 2040 est de **{taux_requis_2040*100:.2f}%**.")
@@ -456,131 +605,177 @@ with tab3:
     tx_croissance = st.slider(
         "Taux de croissance annuel visé (%)", 
         1.0, 15.0, 
-        float(round(taux_requis_2040 * 100, 1)), 
+        float(parametres_scenario.get('tx_croissance', round(taux_requis_2040 * 100, 1))), 
+        step=0.1,
         key="growth_v"
     )
+    hypotheses.update(tx_croissance=tx_croissance)
     
-    population_growth = 1.025  # Croissance démographique +2.5% par an
-    years = list(range(2026, 2042)) 
+    horizon = st.select_slider("Horizon de projection", [2041, 2050, 2060, 2080, 2100], value=2041, key="horizon_v")
+    # Cohortes (demographie.py) : population par préfecture et par âge, fécondité en baisse, exode vers Conakry
+    cohortes = st.radio("Démographie", ["Croissance uniforme (+2.5 %/an)", "Cohortes par préfecture"],
+                        horizontal=True, key="demographie_v") != "Croissance uniforme (+2.5 %/an)"
+
+    population_growth = moteur.CROISSANCE_DEMOGRAPHIQUE  # Croissance démographique +2.5% par an
+    years = list(range(2026, horizon + 1)) 
     
+    profileur.etape("2. Chemins")
     # --- 2. CALCULS DES CHEMINS (PROD VS BESOIN) ---
-    # Production indexée sur le taux choisi
-    prod_path = [base_prod * ((1 + tx_croissance/100)**i) for i in range(len(years))]
-    
-    # Besoins indexés sur la démographie et le ratio de départ
-    # Note : On utilise le besoin réel (base * ratio) pour la courbe de départ
-    besoin_path = [base_prod * d['ratio_besoin'] * (population_growth ** i) for i in range(len(years))]
-    
-    # Analyse nutritionnelle
-    pop_guinee = 14000000 
-    dispo_hab = [(p * 0.7 * 1000) / (pop_guinee * (population_growth**i)) for i, p in enumerate(prod_path)]
+    # Production indexée sur le taux choisi ; besoins indexés sur la démographie et le
+    # besoin réel de départ (base * ratio) ; ration par habitant (analyse nutritionnelle)
+    if cohortes:
+        import demographie
+
+        population = demographie.population_nationale(years[0], years[-1])
+        population_growth = (population[-1] / population[0]) ** (1 / (len(years) - 1))  # moyenne, pour les messages
+        prod_path, besoin_path, dispo_hab = moteur.chemins_vision(
+            base_prod, d['ratio_besoin'], tx_croissance, len(years), population=population[0], demo=population / population[0])
+    else:
+        prod_path, besoin_path, dispo_hab = cube.chemins(culture_select, tx_croissance, len(years))
     
     seuil_fao = d.get('seuil_fao', 50)
 
+    profileur.etape("3. Équilibre offre/demande")
     # --- 3. GRAPHIQUE ÉQUILIBRE OFFRE/DEMANDE ---
-    df_vision = pd.DataFrame({
-        'Année': years, 
-        'Production': prod_path, 
-        'Besoins Population': besoin_path
-    })
-    
-    fig_vision = px.line(
-        df_vision, x='Année', y=['Production', 'Besoins Population'],
-        title=f"Équilibre Offre/Demande : {culture_select} (Projection 2040)",
-        color_discrete_map={'Production': '#009460', 'Besoins Population': '#ce1126'}
-    )
-    
-    # Identification de l'année d'intersection (Année d'autosuffisance)
-    annee_auto = next((years[i] for i, (p, b) in enumerate(zip(prod_path, besoin_path)) if p >= b), None)
+    # Année d'intersection (autosuffisance) en forme fermée : fractionnaire, infinie si jamais
+    if cohortes:
+        # Pas de forme fermée : croisement lu sur les chemins, dans l'horizon affiché
+        croisement, annee_civile = moteur.croisement_chemins(prod_path, besoin_path, years[0])
+    else:
+        croisement, annee_civile = moteur.annee_autosuffisance(d['ratio_besoin'], tx_croissance, years[0], population_growth)
+    annee_auto = int(annee_civile) if np.isfinite(annee_civile) else None
     
-    # Ajout de la ligne verticale d'autosuffisance si elle existe
-    if annee_auto:
-        fig_vision.add_vline(x=annee_auto, line_dash="dot", line_color="blue", 
-                             annotation_text=f"Autosuffisance {annee_auto}")
-
-    fig_vision.update_layout(yaxis_title="Volume (Tonnes)", hovermode="x unified")
+    fig_vision = figures.equilibre_offre_demande(culture_select, base_prod, d['ratio_besoin'], tx_croissance, years[0], years[-1],
+                                                 cohortes)
     st.plotly_chart(fig_vision, use_container_width=True)
 
+    profileur.etape("4. Ration par habitant")
     # --- 4. ANALYSE DE LA SÉCURITÉ ALIMENTAIRE PAR HABITANT ---
     st.write("---")
     st.write(f"**🥗 Indicateur Social : Disponibilité de {culture_select} par habitant**")
     
-    fig_nutri = px.area(
-        x=years, y=dispo_hab, 
-        title="Évolution de la ration projetée (kg/hab/an)",
-        labels={'x': 'Année', 'y': 'kg/hab/an'},
-        color_discrete_sequence=['#fcd116']
-    )
-    fig_nutri.add_hline(y=seuil_fao, line_dash="dash", line_color="red", 
-                        annotation_text=f"Seuil FAO ({seuil_fao}kg)")
+    fig_nutri = figures.ration_par_habitant(base_prod, d['ratio_besoin'], tx_croissance, years[0], years[-1], seuil_fao,
+                                            cohortes)
     st.plotly_chart(fig_nutri, use_container_width=True)
 
+    with st.expander("🏘️ Disponibilité par préfecture (projection par cohortes)"):
+        df_dispo, fig_dispo, bilan_dispo = figures.disponibilite_prefectures(
+            culture_select, base_prod, tx_croissance, years[0], years[-1], seuil_fao)
+        st.caption(f"Population projetée par préfecture et par âge (fécondité régionale en baisse, exode des 15-29 ans "
+                   f"vers Conakry) ; chaque préfecture consomme sa production maillée, sans échanges. En {years[-1]} : "
+                   f"{bilan_dispo['sous_seuil']} préfecture(s) sous le seuil FAO, soit "
+                   f"{bilan_dispo['population_sous_seuil'] / 1e6:,.1f} M d'habitants sur "
+                   f"{bilan_dispo['population'] / 1e6:,.1f} M (au plus {bilan_dispo['pic']} préfecture(s), "
+                   f"en {bilan_dispo['annee_pic']}).")
+        st.plotly_chart(fig_dispo, use_container_width=True)
+        st.dataframe(df_dispo.style.format({'Population': '{:,.0f}', 'Production': '{:,.0f} T', 'kg/hab/an': '{:.1f}'}),
+                     use_container_width=True, height=300, hide_index=True)
+
+    profileur.etape("5. Diagnostic")
     # --- 5. LOGIQUE DE COHÉRENCE ET DIAGNOSTIC FINAL ---
     st.write("---")
     if annee_auto:
         status_msg = "SOUVERAINETÉ ATTEINTE"
         if annee_auto <= 2040:
-            st.success(f"✅ **{status_msg}** : L'autosuffisance est prévue en **{annee_auto}**. Scénario conforme aux objectifs.")
+            st.success(f"✅ **{status_msg}** : L'autosuffisance est prévue en **{annee_auto}** (croisement en {float(croisement):.1f}). Scénario conforme aux objectifs.")
         else:
-            st.warning(f"⚠️ **{status_msg} RETARDÉE** : L'autosuffisance arrive en **{annee_auto}** (après 2040).")
+            st.warning(f"⚠️ **{status_msg} RETARDÉE** : L'autosuffisance arrive en **{annee_auto}** (croisement en {float(croisement):.1f}, après 2040).")
             
-        idx_auto = years.index(annee_auto)
-        st.info(f"À cette échéance, la disponibilité sera de **{int(dispo_hab[idx_auto])} kg/an**, garantissant la sécurité alimentaire.")
+        if cohortes:
+            dispo_auto = float(dispo_hab[annee_auto - years[0]])
+        else:
+            dispo_auto = float(moteur.ration_habitant(base_prod, tx_croissance, annee_auto, years[0], population_growth))
+        st.info(f"À cette échéance, la disponibilité sera de **{int(dispo_auto)} kg/an**, garantissant la sécurité alimentaire.")
     else:
         gap_final = int(besoin_path[-1] - prod_path[-1])
-        st.error(f"🚨 **DÉFICIT PRÉVU** : En 2041, un manque de **{gap_final:,} Tonnes** est à prévoir avec un taux de {tx_croissance}%.")
+        rattrapage = f"pas la démographie d'ici {years[-1]} (+{(population_growth - 1) * 100:.1f}%/an en moyenne)" if cohortes \
+            else f"jamais la démographie (+{(population_growth - 1) * 100:.1f}%/an)"
+        st.error(f"🚨 **DÉFICIT STRUCTUREL** : Avec {tx_croissance}% par an, la production ne rattrape {rattrapage}. En {years[-1]}, un manque de **{gap_final:,} Tonnes** est à prévoir.")
         st.warning(f"La ration de **{int(dispo_hab[-1])} kg/an** restera sous le seuil critique.")
-with tab4:
+
+    profileur.etape("6. Arbitrages")
+    # --- 6. TABLE DES ARBITRAGES (TOUS TAUX × TOUTES FILIÈRES) ---
+    with st.expander("📋 Table des arbitrages : année d'autosuffisance par taux et par filière"):
+        st.caption("Calcul analytique sur toute la plage 1–15 % ; une case vide signifie que l'autosuffisance n'est jamais atteinte.")
+        st.dataframe(figures.table_arbitrages(years[0]), use_container_width=True, height=300)
+
+    profileur.etape("7. Trajectoire couplée")
+    # --- 7. TRAJECTOIRE COUPLÉE (couplage.py) : climat, budget, pertes et démographie ensemble ---
+    st.write("---")
+    st.subheader(f"🔗 Trajectoire couplée toutes filières {years[0]}-{years[-1]}")
+    st.caption("Taux et horizon ci-dessus, terroir et pluie de l'onglet 2, allocation du budget de l'onglet 4 "
+               "(dépensé de 2027 à 2040), pertes et transformation de l'onglet 5 (valeurs par défaut tant que "
+               "l'onglet n'a pas été ouvert).")
+    c_cp1, c_cp2, c_cp3 = st.columns(3)
+    aleatoire = c_cp1.radio("Climat", ["Pluie constante (onglet 2)", "Aléa climatique (loi de l'onglet 2)"],
+                            key="couplage_climat") != "Pluie constante (onglet 2)"
+    graine = c_cp2.number_input("Graine du tirage", 0, 9999, 0, key="couplage_graine", disabled=not aleatoire)
+    taux_perte = hypotheses.get('taux_perte', 30)
+    taux_perte_final = c_cp3.slider("Taux de pertes visé en 2040 (%)", 0, 50, int(taux_perte), key="couplage_pertes")
+    df_couple, fig_couple = figures.trajectoire_couplee(
+        culture_select, years[-1], tx_croissance, hypotheses.get('pluie', 0),
+        hypotheses.get('loi_climat', ("Normale", 20, 0.5, 0.0)) if aleatoire else None, graine,
+        hypotheses.get('sol', moteur.TYPES_SOL[0]), hypotheses.get('intrants', moteur.NIVEAUX_INTRANTS[0]),
+        hypotheses.get('irrigation', False), budget_total, hypotheses.get('part_semences', 0.3),
+        hypotheses.get('part_engrais', 0.4), taux_perte, taux_perte_final,
+        hypotheses.get('transfo', moteur.NIVEAUX_TRANSFO[0])
+    )
+    st.plotly_chart(fig_couple, use_container_width=True)
+    st.dataframe(
+        df_couple.style.format({c: '{:,.0f}' for c in df_couple.columns[1:4]} | {'Couverture': '{:.0%}', 'kg/hab/an': '{:.1f}'}),
+        hide_index=True, use_container_width=True
+    )
+
+
+@st.fragment
+@profileur.mesurer("Onglet 4 · Finance")
+def efficacite_budgetaire(culture_select, d, budget_total):
     st.subheader(f"💰 Optimisation du Budget National : {culture_select}")
     
+    profileur.etape("1. Allocation")
     # --- 1. CONFIGURATION BUDGÉTAIRE (Calculs Dynamiques) ---
     c_fin1, c_fin2 = st.columns([1, 1])
     
     with c_fin1:
         st.write("**Allocation des Ressources (Mds GNF)**")
         # Utilisation du budget global défini en barre latérale
-        s_sem = st.slider("Semences Certifiées (Rouge)", 0, int(budget_total), int(budget_total*0.3))
-        s_eng = st.slider("Engrais & Intrants (Jaune)", 0, int(budget_total - s_sem), int(budget_total*0.4))
+        # Valeurs par défaut : allocation du scénario choisi, sinon 30 % / 40 %
+        defaut_sem, defaut_eng, _ = scenarios.allocation(budget_total, parametres_scenario.get('part_semences', 0.3),
+                                                         parametres_scenario.get('part_engrais', 0.4))
+        s_sem = st.slider("Semences Certifiées (Rouge)", 0, int(budget_total), defaut_sem)
+        s_eng = st.slider("Engrais & Intrants (Jaune)", 0, int(budget_total - s_sem), min(defaut_eng, int(budget_total - s_sem)))
         
         # Le reste est alloué automatiquement à la mécanisation
         s_mac = max(0, budget_total - s_sem - s_eng)
         
         st.info(f"Budget Mécanisation (Vert) : **{int(s_mac)} Mds GNF**")
+        hypotheses.update(part_semences=s_sem / budget_total, part_engrais=s_eng / budget_total)
         
         # --- CALCUL DU ROI AGRONOMIQUE ---
         # On récupère le coefficient spécifique à la culture (ex: 850 pour le Riz)
         coef = d.get('coef_roi', 500)
         
         # L'impact est pondéré : l'engrais a un boost de 1.2, la machine de 0.8 sur le tonnage immédiat
-        gain_tonnes = (s_sem * coef) + (s_eng * coef * 1.2) + (s_mac * coef * 0.8)
+        gain_tonnes = float(moteur.gain_investissement(s_sem, s_eng, s_mac, coef))
         
         st.metric("Gain de Production Estimé", f"+{int(gain_tonnes):,} T", delta="Impact Investissement")
 
     with c_fin2:
+        profileur.etape("2. Structure")
         # --- 2. GRAPHIQUE AUX COULEURS NATIONALES ---
         st.write("**Structure de l'Investissement**")
-        df_pie = pd.DataFrame({
-            'Levier': ['Semences', 'Engrais', 'Machines'], 
-            'Valeur': [s_sem, s_eng, s_mac]
-        })
-        fig_pie = px.pie(
-            df_pie, values='Valeur', names='Levier', 
-            hole=0.4,
-            color='Levier', 
-            color_discrete_map={'Semences':'#ce1126','Engrais':'#fcd116','Machines':'#009460'}
-        )
-        fig_pie.update_layout(margin=dict(t=20, b=20, l=0, r=0))
+        fig_pie = figures.structure_investissement(s_sem, s_eng, s_mac)
         st.plotly_chart(fig_pie, use_container_width=True)
 
+    profileur.etape("3. Macro-économie")
     # --- 3. ANALYSE MACRO-ÉCONOMIQUE ---
     st.write("---")
     st.subheader("🏦 Impact Macro-économique (Balance Commerciale)")
     
     col_eco1, col_eco2 = st.columns(2)
     
-    # Hypothèse : Prix moyen d'une tonne importée (Riz/Maïs) = 550 USD
-    prix_import_usd = 550 
-    economie_devises = gain_tonnes * prix_import_usd
+    # Hypothèse : Prix moyen d'une tonne importée (Riz/Maïs) = 550 USD, taux de change ≈ 8600 GNF/USD
+    economie_devises, rentabilite_ratio = map(float, moteur.impact_devises(gain_tonnes, budget_total))
     
     with col_eco1:
         st.metric(
@@ -590,17 +785,13 @@ with tab4:
         )
     
     with col_eco2:
-        # Taux de change (USD/GNF) approx 8600. Conversion du budget Mds en GNF unité.
-        valeur_gnf_economisee = economie_devises * 8600
-        investissement_gnf = budget_total * 1_000_000_000
-        rentabilite_ratio = valeur_gnf_economisee / investissement_gnf if investissement_gnf > 0 else 0
-        
         st.metric(
             "Efficacité du GNF", 
             f"{rentabilite_ratio:.2f}x", 
             help="Pour 1 GNF investi, combien de GNF de valeur d'importation sont économisés."
         )
 
+    profileur.etape("4. Résumé")
     # --- 4. RÉSUMÉ FINANCIER ---
     st.write("---")
     st.success(f"""
@@ -610,28 +801,67 @@ with tab4:
     * **Efficacité :** Le levier 'Engrais' reste le plus performant à court terme pour maximiser le rendement de la filière **{culture_select}**.
     """)
 
-with tab5:
+    profileur.etape("5. Optimisation")
+    # --- 5. OPTIMISATION MULTI-FILIÈRES ---
+    st.write("---")
+    st.subheader("🧮 Allocation Optimale du Budget (toutes filières)")
+    with st.expander("⚙️ Contraintes de l'optimisation"):
+        priorite = st.slider("Priorité : Devises (0) ↔ Tonnage (1)", 0.0, 1.0, 1.0, 0.05, key="opt_priorite")
+        st.write("**Plafond par levier (% du budget)**")
+        cols_plafond = st.columns(len(moteur.LEVIERS))
+        plafonds = tuple(
+            budget_total * col.slider(levier, 0, 100, 100, 5, key=f"opt_plafond_{levier}") / 100
+            for col, levier in zip(cols_plafond, moteur.LEVIERS)
+        )
+        st.write("**Minimum par filière (% du budget)**")
+        cols_minimum = st.columns(len(optimisation.filieres()))
+        minimums = tuple(
+            budget_total * col.slider(filiere, 0, 50, 0, 5, key=f"opt_minimum_{filiere}") / 100
+            for col, filiere in zip(cols_minimum, optimisation.filieres())
+        )
+
+    if sum(minimums) > budget_total:
+        st.error("🚨 La somme des minimums par filière dépasse le budget disponible.")
+        return
+
+    df_alloc, fig_pareto, optimum = figures.allocation_optimale(budget_total, priorite, plafonds, minimums)
+    c_opt1, c_opt2 = st.columns([1, 1])
+    with c_opt1:
+        st.metric("Gain de Production Optimal", f"+{int(optimum['tonnage']):,} T")
+        st.metric("Économie de Devises (USD)", f"${optimum['economie_devises']:,.0f}")
+        st.dataframe(df_alloc.style.format("{:,.0f}"), use_container_width=True)
+        if optimum['non_alloue'] > 0:
+            st.warning(f"⚠️ Plafonds trop serrés : **{optimum['non_alloue']:,.0f} Mds GNF** restent non alloués.")
+    with c_opt2:
+        st.plotly_chart(fig_pareto, use_container_width=True)
+    st.caption("Rendements décroissants par levier ; prix d'import indicatifs par filière (hypothèses du référentiel).")
+
+
+@st.fragment
+@profileur.mesurer("Onglet 5 · Transformation")
+def transformation(culture_select, d, base_prod):
     st.subheader(f"🏭 Industrialisation & Réduction des Pertes : {culture_select}")
     
     col_t1, col_t2 = st.columns([1, 2])
     
     with col_t1:
         st.write("**🏗️ Infrastructures de Stockage**")
-        taux_perte = st.slider("Taux de pertes post-récolte actuel (%)", 5, 50, 30, help="Part de la récolte perdue par manque de silos ou de transport adéquat.")
+        taux_perte = st.slider("Taux de pertes post-récolte actuel (%)", 5, 50, parametres_scenario.get('taux_perte', 30), help="Part de la récolte perdue par manque de silos ou de transport adéquat.")
         
         st.write("**⚙️ Capacité de Transformation**")
         niveau_transfo = st.radio(
             "Niveau d'industrialisation", 
-            ["Manuel (Faible)", "Artisanal (Moyen)", "Industriel (Élevé)"],
+            moteur.NIVEAUX_TRANSFO,
+            index=moteur.NIVEAUX_TRANSFO.index(parametres_scenario.get('transfo', moteur.NIVEAUX_TRANSFO[0])),
             help="L'industrie permet de stabiliser les produits et de réduire le gaspillage."
         )
         
-        # Logique de calcul du gain par l'efficience industrielle
-        gain_efficience = {"Manuel (Faible)": 0.05, "Artisanal (Moyen)": 0.15, "Industriel (Élevé)": 0.30}[niveau_transfo]
+        # Logique de calcul du gain par l'efficience industrielle (indice du niveau de transformation)
+        i_transfo = moteur.codes(niveau_transfo, moteur.NIVEAUX_TRANSFO)
+        hypotheses.update(taux_perte=taux_perte, transfo=niveau_transfo)
         
-        # Impact sur la disponibilité réelle basé sur base_prod
-        perte_tonnes = base_prod * (taux_perte / 100)
-        economie_perte = perte_tonnes * gain_efficience
+        # Impact sur la disponibilité réelle basé sur base_prod (lecture dans le cube précalculé)
+        perte_tonnes, economie_perte, dispo_reelle = cube.pertes(culture_select, taux_perte, i_transfo)
         
         st.warning(f"Pertes actuelles : **{int(perte_tonnes):,} T**")
         st.success(f"Gain par l'industrie : **+{int(economie_perte):,} T** récupérées")
@@ -639,32 +869,14 @@ with tab5:
     with col_t2:
         st.write("**📦 Flux de Valeur : Du Champ à l'Assiette**")
         
-        # Calcul de la disponibilité finale pour le graphique
-        dispo_reelle = base_prod - perte_tonnes
-        
         # Construction du graphique Waterfall
-        fig_valeur = go.Figure(go.Waterfall(
-            name = "Flux de production", 
-            orientation = "v",
-            measure = ["relative", "relative", "total"],
-            x = ["Production Champ", "Pertes Post-Récolte", "Disponible Final"],
-            textposition = "outside",
-            text = [f"+{int(base_prod):,} T", f"-{int(perte_tonnes):,} T", f"={int(dispo_reelle):,} T"],
-            y = [base_prod, -perte_tonnes, 0], # Le 0 avec 'total' déclenche le calcul automatique
-            connector = {"line":{"color":"rgb(63, 63, 63)"}},
-            increasing = {"marker":{"color":"#009460"}}, # Vert Guinée
-            decreasing = {"marker":{"color":"#ce1126"}}, # Rouge Guinée
-            totals = {"marker":{"color":"#fcd116"}}      # Jaune Guinée
-        ))
-
-        fig_valeur.update_layout(
-            title = f"Analyse des pertes et disponibilité : {culture_select}",
-            showlegend = False,
-            height = 450
-        )
+        fig_valeur = figures.flux_de_valeur(culture_select, base_prod, perte_tonnes, dispo_reelle)
         
         st.plotly_chart(fig_valeur, use_container_width=True)
 
+    st.write("---")
+    reseau_logistique(culture_select, base_prod, taux_perte, i_transfo)
+
     st.write("---")
     
     # Calcul d'impact pour la note de synthèse
@@ -679,6 +891,176 @@ with tab5:
     """)
 
 
+@st.fragment
+@profileur.mesurer("Onglet 5 · Réseau logistique")
+def reseau_logistique(culture_select, base_prod, taux_perte, i_transfo):
+    st.write("**🚚 Réseau logistique : silos et acheminement**")
+    st.caption("La récolte de chaque nœud reste à la ferme (taux de pertes ci-dessus) ou part vers un silo de "
+               "capacité limitée (pertes du silo + pertes par km de route). Répartition de pertes minimales "
+               "(flot de coût minimal) ; sites candidats : les chefs-lieux de préfecture.")
+    communes_dispo = len(referentiel.COMMUNES['commune']) > 0
+
+    c_l1, c_l2, c_l3, c_l4 = st.columns(4)
+    capacite = c_l1.slider("Capacité par site (milliers de T)", 10, 500, logistique.CAPACITE_SITE // 1000, step=10,
+                           key="log_capacite") * 1000
+    perte_km = c_l2.slider("Pertes de transport (% / 100 km)", 0.0, 10.0, logistique.PERTE_KM, 0.5, key="log_perte_km")
+    perte_silo = c_l3.slider("Pertes en silo (%)", 0.0, 20.0, logistique.PERTE_SILO, 0.5, key="log_perte_silo")
+    niveau = c_l4.radio("Nœuds du réseau", ["Préfectures", "Communes"], key="log_niveau", disabled=not communes_dispo,
+                        help=None if communes_dispo else "Aucune commune dans l'entrepôt du référentiel.")
+
+    c_m1, c_m2 = st.columns([1, 3])
+    mode = c_m1.radio("Sites", ["Optimaux", "Choisis"], horizontal=True, key="log_mode")
+    if mode == "Optimaux":
+        n_sites = c_m2.slider("Nombre de sites à ouvrir", 1, 12, 4, key="log_sites")
+        imposes = ()
+    else:
+        imposes = tuple(c_m2.multiselect("Préfectures équipées d'un silo", referentiel.PREFECTURES['pref'],
+                                         default=["Kankan", "Siguiri"], key="log_imposes"))
+        n_sites = 0
+    if not imposes and n_sites == 0:
+        st.info("Choisissez au moins une préfecture équipée.")
+        return
+
+    df_sites, fig_reseau, bilan = figures.reseau_logistique(
+        culture_select, base_prod, taux_perte, n_sites, capacite, perte_silo, perte_km, imposes,
+        communes_dispo and niveau == "Communes",
+    )
+    evitees = bilan['pertes_sans_reseau'] - bilan['pertes']
+    c_r1, c_r2, c_r3 = st.columns(3)
+    c_r1.metric("Pertes avec le réseau", f"{bilan['pertes']:,.0f} T",
+                f"-{evitees:,.0f} T vs taux national", delta_color="inverse")
+    c_r2.metric("Stocké en silo", f"{bilan['stocke']:,.0f} T", f"{bilan['stocke'] / bilan['production']:.0%} de la récolte",
+                delta_color="off")
+    c_r3.metric("Récupéré par l'industrie", f"{bilan['pertes'] * moteur.GAIN_EFFICIENCE[i_transfo]:,.0f} T",
+                help="Pertes restantes × gain d'efficience du niveau de transformation.")
+
+    c_s1, c_s2 = st.columns([2, 1])
+    with c_s1:
+        st.plotly_chart(fig_reseau, use_container_width=True)
+    with c_s2:
+        st.dataframe(df_sites.style.format({'Stocké (T)': "{:,.0f}", 'Remplissage (%)': "{:.0f}",
+                                            'Distance moyenne (km)': "{:.0f}"}),
+                     use_container_width=True, hide_index=True)
+    st.caption(f"{bilan['noeuds']} nœuds, {bilan['evaluations']} résolutions de flot en "
+               f"{bilan['duree_s'] * 1000:,.0f} ms (relu du cache tant que les paramètres ne changent pas).")
+
+
+def enregistrer_scenario(nom, parametres):
+    """Ajoute un scénario utilisateur à la session (remplace un scénario du même nom) et à la comparaison."""
+    st.session_state.setdefault("scenarios_utilisateur", {})[nom] = parametres
+    choix = st.session_state.get("comparaison_choix", list(scenarios.PARAMETRES))
+    st.session_state["comparaison_choix"] = list(dict.fromkeys(choix + [nom]))
+
+
+@st.fragment
+@profileur.mesurer("Onglet 6 · Scénarios")
+def comparaison_scenarios(culture_select, budget_total):
+    st.subheader(f"⚖️ Comparaison des scénarios : {culture_select}")
+    st.caption("Chaque scénario fixe la croissance (onglet 3), l'allocation du budget (onglet 4) et les pertes "
+               "et la transformation (onglet 5). « Curseurs actuels » reprend les valeurs des onglets.")
+
+    profileur.etape("1. Scénarios")
+    # --- 1. SCÉNARIOS COMPARÉS : prédéfinis, curseurs des onglets et scénarios de la session ---
+    utilisateur = st.session_state.setdefault("scenarios_utilisateur", {})
+    courant = {
+        'tx_croissance': hypotheses.get('tx_croissance', parametres_scenario.get('tx_croissance', 5.0)),
+        'part_semences': hypotheses.get('part_semences', 0.3), 'part_engrais': hypotheses.get('part_engrais', 0.4),
+        'taux_perte': hypotheses.get('taux_perte', 30), 'transfo': hypotheses.get('transfo', moteur.NIVEAUX_TRANSFO[0]),
+    }
+    disponibles = {**{nom: dict(p) for nom, p in scenarios.PARAMETRES.items()}, "Curseurs actuels": courant, **utilisateur}
+    c_sc1, c_sc2 = st.columns([3, 1])
+    choisis = c_sc1.multiselect("Scénarios comparés", list(disponibles), default=list(scenarios.PARAMETRES),
+                                key="comparaison_choix")
+    horizon = c_sc2.select_slider("Horizon", [2040, 2050, 2060, 2080, 2100], value=2040, key="comparaison_horizon")
+
+    with st.expander("➕ Définir un scénario"):
+        c_d1, c_d2, c_d3 = st.columns(3)
+        nom = c_d1.text_input("Nom", "Mon scénario", key="nouveau_nom")
+        tx = c_d1.slider("Croissance (%/an)", 1.0, 15.0, courant['tx_croissance'], 0.1, key="nouveau_tx")
+        part_sem = c_d2.slider("Part semences (%)", 0, 100, int(courant['part_semences'] * 100), 5, key="nouveau_sem")
+        part_eng = c_d2.slider("Part engrais (%)", 0, 100, int(courant['part_engrais'] * 100), 5, key="nouveau_eng")
+        perte = c_d3.slider("Pertes post-récolte (%)", 5, 50, int(courant['taux_perte']), key="nouveau_perte")
+        transfo = c_d3.selectbox("Transformation", moteur.NIVEAUX_TRANSFO, key="nouveau_transfo")
+        nouveau = {'tx_croissance': tx, 'part_semences': part_sem / 100, 'part_engrais': part_eng / 100,
+                   'taux_perte': perte, 'transfo': transfo}
+        try:
+            scenarios.valider(nouveau)
+        except ValueError as erreur:
+            st.error(str(erreur))
+        else:
+            st.button("Enregistrer", key="nouveau_enregistrer", on_click=enregistrer_scenario, args=(nom.strip(), nouveau),
+                      disabled=not nom.strip() or nom.strip() in scenarios.PARAMETRES or nom.strip() == "Curseurs actuels")
+
+    if not choisis:
+        st.info("Choisir au moins un scénario.")
+        return
+
+    profileur.etape("2. Évaluation")
+    # --- 2. ÉVALUATION (mémoïsée par scénario) ET FIGURES SUPERPOSÉES ---
+    df_comp, fig_chemins, fig_roi, fig_pertes = figures.comparaison_scenarios(
+        culture_select, budget_total, horizon, tuple((n, disponibles[n]) for n in choisis)
+    )
+    st.plotly_chart(fig_chemins, use_container_width=True)
+    c_g1, c_g2 = st.columns(2)
+    c_g1.plotly_chart(fig_roi, use_container_width=True)
+    c_g2.plotly_chart(fig_pertes, use_container_width=True)
+    st.dataframe(
+        df_comp.style.format({c: '{:,.0f}' for c in df_comp.columns if '(T)' in c}
+                             | {'Croissance (%/an)': '{:.1f}', f'kg/hab/an {horizon}': '{:.1f}',
+                                'Économie (M USD)': '{:,.1f}', 'Efficacité GNF': '{:.2f}x'}),
+        hide_index=True, use_container_width=True
+    )
+
+
+# --- 3. RENDU DES ONGLETS (onglet visible seulement en mode paresseux) ---
+if onglet_visible(tab1):
+    with tab1:
+        diagnostic_territorial(culture_select, d, base_prod, rendement_moyen)
+
+if onglet_visible(tab2):
+    with tab2:
+        simulateur_agro_climatique(culture_select, base_prod, rendement_moyen)
+        st.write("---")
+        anticipation_crises(culture_select)
+        st.write("---")
+        analyse_sensibilite(culture_select, d, base_prod)
+
+if onglet_visible(tab3):
+    with tab3:
+        vision_2040(culture_select, d, base_prod, budget_total)
+
+if onglet_visible(tab4):
+    with tab4:
+        efficacite_budgetaire(culture_select, d, budget_total)
+
+if onglet_visible(tab5):
+    with tab5:
+        transformation(culture_select, d, base_prod)
+
+if onglet_visible(tab6):
+    with tab6:
+        comparaison_scenarios(culture_select, budget_total)
+
+# --- 7. SUIVI DU CACHE DES FIGURES ---
+with st.sidebar.expander("⚡ Cache des figures"):
+    stats_cache = pd.DataFrame.from_dict(cache.statistiques(), orient='index')
+    st.dataframe(stats_cache[['taille', 'hits', 'misses', 'evictions', 'expirations']], use_container_width=True)
+
+with st.sidebar.expander("⏳ Tâches de fond"):
+    st.dataframe(pd.Series(taches.EXECUTEUR.statistiques(), name="valeur"), use_container_width=True)
+
+# --- 8. PANNEAU PERFORMANCE (chronométrage par section) ---
+if profileur.actif:
+    with st.sidebar.expander("📈 Performance (session)", expanded=True):
+        st.caption("Cumul depuis l'activation ; un rerun de fragment est compté à la relance complète suivante.")
+        if profileur.mesures:
+            df_perf = pd.DataFrame(profileur.tableau()).set_index('Section')
+            st.dataframe(df_perf.style.format("{:,.1f}", subset=df_perf.columns[1:]), use_container_width=True)
+        st.download_button("📥 Exporter (JSON)", profileur.exporter(), file_name="profilage_sad_updia.json", mime="application/json")
+        if st.button("Réinitialiser les mesures"):
+            profileur.reinitialiser()
+
+
 
 
 
@@ -0,0 +1,260 @@
+"""Exécution par lots de scénarios de politique agricole, sans l'interface Streamlit.
+
+    python batch.py scenarios.csv -o resultats.parquet --processus 4
+    python batch.py scenarios.jsonl -o resultats.csv --taille-bloc 20000
+    python batch.py scenarios.csv --generer 100000   # fichier d'exemple
+
+Le fichier d'entrée (CSV ou JSON lines) est lu par blocs ; chaque bloc est évalué
+avec les formules des onglets (moteur.py), éventuellement dans un pool de processus,
+puis ajouté au fichier de sortie (CSV ou Parquet). Au plus deux blocs par processus
+sont en vol : la mémoire reste bornée quel que soit le nombre de scénarios.
+"""
+import argparse
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import moteur
+import referentiel
+from scenarios import CHAMPS as CHAMPS_SCENARIO, PARAMETRES as PARAMETRES_SCENARIOS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet optionnel : CSV seulement
+    pa = pq = None
+
+# Colonnes d'entrée et valeurs par défaut (mêmes défauts que les onglets)
+COLONNES = {
+    'filiere': "Tout",
+    'scenario': moteur.SCENARIOS[0],
+    'sol': moteur.TYPES_SOL[0],
+    'intrants': moteur.NIVEAUX_INTRANTS[0],
+    'irrigation': False,
+    'pluie': 0.0,               # Variation de la pluie (%)
+    'tx_croissance': 6.0,       # Croissance annuelle de la production (%)
+    'budget': 2500.0,           # Mds GNF
+    'part_semences': 0.3,       # Le reste après semences et engrais va à la mécanisation
+    'part_engrais': 0.4,
+    'taux_perte': 30.0,         # Pertes post-récolte (%)
+    'transfo': moteur.NIVEAUX_TRANSFO[0],
+}
+
+
+def codes_colonne(serie, options, colonne):
+    """Indices des libellés d'une colonne ; les indices numériques sont acceptés tels quels."""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.to_numpy(dtype=np.int64)
+    inconnus = set(serie.unique()) - set(options)
+    if inconnus:
+        raise ValueError(f"Colonne {colonne!r} : valeurs inconnues {sorted(inconnus)} (attendu : {options})")
+    return moteur.codes(serie.to_numpy(), options)
+
+
+def completer(scenarios):
+    """Copie des scénarios, colonnes absentes remplies avec les valeurs par défaut.
+
+    Si la colonne `scenario` est fournie, les paramètres absents (croissance, parts du
+    budget, pertes, transformation) prennent les valeurs du scénario de chaque ligne.
+    Ordre des colonnes fixe (COLONNES, puis les autres colonnes d'entrée triées), quelles
+    que soient les clés présentes dans le bloc : les blocs s'écrivent les uns à la suite.
+    """
+    df = scenarios.copy()
+    if 'scenario' in df:
+        inconnus = set(df['scenario'].unique()) - set(PARAMETRES_SCENARIOS)
+        if inconnus:
+            raise ValueError(f"Colonne 'scenario' : valeurs inconnues {sorted(inconnus)} (attendu : {moteur.SCENARIOS})")
+        for champ in CHAMPS_SCENARIO:
+            if champ not in df:
+                df[champ] = df['scenario'].map({nom: p[champ] for nom, p in PARAMETRES_SCENARIOS.items()})
+    for colonne, defaut in COLONNES.items():
+        if colonne not in df:
+            df[colonne] = defaut
+    df['irrigation'] = df['irrigation'].astype(bool)
+    return df[list(COLONNES) + sorted(c for c in df.columns if c not in COLONNES)]
+
+
+def evaluer(scenarios):
+    """Indicateurs des onglets 2 à 5 pour chaque ligne d'un DataFrame de scénarios."""
+    df = completer(scenarios)
+
+    filieres = referentiel.colonnes_filieres()
+    i_filiere = codes_colonne(df['filiere'], referentiel.options_culture, 'filiere')
+    base_prod = filieres['prod'][i_filiere]
+    ratio_besoin = filieres['ratio_besoin'][i_filiere]
+    pluie = df['pluie'].to_numpy(dtype=float)
+    tx = df['tx_croissance'].to_numpy(dtype=float)
+
+    # Onglet 2 : rendement sol-climat
+    rendement = moteur.rendement_sol_climat(
+        pluie, codes_colonne(df['sol'], moteur.TYPES_SOL, 'sol'),
+        codes_colonne(df['intrants'], moteur.NIVEAUX_INTRANTS, 'intrants'), df['irrigation'].to_numpy()
+    )
+    df['rendement'] = rendement
+    df['production'] = base_prod * rendement
+
+    # Onglet 3 : autosuffisance (forme fermée) et ration en 2040
+    croisement, annee_civile = moteur.annee_autosuffisance(ratio_besoin, tx)
+    df['annee_croisement'] = np.where(np.isfinite(croisement), croisement, np.nan)
+    df['annee_autosuffisance'] = np.where(np.isfinite(annee_civile), annee_civile, np.nan)
+    df['dispo_2040'] = moteur.ration_habitant(base_prod, tx, moteur.ANNEE_CIBLE)
+
+    # Onglet 4 : gain de l'allocation et économie de devises
+    budget = df['budget'].to_numpy(dtype=float)
+    s_sem = budget * df['part_semences'].to_numpy(dtype=float)
+    s_eng = budget * df['part_engrais'].to_numpy(dtype=float)
+    s_mac = np.maximum(0, budget - s_sem - s_eng)
+    df['gain_tonnes'] = moteur.gain_investissement(s_sem, s_eng, s_mac, filieres['coef_roi'][i_filiere])
+    df['economie_devises'], df['rentabilite'] = moteur.impact_devises(df['gain_tonnes'].to_numpy(), budget)
+
+    # Onglet 5 : pertes post-récolte
+    gain_efficience = moteur.GAIN_EFFICIENCE[codes_colonne(df['transfo'], moteur.NIVEAUX_TRANSFO, 'transfo')]
+    df['perte_tonnes'], df['recupere_tonnes'], df['dispo_reelle'] = moteur.pertes_post_recolte(
+        base_prod, df['taux_perte'].to_numpy(dtype=float), gain_efficience
+    )
+    return df
+
+
+def lire_scenarios(chemin, taille_bloc=10_000):
+    """Itère sur les blocs (DataFrames) d'un fichier CSV ou JSON lines."""
+    chemin = Path(chemin)
+    if chemin.suffix in (".jsonl", ".ndjson", ".json"):
+        lecteur = pd.read_json(chemin, lines=True, chunksize=taille_bloc)
+    else:
+        lecteur = pd.read_csv(chemin, chunksize=taille_bloc)
+    with lecteur:
+        yield from lecteur
+
+
+class Ecrivain:
+    """Ajoute des blocs à un fichier CSV ou Parquet (schéma fixé par le premier bloc).
+
+    Les blocs suivants sont remis dans l'ordre des colonnes du premier (colonne absente :
+    valeurs manquantes) ; une colonne inconnue du premier bloc est une erreur.
+    `chemin` peut aussi être un fichier binaire ouvert ; `format` ("csv" ou "parquet")
+    est alors obligatoire.
+    """
+
+    def __init__(self, chemin, format=None):
+        self.chemin = chemin if hasattr(chemin, "write") else Path(chemin)
+        self.parquet = (format or self.chemin.suffix.lstrip(".")) == "parquet"
+        if self.parquet and pq is None:
+            raise RuntimeError("La sortie Parquet exige pyarrow (pip install pyarrow).")
+        self._parquet = None
+        self._premier = True
+        self._colonnes = None
+
+    def ecrire(self, df):
+        if self._colonnes is None:
+            self._colonnes = list(df.columns)
+        elif list(df.columns) != self._colonnes:
+            nouvelles = [c for c in df.columns if c not in self._colonnes]
+            if nouvelles:
+                raise ValueError(f"Colonnes absentes du premier bloc : {nouvelles} "
+                                 "(les fournir dès les premières lignes du fichier d'entrée)")
+            df = df.reindex(columns=self._colonnes)
+        if self.parquet:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.chemin, table.schema)
+            self._parquet.write_table(table.cast(self._parquet.schema))
+        else:
+            df.to_csv(self.chemin, mode="w" if self._premier else "a", header=self._premier, index=False)
+        self._premier = False
+
+    def fermer(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+
+def _evaluer_blocs(blocs, n_processus):
+    """Résultats dans l'ordre des blocs ; au plus 2 blocs par processus en attente."""
+    if n_processus <= 1:
+        yield from map(evaluer, blocs)
+        return
+    # Chaque processus fils charge le même référentiel (entrepôt sur disque s'il existe)
+    with ProcessPoolExecutor(max_workers=n_processus, initializer=referentiel.synchroniser) as pool:
+        en_vol = deque()
+        for bloc in blocs:
+            en_vol.append(pool.submit(evaluer, bloc))
+            if len(en_vol) >= 2 * n_processus:
+                yield en_vol.popleft().result()
+        while en_vol:
+            yield en_vol.popleft().result()
+
+
+def executer(entree, sortie, n_processus=1, taille_bloc=10_000, journal=sys.stderr):
+    """Évalue tous les scénarios de `entree` vers `sortie` ; renvoie le nombre, la durée et le débit."""
+    debut = time.perf_counter()
+    n = 0
+    with Ecrivain(sortie) as ecrivain:
+        for resultat in _evaluer_blocs(lire_scenarios(entree, taille_bloc), n_processus):
+            ecrivain.ecrire(resultat)
+            n += len(resultat)
+            if journal:
+                ecoule = time.perf_counter() - debut
+                print(f"  {n:>12,} scénarios  ({n / ecoule:,.0f}/s)", file=journal)
+    duree = time.perf_counter() - debut
+    return {'scenarios': n, 'duree_s': duree, 'debit': n / duree if duree else 0.0}
+
+
+def generer_scenarios(n, graine=0):
+    """Scénarios tirés au hasard dans les plages des curseurs de l'interface."""
+    rng = np.random.default_rng(graine)
+    part_semences = rng.uniform(0, 1, n)
+    return pd.DataFrame({
+        'filiere': rng.choice(referentiel.options_culture, n),
+        'scenario': rng.choice(moteur.SCENARIOS, n),
+        'sol': rng.choice(moteur.TYPES_SOL, n),
+        'intrants': rng.choice(moteur.NIVEAUX_INTRANTS, n),
+        'irrigation': rng.random(n) < 0.5,
+        'pluie': rng.integers(-50, 51, n),
+        'tx_croissance': rng.integers(10, 151, n) / 10,
+        'budget': rng.integers(100, 5001, n),
+        'part_semences': part_semences,
+        'part_engrais': rng.uniform(0, 1, n) * (1 - part_semences),
+        'taux_perte': rng.integers(5, 51, n),
+        'transfo': rng.choice(moteur.NIVEAUX_TRANSFO, n),
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Évaluation par lots de scénarios UPDIA.")
+    parser.add_argument("entree", help="Fichier de scénarios (.csv ou .jsonl)")
+    parser.add_argument("-o", "--sortie", help="Fichier de résultats (.csv ou .parquet)")
+    parser.add_argument("-p", "--processus", type=int, default=1, help="Nombre de processus (défaut : 1)")
+    parser.add_argument("-b", "--taille-bloc", type=int, default=10_000, help="Scénarios par bloc")
+    parser.add_argument("--generer", type=int, metavar="N", help="Écrit N scénarios aléatoires dans `entree` et s'arrête")
+    args = parser.parse_args(argv)
+    referentiel.synchroniser()
+
+    if args.generer:
+        df = generer_scenarios(args.generer)
+        if Path(args.entree).suffix in (".jsonl", ".ndjson", ".json"):
+            df.to_json(args.entree, orient="records", lines=True, force_ascii=False)
+        else:
+            df.to_csv(args.entree, index=False)
+        print(f"{args.generer:,} scénarios écrits dans {args.entree}")
+        return 0
+    if not args.sortie:
+        parser.error("--sortie est requis")
+
+    bilan = executer(args.entree, args.sortie, args.processus, args.taille_bloc)
+    print(f"{bilan['scenarios']:,} scénarios en {bilan['duree_s']:.2f} s "
+          f"({bilan['debit']:,.0f} scénarios/s, {args.processus} processus) -> {args.sortie}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""Banc de démarrage à froid : coût des imports et délai avant le premier affichage.
+
+    python benchmarks/demarrage.py                                    # mesure et affiche
+    python benchmarks/demarrage.py --sauver benchmarks/demarrage.json
+    python benchmarks/demarrage.py --comparer benchmarks/demarrage.json --seuil 0.2
+
+Chaque mesure lance un interpréteur neuf (`python -X importtime`) qui charge
+l'application avec le harnais de test de Streamlit et exécute la première page :
+- premier affichage : du début du script au premier élément envoyé au navigateur ;
+- page complète : du début du script à la fin de la première exécution ;
+- imports du script : modules importés pendant cette exécution (hors Streamlit et
+  harnais, déjà chargés), durée cumulée et les plus coûteux.
+La médiane de --repetitions processus est retenue. Avec --comparer, toute médiane plus
+lente que la référence au-delà du seuil fait échouer la commande.
+"""
+import argparse
+import datetime
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+RACINE = Path(__file__).resolve().parents[1]
+APPLICATION = RACINE / "app.py"
+MARQUEUR = "--- debut du script ---"
+INDICATEURS = ('premier_affichage_ms', 'page_complete_ms', 'imports_script_ms')
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from latence import _revision  # noqa: E402
+
+
+def _enfant(paresseux):
+    """Processus mesuré : une exécution de la page, instants écrits en JSON sur la sortie standard."""
+    logging.disable(logging.WARNING)
+    debut_import = time.perf_counter()
+    from streamlit.runtime.scriptrunner_utils.script_run_context import ScriptRunContext
+    from streamlit.testing.v1 import AppTest
+
+    instants = {}
+    enqueue = ScriptRunContext.enqueue
+
+    def enqueue_chronometre(self, msg):
+        if msg.WhichOneof('type') == 'delta' and 'premier_affichage' not in instants:
+            instants['premier_affichage'] = time.perf_counter()
+        return enqueue(self, msg)
+
+    ScriptRunContext.enqueue = enqueue_chronometre
+    at = AppTest.from_file(str(APPLICATION), default_timeout=300)
+    if not paresseux:
+        at.session_state["rendu_paresseux"] = False
+    import_harnais = time.perf_counter() - debut_import
+
+    print(MARQUEUR, file=sys.stderr, flush=True)
+    debut = time.perf_counter()
+    at.run()
+    fin = time.perf_counter()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    print(json.dumps({
+        'import_streamlit_ms': import_harnais * 1000,
+        'premier_affichage_ms': (instants['premier_affichage'] - debut) * 1000,
+        'page_complete_ms': (fin - debut) * 1000,
+    }))
+
+
+def _imports(sortie_importtime):
+    """Imports de premier niveau faits pendant le script : [(module, cumul en ms)], du plus coûteux."""
+    lignes = sortie_importtime.split(MARQUEUR, 1)[-1].splitlines()
+    modules = []
+    for ligne in lignes:
+        if not ligne.startswith("import time:"):
+            continue
+        _, cumul, nom = ligne.split("|")
+        # Un niveau d'imbrication = deux espaces ; les imports de premier niveau n'en ont qu'un
+        if nom.startswith("  "):
+            continue
+        modules.append((nom.strip(), int(cumul) / 1000))
+    return sorted(modules, key=lambda m: -m[1])
+
+
+def _mesure(paresseux):
+    commande = [sys.executable, "-X", "importtime", __file__, "--enfant"] + ([] if paresseux else ["--complet"])
+    processus = subprocess.run(commande, cwd=RACINE, capture_output=True, text=True, check=True)
+    resultat = json.loads(processus.stdout.strip().splitlines()[-1])
+    modules = _imports(processus.stderr)
+    resultat['imports_script_ms'] = sum(cumul for _, cumul in modules)
+    resultat['modules'] = modules
+    return resultat
+
+
+def mesurer(paresseux=True, repetitions=5, n_modules=10):
+    """Médianes sur `repetitions` processus ; renvoie le dictionnaire de résultats (sérialisable en JSON)."""
+    import numpy
+    import streamlit
+
+    mesures = [_mesure(paresseux) for _ in range(repetitions)]
+    resultats = {nom: round(statistics.median(m[nom] for m in mesures), 1)
+                 for nom in ('import_streamlit_ms',) + INDICATEURS}
+    # Modules les plus coûteux : médiane de chaque module sur les répétitions
+    cumuls = {}
+    for m in mesures:
+        for nom, cumul in m['modules']:
+            cumuls.setdefault(nom, []).append(cumul)
+    plus_lourds = sorted(((nom, statistics.median(c)) for nom, c in cumuls.items()), key=lambda m: -m[1])
+    return {
+        'meta': {
+            'date': datetime.datetime.now().isoformat(timespec="seconds"),
+            'revision': _revision(),
+            'python': platform.python_version(),
+            'streamlit': streamlit.__version__,
+            'numpy': numpy.__version__,
+            'plateforme': platform.platform(),
+            'mode': "paresseux" if paresseux else "complet",
+            'repetitions': repetitions,
+        },
+        **resultats,
+        'modules_ms': {nom: round(cumul, 1) for nom, cumul in plus_lourds[:n_modules]},
+    }
+
+
+def comparer(resultats, reference, seuil=0.2):
+    """Lignes de comparaison et liste des régressions (médiane > référence × (1 + seuil))."""
+    lignes, regressions = [], []
+    for nom in INDICATEURS:
+        actuel, avant = resultats[nom], reference.get(nom)
+        if not avant:
+            lignes.append(f"{nom:<22} {actuel:>9.1f} ms   (pas de référence)")
+            continue
+        ratio = actuel / avant
+        drapeau = "  <-- RÉGRESSION" if ratio > 1 + seuil else ""
+        lignes.append(f"{nom:<22} {actuel:>9.1f} ms   réf. {avant:>9.1f} ms   x{ratio:.2f}{drapeau}")
+        if drapeau:
+            regressions.append(nom)
+    return lignes, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc de démarrage à froid de l'application.")
+    parser.add_argument("--sauver", metavar="JSON", help="Écrit les résultats (nouvelle référence)")
+    parser.add_argument("--comparer", metavar="JSON", help="Compare à une référence existante")
+    parser.add_argument("--seuil", type=float, default=0.2, help="Tolérance de régression (défaut : 0.2 = +20 %%)")
+    parser.add_argument("--complet", action="store_true", help="Désactive le rendu paresseux (tous les onglets)")
+    parser.add_argument("--repetitions", type=int, default=5, help="Processus mesurés (médiane)")
+    parser.add_argument("--enfant", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.enfant:
+        _enfant(paresseux=not args.complet)
+        return 0
+
+    resultats = mesurer(paresseux=not args.complet, repetitions=args.repetitions)
+    print(f"Import de Streamlit et du harnais : {resultats['import_streamlit_ms']:.0f} ms (hors script)")
+    print(f"Premier affichage : {resultats['premier_affichage_ms']:.0f} ms   "
+          f"Page complète : {resultats['page_complete_ms']:.0f} ms   "
+          f"Imports du script : {resultats['imports_script_ms']:.0f} ms")
+    for nom, cumul in resultats['modules_ms'].items():
+        print(f"  {nom:<28} {cumul:>8.1f} ms")
+
+    code = 0
+    if args.comparer:
+        reference = json.loads(Path(args.comparer).read_text(encoding="utf-8"))
+        lignes, regressions = comparer(resultats, reference, args.seuil)
+        print(f"\nComparaison à {args.comparer} (seuil +{args.seuil:.0%}) :")
+        print("\n".join(lignes))
+        code = 1 if regressions else 0
+    if args.sauver:
+        Path(args.sauver).write_text(json.dumps(resultats, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"\nRésultats écrits dans {args.sauver}")
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
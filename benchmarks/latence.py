@@ -0,0 +1,174 @@
+"""Banc de latence des reruns : rejoue des interactions sur l'application, sans navigateur.
+
+    python benchmarks/latence.py                                   # mesure et affiche
+    python benchmarks/latence.py --sauver benchmarks/reference.json
+    python benchmarks/latence.py --comparer benchmarks/reference.json --seuil 0.2
+
+L'application est chargée par le harnais de test de Streamlit (streamlit.testing).
+Chaque séquence place l'onglet voulu puis modifie un widget valeur par valeur ; on
+mesure le démarrage à froid, la durée de chaque rerun et le pic mémoire (RSS du
+processus, et pic Python par séquence avec --memoire). Avec --comparer, toute
+médiane plus lente que la référence au-delà du seuil fait échouer la commande.
+"""
+import argparse
+import datetime
+import json
+import logging
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+RACINE = Path(__file__).resolve().parents[1]
+APPLICATION = RACINE / "app.py"
+
+# (nom, index de l'onglet, type de widget, clé, valeurs successives)
+SEQUENCES = [
+    ("filiere_master", 0, "selectbox", "filiere_master", ["Riz", "Maïs", "Fonio", "Cassave", "Tout"] * 2),
+    ("meteo_actuelle", 1, "slider", "meteo_actuelle", list(range(-50, 51, 10))),
+    ("ndvi_obs", 1, "slider", "ndvi_obs", [round(0.3 + 0.04 * i, 2) for i in range(11)]),
+    ("growth_v", 2, "slider", "growth_v", [float(v) for v in range(1, 16)]),
+    ("budget_total", 3, "number_input", "budget_total", [500, 1000, 1500, 2000, 2500, 3000, 4000, 5000]),
+]
+
+
+def _rss_max_mo():
+    """Pic de mémoire résidente du processus (Mo) ; ru_maxrss est en Ko sous Linux, en octets sous macOS."""
+    pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pic / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RACINE,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _resume(durees_ms):
+    ordonnees = sorted(durees_ms)
+    return {
+        'mediane_ms': round(statistics.median(ordonnees), 1),
+        'p95_ms': round(ordonnees[min(len(ordonnees) - 1, int(0.95 * len(ordonnees)))], 1),
+        'max_ms': round(ordonnees[-1], 1),
+        'reruns_ms': [round(d, 1) for d in durees_ms],
+    }
+
+
+def _demarrer(paresseux, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(APPLICATION), default_timeout=timeout)
+    debut = time.perf_counter()
+    at.run()
+    duree = (time.perf_counter() - debut) * 1000
+    if not paresseux:
+        at.toggle(key="rendu_paresseux").set_value(False).run()
+    return at, duree
+
+
+def _rejouer(at, onglet, genre, cle, valeurs, memoire):
+    """Durées (ms) de chaque rerun d'une séquence, et pic Python (Mo) si demandé."""
+    # Ouverture de l'onglet (rerun non chronométré) ; sans effet en rendu complet
+    at.session_state["onglet_actif"] = at.tabs[onglet].label
+    at.run()
+    if memoire:
+        tracemalloc.start()
+    durees = []
+    for valeur in valeurs:
+        widget = getattr(at, genre)(key=cle)
+        debut = time.perf_counter()
+        widget.set_value(valeur).run()
+        durees.append((time.perf_counter() - debut) * 1000)
+        if at.exception:
+            raise RuntimeError(f"Exception pendant la séquence {cle!r} : {at.exception[0].message}")
+    pic = None
+    if memoire:
+        pic = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return durees, pic
+
+
+def mesurer(paresseux=True, memoire=False, timeout=120):
+    """Exécute toutes les séquences ; renvoie le dictionnaire de résultats (sérialisable en JSON)."""
+    import numpy
+    import streamlit
+
+    at, froid_ms = _demarrer(paresseux, timeout)
+    sequences = {}
+    for nom, onglet, genre, cle, valeurs in SEQUENCES:
+        durees, pic = _rejouer(at, onglet, genre, cle, valeurs, memoire)
+        sequences[nom] = _resume(durees)
+        if pic is not None:
+            sequences[nom]['pic_python_mo'] = round(pic, 1)
+
+    return {
+        'meta': {
+            'date': datetime.datetime.now().isoformat(timespec="seconds"),
+            'revision': _revision(),
+            'python': platform.python_version(),
+            'streamlit': streamlit.__version__,
+            'numpy': numpy.__version__,
+            'plateforme': platform.platform(),
+            'mode': "paresseux" if paresseux else "complet",
+        },
+        'demarrage_a_froid_ms': round(froid_ms, 1),
+        'rss_max_mo': round(_rss_max_mo(), 1),
+        'sequences': sequences,
+    }
+
+
+def comparer(resultats, reference, seuil=0.2):
+    """Lignes de comparaison et liste des régressions (médiane > référence × (1 + seuil))."""
+    lignes, regressions = [], []
+    paires = [("démarrage à froid", resultats['demarrage_a_froid_ms'], reference.get('demarrage_a_froid_ms'))]
+    paires += [(nom, r['mediane_ms'], reference.get('sequences', {}).get(nom, {}).get('mediane_ms'))
+               for nom, r in resultats['sequences'].items()]
+    for nom, actuel, avant in paires:
+        if not avant:
+            lignes.append(f"{nom:<20} {actuel:>9.1f} ms   (pas de référence)")
+            continue
+        ratio = actuel / avant
+        drapeau = "  <-- RÉGRESSION" if ratio > 1 + seuil else ""
+        lignes.append(f"{nom:<20} {actuel:>9.1f} ms   réf. {avant:>9.1f} ms   x{ratio:.2f}{drapeau}")
+        if drapeau:
+            regressions.append(nom)
+    return lignes, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc de latence des reruns de l'application.")
+    parser.add_argument("--sauver", metavar="JSON", help="Écrit les résultats (nouvelle référence)")
+    parser.add_argument("--comparer", metavar="JSON", help="Compare à une référence existante")
+    parser.add_argument("--seuil", type=float, default=0.2, help="Tolérance de régression (défaut : 0.2 = +20 %%)")
+    parser.add_argument("--complet", action="store_true", help="Désactive le rendu paresseux (tous les onglets)")
+    parser.add_argument("--memoire", action="store_true", help="Pic mémoire Python par séquence (tracemalloc, plus lent)")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)  # avertissements du harnais hors contexte de session
+    resultats = mesurer(paresseux=not args.complet, memoire=args.memoire)
+
+    print(f"Démarrage à froid : {resultats['demarrage_a_froid_ms']:.0f} ms   RSS max : {resultats['rss_max_mo']:.0f} Mo")
+    for nom, r in resultats['sequences'].items():
+        print(f"  {nom:<18} médiane {r['mediane_ms']:>7.1f} ms   p95 {r['p95_ms']:>7.1f} ms   max {r['max_ms']:>7.1f} ms")
+
+    code = 0
+    if args.comparer:
+        reference = json.loads(Path(args.comparer).read_text(encoding="utf-8"))
+        lignes, regressions = comparer(resultats, reference, args.seuil)
+        print(f"\nComparaison à {args.comparer} (seuil +{args.seuil:.0%}) :")
+        print("\n".join(lignes))
+        code = 1 if regressions else 0
+    if args.sauver:
+        Path(args.sauver).write_text(json.dumps(resultats, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"\nRésultats écrits dans {args.sauver}")
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Mémoire par session : empreinte du référentiel et croissance mémoire par session ouverte.
+
+    python benchmarks/memoire.py --sessions 20
+
+Les sessions sont simulées par le harnais de test de Streamlit (une instance par
+session, toutes dans le même processus, comme sur le serveur). La croissance est
+mesurée par tracemalloc après ramasse-miettes, divisée par le nombre de sessions.
+"""
+import argparse
+import gc
+import logging
+import sys
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+RACINE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(RACINE))
+
+
+def taille_profonde(objet, vus=None):
+    """Octets occupés par un objet Python et tout ce qu'il référence (tableaux NumPy compris)."""
+    vus = set() if vus is None else vus
+    if id(objet) in vus:
+        return 0
+    vus.add(id(objet))
+    if isinstance(objet, np.ndarray):
+        return sys.getsizeof(objet) + (objet.nbytes if objet.base is None else 0)
+    taille = sys.getsizeof(objet)
+    if hasattr(objet, "items"):
+        taille += sum(taille_profonde(k, vus) + taille_profonde(v, vus) for k, v in objet.items())
+    elif isinstance(objet, (list, tuple, set, frozenset)):
+        taille += sum(taille_profonde(v, vus) for v in objet)
+    return taille
+
+
+def empreinte_referentiel():
+    """Octets des tables sources (listes de dicts) et des structures colonnaires partagées."""
+    import referentiel
+
+    sources = [getattr(referentiel, nom) for nom in
+               ("filières_db", "potentiels_regionaux", "prefectures_base", "communes_base", "normes",
+                "poids_par_culture", "poids_defaut")]
+    colonnes = [getattr(referentiel, nom) for nom in
+                ("PREFECTURES", "COMMUNES", "POTENTIELS", "POIDS_REGIONAUX", "FILIERES") if hasattr(referentiel, nom)]
+    return taille_profonde(sources), taille_profonde(colonnes) if colonnes else None
+
+
+def croissance_par_session(n_sessions, timeout=120):
+    """Octets alloués (et conservés) par session ouverte, après le premier rendu."""
+    from streamlit.testing.v1 import AppTest
+
+    application = str(RACINE / "app.py")
+    # Session d'amorçage : imports, caches de processus et géométrie ne comptent pas
+    AppTest.from_file(application, default_timeout=timeout).run()
+    gc.collect()
+    tracemalloc.start()
+    avant = tracemalloc.get_traced_memory()[0]
+    sessions = [AppTest.from_file(application, default_timeout=timeout).run() for _ in range(n_sessions)]
+    gc.collect()
+    apres = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert all(not at.exception for at in sessions)
+    return (apres - avant) / n_sessions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mémoire du référentiel et par session.")
+    parser.add_argument("--sessions", type=int, default=20)
+    args = parser.parse_args(argv)
+    logging.disable(logging.WARNING)
+
+    sources, colonnes = empreinte_referentiel()
+    print(f"Référentiel, tables sources : {sources / 1024:.1f} Ko")
+    if colonnes is not None:
+        print(f"Référentiel, colonnes partagées : {colonnes / 1024:.1f} Ko (une fois par processus)")
+    print(f"Croissance par session ({args.sessions} sessions) : {croissance_par_session(args.sessions) / 1024:.1f} Ko")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Cache mémoire borné (LRU + TTL) pour les tableaux et figures dérivés.
+
+Les caches vivent au niveau du processus : ils survivent aux reruns Streamlit et
+sont partagés par toutes les sessions. Chaque cache tient ses compteurs de
+succès (hits), d'échecs (misses), d'évictions et d'expirations.
+"""
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+_REGISTRE = {}
+
+
+class CacheLRU:
+    """Dictionnaire borné : éviction du moins récemment utilisé, expiration après `ttl` secondes."""
+
+    def __init__(self, nom, taille_max=64, ttl=None, horloge=time.monotonic, depend_de=()):
+        self.nom = nom
+        self.depend_de = frozenset(depend_de)  # Tables du référentiel lues par le calcul
+        self.taille_max = taille_max
+        self.ttl = ttl
+        self._horloge = horloge
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+        self._generation = 0  # Incrémentée par vider() : un calcul commencé avant n'est pas stocké
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def obtenir(self, cle, calcul):
+        """Renvoie la valeur associée à `cle`, ou la calcule avec `calcul()` et la stocke."""
+        maintenant = self._horloge()
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is not None:
+                valeur, echeance = entree
+                if echeance is None or echeance > maintenant:
+                    self._entrees.move_to_end(cle)
+                    self.hits += 1
+                    return valeur
+                del self._entrees[cle]
+                self.expirations += 1
+            self.misses += 1
+            generation = self._generation
+
+        # Calcul hors verrou : une session lente ne bloque pas les autres
+        valeur = calcul()
+        echeance = None if self.ttl is None else self._horloge() + self.ttl
+        with self._verrou:
+            if generation != self._generation:
+                # Cache vidé pendant le calcul (rechargement du référentiel) : la valeur est
+                # rendue à l'appelant mais peut reposer sur les anciennes tables
+                return valeur
+            self._entrees[cle] = (valeur, echeance)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+                self.evictions += 1
+        return valeur
+
+    def vider(self):
+        with self._verrou:
+            self._entrees.clear()
+            self._generation += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'taille': len(self._entrees), 'taille_max': self.taille_max, 'ttl': self.ttl,
+            'hits': self.hits, 'misses': self.misses,
+            'evictions': self.evictions, 'expirations': self.expirations,
+            'taux_hit': self.hits / total if total else 0.0,
+        }
+
+
+def _cle(valeur):
+    """Clé hachable pour les arguments usuels (scalaires, séquences, dicts, tableaux NumPy)."""
+    if isinstance(valeur, np.ndarray):
+        return ('ndarray', valeur.shape, valeur.dtype.str, valeur.tobytes())
+    if isinstance(valeur, np.generic):
+        return valeur.item()
+    if isinstance(valeur, dict):
+        return ('dict',) + tuple(sorted((k, _cle(v)) for k, v in valeur.items()))
+    if isinstance(valeur, (list, tuple)):
+        return (type(valeur).__name__,) + tuple(_cle(v) for v in valeur)
+    return valeur
+
+
+def memoiser(taille_max=64, ttl=3600, nom=None, depend_de=()):
+    """Décorateur : mémoïse une fonction pure sur ses arguments réels.
+
+    Les valeurs renvoyées sont partagées entre sessions : l'appelant ne doit pas
+    les modifier en place. `depend_de` nomme les tables du référentiel que la fonction
+    lit en plus de ses arguments (voir `invalider`).
+    """
+    def decorateur(fonction):
+        cache = CacheLRU(nom or fonction.__qualname__, taille_max=taille_max, ttl=ttl, depend_de=depend_de)
+        _REGISTRE[cache.nom] = cache
+
+        @functools.wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            cle = (_cle(args), _cle(kwargs))
+            return cache.obtenir(cle, lambda: fonction(*args, **kwargs))
+
+        enveloppe.cache = cache
+        return enveloppe
+    return decorateur
+
+
+def statistiques():
+    """Compteurs de tous les caches déclarés, par nom."""
+    return {nom: cache.stats() for nom, cache in _REGISTRE.items()}
+
+
+def vider_tout():
+    for cache in _REGISTRE.values():
+        cache.vider()
+
+
+def invalider(tables):
+    """Vide les caches qui dépendent d'une des tables du référentiel rechargées."""
+    tables = set(tables)
+    for cache in _REGISTRE.values():
+        if cache.depend_de & tables:
+            cache.vider()
@@ -0,0 +1,537 @@
+"""Calibration des filières sur des séries FAOSTAT locales (fichiers en vrac, format normalisé).
+
+Les coefficients de referentiel.filières_db (`prod`, `ratio_besoin`, `coef_roi`,
+`seuil_fao`, `prix_import`) sont des hypothèses. Ce module lit les fichiers FAOSTAT
+téléchargés en vrac (production, échanges, bilans alimentaires, dépenses publiques ;
+colonnes Area, Item, Element, Year, Unit, Value), par blocs typés : seules les lignes
+du pays et des produits suivis sont gardées, si bien que la mémoire reste bornée quelle
+que soit la taille des fichiers (plusieurs Go). Les coefficients sont ajustés sur les
+`fenetre` dernières années par moindres carrés (estimateurs de rapport, vectorisés sur
+les filières) avec un intervalle bootstrap ; avec une série de pluie (`--pluie`), la
+sensibilité au déficit hydrique de l'onglet 2 est ajustée sur les écarts de rendement.
+
+Chaque calibration est écrite dans un nouveau fichier versionné
+`donnees/calibration/calibration-vNNN.json` (ou UPDIA_CALIBRATION), jamais réécrit ;
+referentiel.synchroniser applique la dernière version au démarrage et à chaud. Le
+fichier garde les observations retenues et, pour chaque source, la taille déjà lue et
+une empreinte de sa fin : si des années ont seulement été ajoutées en fin de fichier,
+seule la suite est lue au recalibrage.
+
+    python calibration.py faostat.csv --generer 2000000      # fichiers d'exemple (et pluie)
+    python calibration.py faostat.csv --pluie faostat-pluie.csv
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+import moteur
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:  # Lecture par blocs pandas, plus lente
+    pa = pc = pa_csv = None
+
+# --- 1. CORRESPONDANCES FAOSTAT ---
+DOSSIER_DEFAUT = Path(__file__).resolve().parent / "donnees" / "calibration"
+PAYS = "Guinea"
+# Produit FAOSTAT → (filière, facteur vers l'équivalent du produit récolté)
+ITEMS = {
+    'Rice': ('Riz', 1.0), 'Rice, paddy': ('Riz', 1.0), 'Rice, milled': ('Riz', 1 / 0.667),
+    'Rice, broken': ('Riz', 1 / 0.667), 'Rice, husked': ('Riz', 1 / 0.8), 'Rice and products': ('Riz', 1.0),
+    'Maize (corn)': ('Maïs', 1.0), 'Maize': ('Maïs', 1.0), 'Maize and products': ('Maïs', 1.0),
+    'Fonio': ('Fonio', 1.0), 'Fonio and products': ('Fonio', 1.0),
+    'Cassava, fresh': ('Cassave', 1.0), 'Cassava': ('Cassave', 1.0), 'Cassava, dry': ('Cassave', 1 / 0.35),
+    'Cassava and products': ('Cassave', 1.0),
+    # Dépenses publiques agricoles (domaine « Government Expenditure ») : série nationale
+    'Agriculture, forestry, fishing': ('*', 1.0),
+}
+# Élément FAOSTAT (en minuscules) → grandeur retenue
+ELEMENTS = {
+    'production': 'production', 'area harvested': 'surface',
+    'import quantity': 'importations', 'export quantity': 'exportations', 'import value': 'valeur_importations',
+    'food supply quantity (kg/capita/yr)': 'disponibilite', 'value us$': 'depense',
+}
+# Unité FAOSTAT (en minuscules) → facteur vers t, ha, USD ou kg/hab/an
+UNITES = {
+    't': 1.0, 'tonnes': 1.0, '1000 t': 1e3, 'ha': 1.0, '1000 ha': 1e3, 'us$': 1.0, '1000 us$': 1e3,
+    'million us$': 1e6, 'millions us$': 1e6, 'kg/cap': 1.0, 'kg': 1.0,
+}
+COLONNES = ('Area', 'Item', 'Element', 'Year', 'Unit', 'Value')
+CHAMPS_CALIBRES = ('prod', 'ratio_besoin', 'coef_roi', 'seuil_fao', 'prix_import')
+FENETRE = 10
+TIRAGES = 2000
+TAILLE_BLOC = 1 << 20          # octets par bloc (pyarrow) : ≈ 40 Mo de mémoire Arrow au plus
+LIGNES_BLOC = 500_000          # lignes par bloc (pandas)
+OCTETS_EMPREINTE = 1 << 16     # fin de la partie déjà lue, comparée au recalibrage
+MIN_ANNEES_CLIMAT = 5
+# Sensibilités de moteur.py avant toute calibration (referentiel importe ce module avant d'en appliquer une)
+SENSIBILITE_INTEGREE = moteur.SENSIBILITE_SOL.copy()
+
+
+def dossier_defaut():
+    return Path(os.environ.get("UPDIA_CALIBRATION") or DOSSIER_DEFAUT)
+
+
+# --- 2. LECTURE PAR BLOCS ---
+
+def _en_tete(chemin, encodage):
+    with open(chemin, "rb") as f:
+        ligne = f.readline().decode(encodage).strip()
+    return [c.strip().strip('"') for c in ligne.split(",")]
+
+
+def _empreinte_fin(chemin, taille):
+    """Empreinte des OCTETS_EMPREINTE derniers octets d'une partie de fichier déjà lue."""
+    with open(chemin, "rb") as f:
+        f.seek(max(0, taille - OCTETS_EMPREINTE))
+        return hashlib.sha1(f.read(taille - f.tell())).hexdigest()
+
+
+def _blocs_pyarrow(f, en_tete, debut, encodage):
+    lecture = pa_csv.ReadOptions(block_size=TAILLE_BLOC, encoding=encodage,
+                                 column_names=en_tete if debut else None)
+    types = {c: pa.dictionary(pa.int32(), pa.string()) for c in ('Area', 'Item', 'Element', 'Unit')}
+    conversion = pa_csv.ConvertOptions(include_columns=list(COLONNES),
+                                       column_types={**types, 'Year': pa.int16(), 'Value': pa.float64()})
+    pays, items = pa.array([PAYS]), pa.array(list(ITEMS))
+    for lot in pa_csv.open_csv(f, read_options=lecture, convert_options=conversion):
+        # Filtre sur les dictionnaires du bloc (quelques centaines de libellés), pas sur les lignes
+        garde = pc.and_(pc.is_in(lot['Area'], value_set=pays), pc.is_in(lot['Item'], value_set=items))
+        if pc.any(garde).as_py():
+            yield lot.filter(garde).to_pandas()
+
+
+def _blocs_pandas(f, en_tete, debut, encodage):
+    import pandas as pd
+
+    lecteur = pd.read_csv(f, chunksize=LIGNES_BLOC, usecols=list(COLONNES), encoding=encodage,
+                          names=en_tete if debut else None, header=None if debut else 'infer',
+                          dtype={'Area': 'category', 'Item': 'category', 'Element': 'category',
+                                 'Unit': 'category', 'Year': 'int16', 'Value': 'float64'})
+    for bloc in lecteur:
+        garde = (bloc['Area'] == PAYS) & bloc['Item'].isin(list(ITEMS))
+        if garde.any():
+            yield bloc[garde]
+
+
+def lire(chemin, etat=None, encodage="latin-1"):
+    """Observations (filiere, grandeur, annee, valeur) d'un fichier FAOSTAT et état de lecture.
+
+    Si `etat` (lecture précédente) correspond encore au début du fichier, seule la suite
+    est lue. Les valeurs sont ramenées aux unités de base et à l'équivalent récolté.
+    """
+    import pandas as pd
+
+    chemin = Path(chemin)
+    taille = chemin.stat().st_size
+    en_tete = _en_tete(chemin, encodage)
+    debut = 0
+    if (etat and etat['en_tete'] == en_tete and etat['taille'] <= taille
+            and _empreinte_fin(chemin, etat['taille']) == etat['empreinte']):
+        debut = etat['taille']
+    morceaux = []
+    if debut < taille:
+        with open(chemin, "rb") as f:
+            f.seek(debut)
+            blocs = _blocs_pyarrow if pa is not None else _blocs_pandas
+            morceaux = list(blocs(f, en_tete, debut, encodage))
+    etat = {'taille': taille, 'en_tete': en_tete, 'empreinte': _empreinte_fin(chemin, taille), 'lu_depuis': debut}
+    if not morceaux:
+        return pd.DataFrame(columns=['filiere', 'grandeur', 'annee', 'valeur']), etat
+
+    df = pd.concat(morceaux, ignore_index=True)
+    for colonne in ('Item', 'Element', 'Unit'):
+        df[colonne] = df[colonne].astype(str)
+    grandeur = df['Element'].str.lower().map(ELEMENTS)
+    unite = df['Unit'].str.lower().map(UNITES)
+    filiere, facteur = zip(*df['Item'].map(ITEMS)) if len(df) else ((), ())
+    df = pd.DataFrame({'filiere': filiere, 'grandeur': grandeur, 'annee': df['Year'].astype(int),
+                       'valeur': df['Value'] * unite * np.array(facteur)})
+    # Les quantités et valeurs s'ajoutent (riz paddy et usiné importés, par exemple)
+    df = df.dropna()
+    return df.groupby(['filiere', 'grandeur', 'annee'], as_index=False)['valeur'].sum(), etat
+
+
+def lire_pluie(chemin):
+    """Série de pluie : colonnes annee (ou Year) et pluie (variation en %, ou Value)."""
+    import pandas as pd
+
+    df = pd.read_csv(chemin)
+    df = df.rename(columns={'Year': 'annee', 'Value': 'pluie'})
+    return dict(zip(df['annee'].astype(int).tolist(), df['pluie'].astype(float).tolist()))
+
+
+# --- 3. AJUSTEMENT (vectorisé sur les filières, bootstrap sur les années) ---
+
+def _rapport(numerateur, denominateur, fenetre, rng, tirages):
+    """Σ numérateur / Σ dénominateur sur les années de la fenêtre de chaque filière, et intervalle 5-95 %.
+
+    `numerateur`, `denominateur` : (filières, années), nuls hors des années utilisables ;
+    `fenetre` : (filières, 2) première et dernière colonne (incluses) de la fenêtre.
+    """
+    n = fenetre[:, 1] - fenetre[:, 0] + 1
+    colonnes = np.arange(numerateur.shape[1])
+    dans = (colonnes >= fenetre[:, :1]) & (colonnes <= fenetre[:, 1:])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        estimation = (numerateur * dans).sum(axis=1) / (denominateur * dans).sum(axis=1)
+        # Années tirées avec remise dans la fenêtre de chaque filière : (tirages, filières, n_max)
+        tirage = fenetre[:, 0][None, :, None] + (rng.random((tirages, len(n), n.max())) * n[None, :, None]).astype(int)
+        tirage = np.where(np.arange(n.max()) < n[:, None], tirage, -1)
+        lignes = np.arange(len(n))[None, :, None]
+        num = np.where(tirage >= 0, numerateur[lignes, tirage], 0).sum(axis=2)
+        den = np.where(tirage >= 0, denominateur[lignes, tirage], 0).sum(axis=2)
+        rapports = num / den
+    # Filière sans aucune donnée : intervalle NaN, sans avertissement
+    bornes = np.full((2, len(n)), np.nan)
+    definies = np.isfinite(rapports).any(axis=0)
+    bornes[:, definies] = np.nanpercentile(rapports[:, definies], [5, 95], axis=0)
+    return estimation, bornes
+
+
+def _tableaux(observations, filieres, annees):
+    """Grandeurs en tableaux (filières × années), NaN si absentes ; la dépense est nationale (années,)."""
+    index_f = {f: i for i, f in enumerate(filieres)}
+    index_a = {a: i for i, a in enumerate(annees)}
+    series = {g: np.full((len(filieres), len(annees)), np.nan) for g in set(ELEMENTS.values()) - {'depense'}}
+    depense = np.full(len(annees), np.nan)
+    for f, g, a, v in observations[['filiere', 'grandeur', 'annee', 'valeur']].itertuples(index=False):
+        if g == 'depense':
+            depense[index_a[a]] = v
+        elif f in index_f:
+            series[g][index_f[f], index_a[a]] = v
+    return series, depense
+
+
+def ajuster(observations, filieres, pluie=None, fenetre=FENETRE, tirages=TIRAGES, graine=0):
+    """Coefficients calibrés par filière, intervalles bootstrap et sensibilité climatique (ou None)."""
+    rng = np.random.default_rng(graine)
+    annees = np.array(sorted(set(observations['annee'])), dtype=int)
+    series, depense = _tableaux(observations, filieres, annees)
+    production = series['production']
+    observee = ~np.isnan(production)
+    connues = observee.any(axis=1)
+    # Fenêtre : les `fenetre` dernières années de production connues de chaque filière
+    derniere = np.where(connues, len(annees) - 1 - np.argmax(observee[:, ::-1], axis=1), 0)
+    bornes_fenetre = np.stack([np.maximum(0, derniere - fenetre + 1), derniere], axis=1)
+    p = np.nan_to_num(production)
+    resultats, intervalles = {}, {}
+
+    def retenir(champ, estimation, bornes, valide):
+        for i, f in enumerate(filieres):
+            if valide[i] and np.isfinite(estimation[i]):
+                # Production en tonnes entières, comme dans le référentiel intégré
+                valeur = float(estimation[i])
+                resultats.setdefault(f, {})[champ] = round(valeur) if champ == 'prod' else valeur
+                intervalles.setdefault(f, {})[champ] = [float(bornes[0, i]), float(bornes[1, i])]
+
+    # Production : dernière année connue
+    retenir('prod', p[np.arange(len(filieres)), derniere], np.stack([p[np.arange(len(filieres)), derniere]] * 2), connues)
+    annee_prod = {f: int(annees[derniere[i]]) for i, f in enumerate(filieres) if connues[i]}
+
+    # Besoin = consommation apparente (production + importations - exportations) ; pente à l'origine,
+    # sur les seules années où les échanges sont renseignés
+    besoin = p + np.nan_to_num(series['importations']) - np.nan_to_num(series['exportations'])
+    bilan = observee & ~np.isnan(series['importations'])
+    retenir('ratio_besoin', *_rapport(besoin * p * bilan, p ** 2 * bilan, bornes_fenetre, rng, tirages),
+            bilan.any(axis=1))
+
+    # Prix d'import : valeur totale / quantité totale (USD par tonne équivalent récolté)
+    quantite, valeur = series['importations'], series['valeur_importations']
+    echange = ~np.isnan(quantite) & ~np.isnan(valeur) & (np.nan_to_num(quantite) > 0)
+    retenir('prix_import', *_rapport(np.where(echange, valeur, 0), np.where(echange, quantite, 0),
+                                     bornes_fenetre, rng, tirages), echange.any(axis=1))
+
+    # Seuil : disponibilité alimentaire moyenne observée (kg/hab/an)
+    dispo = series['disponibilite']
+    observe = ~np.isnan(dispo)
+    retenir('seuil_fao', *_rapport(np.nan_to_num(dispo), observe.astype(float), bornes_fenetre, rng, tirages),
+            observe.any(axis=1))
+
+    climat = None
+    if pluie and 'surface' in series:
+        climat = _ajuster_climat(production, series['surface'], annees, pluie, rng, tirages)
+
+    # Rendement de la dépense : hausse de production de l'année ~ dépense de l'année précédente
+    # (Mds GNF, répartie au prorata de la production), pente avec constante (écarts aux moyennes).
+    # Avec une sensibilité ajustée, la production est d'abord ramenée à une pluie normale :
+    # sinon les chocs de pluie d'une année sur l'autre masquent l'effet de la dépense.
+    if not np.isnan(depense).all():
+        ramenee = production
+        if climat:
+            v = np.nan_to_num(np.array([pluie.get(int(a), 0.0) for a in annees]) / 100)
+            ramenee = production / (1 + climat['sensibilite_nationale'] * np.minimum(v, 0) + np.maximum(v, 0))
+        part = p / np.maximum(p.sum(axis=0), 1)
+        x = np.full_like(p, np.nan)
+        x[:, 1:] = depense[None, :-1] * moteur.TAUX_CHANGE_GNF / 1e9 * part[:, :-1]
+        dp = np.full_like(p, np.nan)
+        dp[:, 1:] = ramenee[:, 1:] - ramenee[:, :-1]
+        utile = ~np.isnan(x) & ~np.isnan(dp)
+        dans = utile & (np.arange(len(annees)) >= bornes_fenetre[:, :1]) & (np.arange(len(annees)) <= bornes_fenetre[:, 1:])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            moy_x = np.where(dans, x, 0).sum(axis=1) / dans.sum(axis=1)
+            moy_dp = np.where(dans, dp, 0).sum(axis=1) / dans.sum(axis=1)
+        ex, edp = np.where(utile, x - moy_x[:, None], 0), np.where(utile, dp - moy_dp[:, None], 0)
+        estimation, bornes = _rapport(ex * edp, ex ** 2, bornes_fenetre, rng, tirages)
+        # Pente non significative (borne basse ≤ 0) : le coefficient en place est conservé
+        retenir('coef_roi', estimation, bornes, (dans.sum(axis=1) >= 3) & (bornes[0] > 0))
+
+    return resultats, intervalles, annee_prod, climat
+
+
+def _ajuster_climat(production, surface, annees, pluie, rng, tirages):
+    """Sensibilité au déficit de pluie : écart du rendement à sa tendance ~ déficit (%), toutes filières."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rendement = production / surface
+    valide = np.isfinite(rendement) & (rendement > 0)
+    v = np.array([pluie.get(int(a), np.nan) for a in annees]) / 100
+    # Modèle de l'onglet 2 : rendement = tendance × (1 + sens · min(v, 0) + max(v, 0)) ; seul le déficit est ajusté
+    x = np.broadcast_to(np.minimum(v, 0), rendement.shape)
+    utile = valide & np.isfinite(x) & (x < 0)
+    annees_seches = len(set(np.nonzero(utile)[1]))
+    if annees_seches < MIN_ANNEES_CLIMAT:
+        return None
+    t = np.where(valide, annees - annees.mean(), 0.0)
+    n = valide.sum(axis=1)
+    sens = SENSIBILITE_INTEGREE.mean()
+    # Tendance et sensibilité ajustées tour à tour : la tendance log-linéaire de chaque filière
+    # est estimée sur les rendements corrigés du climat, puis la sensibilité sur les écarts à la tendance
+    for _ in range(30):
+        climat = np.maximum(1 + sens * np.nan_to_num(x) + np.maximum(np.nan_to_num(v), 0), 1e-3)
+        y = np.where(valide, np.log(np.where(valide, rendement, 1) / climat), 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            pente = (n * (t * y).sum(1) - t.sum(1) * y.sum(1)) / (n * (t ** 2).sum(1) - t.sum(1) ** 2)
+            ordonnee = (y.sum(1) - pente * t.sum(1)) / n
+            z = rendement / np.exp(ordonnee[:, None] + pente[:, None] * t) - 1 - np.maximum(v, 0)
+        num = np.where(utile, x * z, 0).sum(axis=0, keepdims=True)  # toutes les filières : une ligne sur les années
+        den = np.where(utile, x ** 2, 0).sum(axis=0, keepdims=True)
+        precedente, sens = sens, float(num.sum() / den.sum())
+        if abs(sens - precedente) < 1e-6:
+            break
+    _, bornes = _rapport(num, den, np.array([[0, len(annees) - 1]]), rng, tirages)
+    # Les écarts entre sols sont gardés : les trois sensibilités sont mises à l'échelle nationale
+    echelle = sens / SENSIBILITE_INTEGREE.mean()
+    return {'sensibilite_sol': (SENSIBILITE_INTEGREE * echelle).round(4).tolist(),
+            'sensibilite_nationale': sens, 'intervalle': bornes[:, 0].tolist(), 'annees_deficit': annees_seches}
+
+
+# --- 4. FICHIERS VERSIONNÉS ---
+
+def versions(dossier=None):
+    """Fichiers de calibration du dossier, du plus ancien au plus récent : [(version, chemin)]."""
+    dossier = Path(dossier) if dossier else dossier_defaut()
+    trouves = []
+    for chemin in dossier.glob("calibration-v*.json"):
+        numero = chemin.stem.rsplit("-v", 1)[1]
+        if numero.isdigit():
+            trouves.append((int(numero), chemin))
+    return sorted(trouves)
+
+
+def derniere(dossier=None):
+    """Chemin de la dernière version (None si aucune)."""
+    trouves = versions(dossier)
+    return trouves[-1][1] if trouves else None
+
+
+def charger(chemin):
+    contenu = json.loads(Path(chemin).read_text(encoding="utf-8"))
+    inconnus = {c for champs in contenu.get('filieres', {}).values() for c in champs} - set(CHAMPS_CALIBRES)
+    if inconnus:
+        raise ValueError(f"{Path(chemin).name} : champs inconnus {', '.join(sorted(inconnus))}")
+    return contenu
+
+
+def _ecrire(contenu, dossier):
+    """Écrit la version suivante ; une version existante n'est jamais remplacée."""
+    dossier.mkdir(parents=True, exist_ok=True)
+    trouves = versions(dossier)
+    contenu['version'] = (trouves[-1][0] if trouves else 0) + 1
+    chemin = dossier / f"calibration-v{contenu['version']:03d}.json"
+    provisoire = chemin.with_suffix(f".{os.getpid()}.tmp")
+    provisoire.write_text(json.dumps(contenu, ensure_ascii=False, indent=1), encoding="utf-8")
+    try:
+        os.link(provisoire, chemin)  # Échoue si une autre calibration a pris ce numéro entre-temps
+    finally:
+        provisoire.unlink()
+    return chemin
+
+
+def calibrer(chemins, pluie=None, dossier=None, complet=False, fenetre=FENETRE, tirages=TIRAGES, encodage="latin-1"):
+    """Lit les sources (seulement leur suite si possible), réajuste et écrit une nouvelle version.
+
+    Renvoie (chemin écrit ou None si rien n'a changé, contenu).
+    """
+    import pandas as pd
+    import referentiel
+
+    dossier = Path(dossier) if dossier else dossier_defaut()
+    precedent = None if complet or derniere(dossier) is None else charger(derniere(dossier))
+    anciennes = pd.DataFrame(precedent['observations'] if precedent else [],
+                             columns=['source', 'filiere', 'grandeur', 'annee', 'valeur'])
+    etats_precedents = precedent['sources'] if precedent else {}
+    nouvelles, etats = [], {}
+    for chemin in chemins:
+        cle = str(Path(chemin).resolve())
+        obs, etats[cle] = lire(chemin, etats_precedents.get(cle), encodage)
+        nouvelles.append(obs.assign(source=cle))
+    # Clés JSON : les années de la série de pluie sont relues en entiers
+    pluie_serie = lire_pluie(pluie) if pluie else {int(a): v for a, v in ((precedent or {}).get('pluie') or {}).items()}
+    pluie_precedente = {int(a): v for a, v in ((precedent or {}).get('pluie') or {}).items()}
+    if (precedent and set(etats) == set(etats_precedents) and pluie_serie == pluie_precedente
+            and all(e['lu_depuis'] == e['taille'] for e in etats.values())):
+        return None, precedent
+    # Une source relue en entier remplace ses observations, une suite s'y ajoute ; une source
+    # absente de la liste est retirée. Une année relue dans la suite remplace l'ancienne valeur.
+    suites = {c for c, e in etats.items() if e['lu_depuis'] > 0}
+    anciennes = anciennes[anciennes['source'].isin(suites)]
+    observations = pd.concat([anciennes, *nouvelles], ignore_index=True).drop_duplicates(
+        ['source', 'filiere', 'grandeur', 'annee'], keep='last')
+    # Plusieurs sources peuvent porter la même grandeur : la somme vaut pour les produits distincts
+    agregees = observations.groupby(['filiere', 'grandeur', 'annee'], as_index=False)['valeur'].sum()
+
+    filieres = list(referentiel.filières_db)
+    resultats, intervalles, annee_prod, climat = ajuster(agregees, filieres, pluie_serie or None, fenetre, tirages)
+    contenu = {
+        'cree': datetime.now().isoformat(timespec='seconds'), 'pays': PAYS, 'fenetre': fenetre,
+        'filieres': resultats, 'intervalles': intervalles, 'annee_production': annee_prod, 'climat': climat,
+        'sources': etats, 'pluie': {str(a): v for a, v in pluie_serie.items()} or None,
+        'observations': observations[['source', 'filiere', 'grandeur', 'annee', 'valeur']].to_dict('records'),
+    }
+    return _ecrire(contenu, dossier), contenu
+
+
+# --- 5. FICHIER D'EXEMPLE ---
+
+def generer(chemin, n_lignes, graine=0):
+    """Fichier FAOSTAT synthétique (`n_lignes` lignes, tous pays) et sa série de pluie (`<nom>-pluie.csv`).
+
+    Les lignes du pays suivent le référentiel intégré : production finale, besoin, prix et
+    seuil (bruit de 3 %, 1 % sur surfaces et productions), sensibilité au déficit de pluie
+    de 1,5 et, depuis 2012, une dépense publique irrégulière dont chaque milliard de GNF
+    ajoute `coef_roi` tonnes à la production de l'année suivante : la calibration doit
+    retrouver chacun de ces coefficients.
+    """
+    import pandas as pd
+    import referentiel
+
+    rng = np.random.default_rng(graine)
+    annees = np.arange(1990, moteur.ANNEE_ACTUELLE - 2)
+    pluie = rng.normal(0, 15, len(annees)).round(1)
+    pd.DataFrame({'annee': annees, 'pluie': pluie}).to_csv(Path(chemin).with_name(f"{Path(chemin).stem}-pluie.csv"),
+                                                           index=False)
+    lignes = []
+    # Budgets « stop and go » : la dépense varie assez d'une année sur l'autre pour que son
+    # effet se distingue du bruit sur une fenêtre de 10 ans
+    programme = annees >= 2012
+    depense = np.where(programme, rng.choice([2e6, 40e6], len(annees)), 0.0)  # USD
+    lignes += [(PAYS, 'Agriculture, forestry, fishing', 'Value US$', a, 'million US$', d / 1e6)
+               for a, d in zip(annees[programme], depense[programme])]
+    t = annees - annees[-1]
+    total = sum(f['prod'] for f in referentiel.filières_db.values())
+    for culture, item in (('Riz', 'Rice'), ('Maïs', 'Maize (corn)'), ('Fonio', 'Fonio'), ('Cassave', 'Cassava, fresh')):
+        d = referentiel.filières_db[culture]
+        bruit = lambda ecart=0.03: rng.normal(1, ecart, len(annees))
+        climat = 1 + 1.5 * np.minimum(pluie, 0) / 100 + np.maximum(pluie, 0) / 100
+        # Gain cumulé de la dépense des années précédentes (Mds GNF au prorata de la filière)
+        gain = d['coef_roi'] * np.concatenate([[0.0], np.cumsum(depense * moteur.TAUX_CHANGE_GNF / 1e9)[:-1]])
+        gain *= d['prod'] / total
+        surface = (d['prod'] - gain[-1]) / 1.5 * 1.02 ** t * bruit(0.01)
+        production = (surface * 1.5 * 1.01 ** t + gain) * climat * bruit(0.01)
+        besoin = production * d['ratio_besoin'] * bruit()
+        importations = np.maximum(besoin - production, 0)
+        for a, s, p, imp, dispo in zip(annees, surface, production, importations, d['seuil_fao'] * bruit()):
+            lignes += [(PAYS, item, 'Area harvested', a, 'ha', s), (PAYS, item, 'Production', a, 't', p),
+                       (PAYS, item, 'Import quantity', a, 't', imp), (PAYS, item, 'Export quantity', a, 't', 0.0),
+                       (PAYS, item, 'Import value', a, '1000 US$', imp * d['prix_import'] / 1e3 * rng.normal(1, 0.03)),
+                       (PAYS, f"{item.split(',')[0].split(' (')[0]} and products",
+                        'Food supply quantity (kg/capita/yr)', a, 'kg/cap', dispo)]
+    pays = pd.DataFrame(lignes, columns=list(COLONNES))
+    # Autres pays et produits : le reste du fichier, écrit par blocs
+    items = list(ITEMS) + [f"Produit {i}" for i in range(200)]
+    elements = ['Production', 'Area harvested', 'Yield', 'Import quantity', 'Export quantity', 'Import value']
+    autres = max(1, n_lignes - len(pays))
+    position = rng.integers(0, autres)
+    with open(chemin, "w", encoding="latin-1", newline="") as f:
+        f.write("Area Code,Area,Item Code,Item,Element Code,Element,Year Code,Year,Unit,Value,Flag\n")
+        ecrites = 0
+        while ecrites < autres:
+            n = min(LIGNES_BLOC, autres - ecrites)
+            bloc = pd.DataFrame({
+                'Area Code': rng.integers(1, 250, n), 'Area': [f"Pays {i:03d}" for i in rng.integers(1, 250, n)],
+                'Item Code': rng.integers(1, 2000, n), 'Item': np.array(items)[rng.integers(0, len(items), n)],
+                'Element Code': rng.integers(5000, 6000, n),
+                'Element': np.array(elements)[rng.integers(0, len(elements), n)],
+                'Year Code': rng.integers(1961, 2024, n), 'Year': rng.integers(1961, 2024, n),
+                'Unit': 't', 'Value': rng.uniform(0, 1e6, n).round(2), 'Flag': 'A',
+            })
+            if ecrites <= position < ecrites + n:
+                # Les lignes du pays forment un seul passage du fichier, comme dans un export trié par pays
+                guinee = pays.assign(**{'Area Code': 108, 'Item Code': 0, 'Element Code': 0, 'Flag': 'A'})
+                guinee['Year Code'] = guinee['Year']
+                bloc = pd.concat([bloc.iloc[:position - ecrites], guinee[bloc.columns], bloc.iloc[position - ecrites:]])
+            bloc.to_csv(f, header=False, index=False)
+            ecrites += n
+    return len(pays)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibration des filières sur des fichiers FAOSTAT locaux.")
+    parser.add_argument("fichiers", nargs="+", help="Fichiers FAOSTAT en vrac (CSV normalisé)")
+    parser.add_argument("--pluie", help="Série de pluie (annee, pluie en %% de variation)")
+    parser.add_argument("--dossier", help="Dossier des versions (défaut : donnees/calibration)")
+    parser.add_argument("--complet", action="store_true", help="Relit toutes les sources en entier")
+    parser.add_argument("--fenetre", type=int, default=FENETRE, help="Années ajustées (les plus récentes)")
+    parser.add_argument("--tirages", type=int, default=TIRAGES, help="Tirages bootstrap")
+    parser.add_argument("--encodage", default="latin-1")
+    parser.add_argument("--generer", type=int, metavar="N", help="Écrit un fichier d'exemple de N lignes et quitte")
+    args = parser.parse_args(argv)
+
+    if args.generer:
+        debut = time.perf_counter()
+        n_pays = generer(args.fichiers[0], args.generer)
+        print(f"{args.fichiers[0]} : {args.generer:,} lignes dont {n_pays} pour {PAYS} "
+              f"({Path(args.fichiers[0]).stat().st_size / 2 ** 20:.0f} Mo, {time.perf_counter() - debut:.1f} s)")
+        return 0
+
+    import resource
+
+    debut = time.perf_counter()
+    chemin, contenu = calibrer(args.fichiers, args.pluie, args.dossier, args.complet, args.fenetre, args.tirages,
+                               args.encodage)
+    duree = time.perf_counter() - debut
+    if chemin is None:
+        print(f"Sources inchangées : version {contenu['version']} à jour ({duree:.2f} s).")
+        return 0
+    octets = sum(e['taille'] - e['lu_depuis'] for e in contenu['sources'].values())
+    print(f"{chemin} : {octets / 2 ** 20:,.1f} Mo lus en {duree:.2f} s ({octets / 2 ** 20 / max(duree, 1e-9):,.0f} Mo/s), "
+          f"mémoire résidente maximale {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} Mo")
+    print(f"{'Filière':<9}" + "".join(f"{c:>24}" for c in CHAMPS_CALIBRES))
+    for f, champs in contenu['filieres'].items():
+        cellules = []
+        for c in CHAMPS_CALIBRES:
+            if c not in champs:
+                cellules.append(f"{'—':>24}")
+                continue
+            bas, haut = contenu['intervalles'][f][c]
+            texte = f"{champs[c]:,.4g}" + ("" if c == 'prod' else f" [{bas:,.3g}-{haut:,.3g}]")
+            cellules.append(f"{texte:>24}")
+        print(f"{f:<9}" + "".join(cellules))
+    if contenu['climat']:
+        c = contenu['climat']
+        print(f"Sensibilité au déficit de pluie : {c['sensibilite_nationale']:.2f} "
+              f"[{c['intervalle'][0]:.2f}-{c['intervalle'][1]:.2f}] sur {c['annees_deficit']} années sèches "
+              f"→ SENSIBILITE_SOL {c['sensibilite_sol']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Carte hors ligne des préfectures : choroplèthe sur une géométrie locale, sans tuiles distantes.
+
+La géométrie (static/prefectures.geojson, propriété `Pref`) est servie une seule fois
+par le serveur statique de Streamlit (.streamlit/config.toml) : la figure ne contient
+alors que son URL et les valeurs par préfecture, le navigateur garde le fichier en cache.
+
+Le fichier livré est schématique : zones d'influence des chefs-lieux (cellules de
+Voronoï, bornées à DISTANCE_MAX_DEG comme l'index NDVI), simplifiées au millième
+de degré. Un fichier de limites officielles ayant la même propriété `Pref` peut le
+remplacer tel quel. À régénérer si l'entrepôt du référentiel modifie les préfectures.
+
+    python carte.py --generer   # régénère static/prefectures.geojson
+"""
+import argparse
+import functools
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+import referentiel
+from ndvi import DISTANCE_MAX_DEG
+
+FICHIER_GEOMETRIE = Path(__file__).resolve().parent / "static" / "prefectures.geojson"
+URL_GEOMETRIE = "app/static/prefectures.geojson"
+EMPRISE = (-15.1, 7.1, -7.6, 12.7)  # lon min, lat min, lon max, lat max
+
+
+def _decouper(polygone, normale, seuil):
+    """Sutherland-Hodgman : garde la partie du polygone où normale·p <= seuil."""
+    if len(polygone) == 0:
+        return polygone
+    cote = polygone @ normale - seuil
+    suivant = np.roll(polygone, -1, axis=0)
+    cote_suivant = np.roll(cote, -1)
+    points = []
+    for p, q, a, b in zip(polygone, suivant, cote, cote_suivant):
+        if a <= 0:
+            points.append(p)
+        if (a <= 0) != (b <= 0):
+            points.append(p + (q - p) * (a / (a - b)))
+    return np.array(points)
+
+
+def zones_influence(rayon_deg=DISTANCE_MAX_DEG, n_cotes=24, decimales=3):
+    """GeoJSON des zones d'influence des chefs-lieux (même partition que ndvi.index_prefectures)."""
+    prefectures = referentiel.PREFECTURES
+    lat, lon = prefectures['lat'], prefectures['lon']
+    cos_lat = np.cos(np.radians(lat.mean()))
+    # Plan équivalent : x = lon·cos(lat moyenne), y = lat (distances de ndvi._affecter)
+    centres = np.column_stack([lon * cos_lat, lat])
+    angles = np.linspace(0, 2 * np.pi, n_cotes, endpoint=False)
+    cercle = rayon_deg * np.column_stack([np.cos(angles), np.sin(angles)])
+    lon_min, lat_min, lon_max, lat_max = EMPRISE
+    bords = [((-1, 0), -lon_min * cos_lat), ((1, 0), lon_max * cos_lat), ((0, -1), -lat_min), ((0, 1), lat_max)]
+
+    entites = []
+    for i, centre in enumerate(centres):
+        polygone = centre + cercle
+        for normale, seuil in bords:
+            polygone = _decouper(polygone, np.array(normale, dtype=float), seuil)
+        for j, autre in enumerate(centres):
+            if j != i:
+                # Demi-plan des points plus proches de `centre` que de `autre`
+                normale = autre - centre
+                polygone = _decouper(polygone, normale, normale @ (centre + autre) / 2)
+        anneau = np.column_stack([polygone[:, 0] / cos_lat, polygone[:, 1]]).round(decimales)
+        anneau = np.vstack([anneau, anneau[:1]])
+        entites.append({
+            'type': "Feature",
+            'properties': {'Pref': str(prefectures['pref'][i]), 'Region': referentiel.REGIONS[prefectures['region'][i]]},
+            'geometry': {'type': "Polygon", 'coordinates': [anneau.tolist()]},
+        })
+    return {'type': "FeatureCollection", 'features': entites}
+
+
+@functools.lru_cache(maxsize=1)
+def geometrie():
+    """GeoJSON des préfectures, lu une fois par processus (à ne pas modifier)."""
+    return json.loads(FICHIER_GEOMETRIE.read_text(encoding="utf-8"))
+
+
+def octets_geometrie():
+    return FICHIER_GEOMETRIE.stat().st_size
+
+
+def octets_json(fig):
+    """Taille (octets) de la figure sérialisée, telle qu'envoyée au navigateur."""
+    return len(fig.to_json().encode("utf-8"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Géométrie des préfectures pour la carte hors ligne.")
+    parser.add_argument("--generer", action="store_true", help="Régénère static/prefectures.geojson")
+    args = parser.parse_args(argv)
+    if args.generer:
+        referentiel.synchroniser()
+        FICHIER_GEOMETRIE.parent.mkdir(exist_ok=True)
+        FICHIER_GEOMETRIE.write_text(json.dumps(zones_influence(), ensure_ascii=False, separators=(",", ":")),
+                                     encoding="utf-8")
+    print(f"{FICHIER_GEOMETRIE} : {octets_geometrie() / 1024:.1f} Ko")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""Risque climatique : simulation Monte Carlo du modèle de rendement de l'onglet 2.
+
+Les anomalies de pluie sont tirées par région et par année jusqu'à l'horizon,
+avec un choc national commun (corrélation inter-régionale) et un choc régional.
+Le rendement sol-climat de moteur.py est évalué sur tout le tableau de tirages
+(float32, par lots) puis agrégé par filière selon les potentiels régionaux.
+
+Les chocs sont tirés par inversion d'une fonction quantile tabulée (2^16 niveaux) :
+un entier 16 bits et une lecture de table par tirage, plusieurs fois plus rapide que
+les générateurs normaux/Student de NumPy pour des millions de valeurs.
+"""
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import moteur
+import referentiel
+
+LOIS = ["Normale", "Student", "Uniforme"]
+NIVEAUX_TABLE = 1 << 16
+
+
+def loi_pluie(loi="Normale", moyenne=0.0, ecart_type=20.0, ddl=5, correlation=0.5, tendance=0.0):
+    """Paramètres de la loi des anomalies de pluie (en %).
+
+    `correlation` : part de variance commune à toutes les régions (choc national).
+    `tendance` : dérive de la moyenne en points de % par an (changement climatique).
+    """
+    if loi not in LOIS:
+        raise ValueError(f"Loi inconnue : {loi!r} (attendu : {', '.join(LOIS)})")
+    if loi == "Student" and ddl <= 2:
+        raise ValueError("La loi de Student exige ddl > 2 (variance finie).")
+    if not 0 <= correlation <= 1:
+        raise ValueError("La corrélation inter-régionale doit être comprise entre 0 et 1.")
+    return {'loi': loi, 'moyenne': moyenne, 'ecart_type': ecart_type, 'ddl': ddl,
+            'correlation': correlation, 'tendance': tendance}
+
+
+@functools.lru_cache(maxsize=16)
+def table_quantiles(loi, ddl=5):
+    """Fonction quantile centrée réduite de la loi, tabulée au milieu de chaque niveau."""
+    if loi == "Uniforme":
+        u = (np.arange(NIVEAUX_TABLE) + 0.5) / NIVEAUX_TABLE
+        table = (u - 0.5) * 2 * np.sqrt(3)
+    else:
+        # Statistiques d'ordre d'un grand échantillon de référence (graine fixe)
+        rng = np.random.default_rng(20262040)
+        n = NIVEAUX_TABLE * 16
+        if loi == "Normale":
+            echantillon = rng.standard_normal(n)
+        else:
+            echantillon = rng.standard_t(ddl, n) * np.sqrt((ddl - 2) / ddl)
+        echantillon.sort()
+        table = echantillon[8::16]
+    table = table.astype(np.float32)
+    table.flags.writeable = False
+    return table
+
+
+def _chocs(rng, forme, parametres):
+    """Chocs centrés réduits (float32) selon la loi choisie."""
+    table = table_quantiles(parametres['loi'], parametres['ddl'])
+    return table[rng.integers(0, NIVEAUX_TABLE, forme, dtype=np.uint16)]
+
+
+def tirer_anomalies(rng, n_tirages, n_annees, parametres, n_regions=None):
+    """Anomalies de pluie (%) de forme (tirages, années, régions)."""
+    n_regions = len(referentiel.REGIONS) if n_regions is None else n_regions
+    rho = parametres['correlation']
+    z = _chocs(rng, (n_tirages, n_annees, n_regions), parametres)
+    z *= np.float32(np.sqrt(1 - rho))
+    z += np.float32(np.sqrt(rho)) * _chocs(rng, (n_tirages, n_annees, 1), parametres)
+    z *= np.float32(parametres['ecart_type'])
+    z += (parametres['moyenne'] + parametres['tendance'] * np.arange(n_annees, dtype=np.float32))[:, None]
+    # La pluie ne peut pas baisser de plus de 100 %
+    return np.maximum(z, np.float32(-100), out=z)
+
+
+def _simuler_lot(tache):
+    """Production (tirages, années, filières) d'un lot de tirages ; exécutable dans un processus fils."""
+    graine, n_tirages, parametres, sol, intrants, irrigation, sensibilite, parts, tendance = tache
+    rng = np.random.default_rng(graine)
+    anomalies = tirer_anomalies(rng, n_tirages, tendance.shape[0], parametres, parts.shape[0])
+    rendement = moteur.rendement_sol_climat(anomalies, sol, intrants, irrigation, sensibilite)
+    production = rendement.reshape(-1, parts.shape[0]) @ parts
+    production = production.reshape(n_tirages, tendance.shape[0], parts.shape[1])
+    production *= tendance
+    return production
+
+
+def simuler_risque(sol, intrants, irrigation, parametres=None, n_tirages=100_000,
+                   annee_fin=moteur.ANNEE_CIBLE, tx_croissance=0.0, cultures=None,
+                   graine=0, n_processus=1, taille_lot=25_000, suivi=None):
+    """Simule la production de chaque filière, chaque année de 2026 à `annee_fin`.
+
+    `sol` et `intrants` sont des indices (voir moteur.codes) ; `tx_croissance` (%/an)
+    applique une tendance de production hors climat. Les tirages sont traités par lots
+    de `taille_lot`, éventuellement répartis sur `n_processus` processus ; le résultat
+    ne dépend que de `graine`, pas du nombre de processus.
+    `suivi(fraction, partiel)` est appelé après chaque lot avec le résultat des tirages
+    déjà faits (voir taches.py) ; une exception qu'il lève interrompt la simulation.
+    """
+    parametres = parametres or loi_pluie()
+    cultures = list(referentiel.options_culture if cultures is None else cultures)
+    annees = np.arange(moteur.ANNEE_ACTUELLE, annee_fin + 1)
+    lignes = [referentiel.indice_culture(c) for c in cultures]
+    base_prod = referentiel.FILIERES['prod'][lignes]
+
+    parts = referentiel.POTENTIELS[lignes].T.astype(np.float32)  # (régions, filières)
+    croissance = (1 + tx_croissance / 100) ** np.arange(len(annees))
+    tendance = (croissance[:, None] * base_prod[None, :]).astype(np.float32)
+
+    tailles = [taille_lot] * (n_tirages // taille_lot)
+    if n_tirages % taille_lot:
+        tailles.append(n_tirages % taille_lot)
+    graines = np.random.SeedSequence(graine).spawn(len(tailles))
+    # Sensibilité des sols lue une fois : tous les lots suivent la même calibration
+    sensibilite = moteur.SENSIBILITE_SOL
+    taches = [(g, n, parametres, sol, intrants, irrigation, sensibilite, parts, tendance)
+              for g, n in zip(graines, tailles)]
+
+    resultat = {
+        'cultures': cultures, 'annees': annees, 'base_prod': base_prod,
+        'production': np.empty((n_tirages, len(annees), len(cultures)), dtype=np.float32),
+    }
+    fait = 0
+    pool = ProcessPoolExecutor(max_workers=n_processus) if n_processus > 1 else None
+    try:
+        for lot in (pool.map(_simuler_lot, taches) if pool else map(_simuler_lot, taches)):
+            resultat['production'][fait:fait + len(lot)] = lot
+            fait += len(lot)
+            if suivi is not None:
+                suivi(fait / n_tirages, {**resultat, 'production': resultat['production'][:fait]})
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return resultat
+
+
+def indicateurs_risque(resultat, annee=None):
+    """P5/P50/P95, probabilité de passer sous base_prod et déficit attendu, par filière.
+
+    `deficit_attendu` est l'espérance du manque E[max(0, base_prod - X)] (T) ;
+    `es_5` est la production moyenne des 5 % pires tirages (Expected Shortfall).
+    """
+    annees = resultat['annees']
+    i = len(annees) - 1 if annee is None else int(np.searchsorted(annees, annee))
+    # (filières, tirages) contigu : les quantiles travaillent sur des lignes
+    x = np.ascontiguousarray(resultat['production'][:, i, :].T)
+    base = resultat['base_prod'][:, None]
+    p5, p50, p95 = np.percentile(x, [5, 50, 95], axis=1)
+    k = max(1, int(0.05 * x.shape[1]))
+    pires = np.partition(x, k - 1, axis=1)[:, :k]
+    return {
+        'cultures': resultat['cultures'], 'annee': int(annees[i]),
+        'p5': p5, 'p50': p50, 'p95': p95,
+        'proba_sous_base': (x < base).mean(axis=1),
+        'deficit_attendu': np.maximum(base - x, 0).mean(axis=1),
+        'es_5': pires.mean(axis=1, dtype=np.float64),
+    }
+
+
+def bandes_annuelles(resultat, culture):
+    """Quantiles P5/P50/P95 de production pour chaque année, pour une filière."""
+    j = resultat['cultures'].index(culture)
+    x = np.ascontiguousarray(resultat['production'][:, :, j].T)
+    p5, p50, p95 = np.percentile(x, [5, 50, 95], axis=1)
+    return resultat['annees'], p5, p50, p95
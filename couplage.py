@@ -0,0 +1,100 @@
+"""Simulateur couplé pluriannuel : climat, investissement, pertes et demande, toutes filières ensemble.
+
+L'état est un tenseur (années × filières × préfectures) avancé de 2026 à l'horizon :
+- capacité : production de départ répartie entre préfectures (poids de l'onglet 1),
+  croissance tendancielle (onglet 3) et, chaque année du programme, une tranche du
+  budget (onglet 4) qui ajoute durablement son gain de production ;
+- climat : rendement sol-climat (onglet 2) de l'anomalie de pluie de l'année dans la
+  région de la préfecture (pluie constante ou tirage de climat.py) ;
+- pertes : taux post-récolte (onglet 5) ramené progressivement vers un taux visé,
+  part récupérée par la transformation ;
+- demande : besoin national par filière indexé sur la démographie (onglet 3).
+
+Capacité en forme fermée : C[t] = (1+g)^t · (C[0] + Σ_{s≤t} A[s] / (1+g)^s), une
+somme cumulée sur l'axe des années ; tout le reste est diffusion NumPy. Une
+simulation 2026-2100 coûte moins d'une milliseconde : elle suit les curseurs.
+"""
+import numpy as np
+
+import climat
+import moteur
+import referentiel
+
+
+def anomalies_pluie(n_annees, pluie=0.0, parametres=None, graine=0):
+    """Anomalies de pluie (%) (années × préfectures) : constante, ou un tirage de climat.py par région."""
+    prefectures = referentiel.PREFECTURES
+    if parametres is None:
+        return np.full((n_annees, len(prefectures['pref'])), float(pluie))
+    tirage = climat.tirer_anomalies(np.random.default_rng(graine), 1, n_annees, parametres)[0]
+    return tirage[:, prefectures['region']].astype(float)
+
+
+def simuler(annee_fin=moteur.ANNEE_CIBLE, tx_croissance=0.0, anomalies=0.0, sol=0, intrants=0, irrigation=False,
+            budget=0.0, part_semences=0.3, part_engrais=0.4, annee_fin_programme=moteur.ANNEE_CIBLE,
+            taux_perte=30.0, taux_perte_final=None, transfo=0, croissance_demo=moteur.CROISSANCE_DEMOGRAPHIQUE,
+            population=moteur.POPULATION_GUINEE, filieres=None):
+    """Trajectoires couplées de toutes les filières et préfectures, de 2026 à `annee_fin`.
+
+    `tx_croissance` (%/an, scalaire ou un taux par filière) : tendance hors programme.
+    `anomalies` : pluie (%), scalaire ou (années × préfectures) (voir anomalies_pluie).
+    `sol`, `intrants`, `transfo` : indices (moteur.codes), scalaires ou un par préfecture.
+    `budget` (Mds GNF) : enveloppe du programme, dépensée à parts égales de 2027 à
+    `annee_fin_programme` et répartie entre filières au prorata de leur production ;
+    le gain cumulé en fin de programme est celui de l'onglet 4.
+    `taux_perte` (%) : taux de départ, ramené linéairement vers `taux_perte_final`
+    à la fin du programme (inchangé par défaut).
+    """
+    filieres = list(referentiel.filières_db if filieres is None else filieres)
+    colonnes = referentiel.colonnes_filieres(filieres)
+    annees = np.arange(moteur.ANNEE_ACTUELLE, annee_fin + 1)
+    t = np.arange(len(annees), dtype=float)
+    duree = max(1, annee_fin_programme - moteur.ANNEE_ACTUELLE)
+
+    # Production de départ (F, P) : la production nationale répartie selon les poids de l'onglet 1
+    poids = referentiel.poids_prefectures(filieres)
+    part_pref = poids / poids.sum(axis=1, keepdims=True)
+    base = colonnes['prod'][:, None] * part_pref
+
+    # Tranche annuelle du programme : gain d'investissement de la part du budget de chaque filière
+    part_budget = colonnes['prod'] / colonnes['prod'].sum()
+    s_sem, s_eng = budget * part_semences, budget * part_engrais
+    s_mac = max(0.0, budget - s_sem - s_eng)
+    gain = moteur.gain_investissement(s_sem, s_eng, s_mac, colonnes['coef_roi']) * part_budget      # (F,)
+    en_programme = ((t >= 1) & (t <= duree)) / duree                                               # (Y,)
+    apport = en_programme[:, None, None] * (gain[:, None] * part_pref)                             # (Y, F, P)
+
+    # Capacité (Y, F, P) : tendance composée plus apports du programme, capitalisés au même taux
+    croissance = (1 + np.broadcast_to(np.asarray(tx_croissance, dtype=float), (len(filieres),)) / 100)
+    facteur = croissance[None, :] ** t[:, None]                                                   # (Y, F)
+    tendance = facteur[:, :, None] * base
+    capacite = facteur[:, :, None] * (base + np.cumsum(apport / facteur[:, :, None], axis=0))
+
+    # Climat de l'année (Y, P) puis pertes post-récolte
+    anomalies = np.broadcast_to(np.asarray(anomalies, dtype=float), (len(annees), len(part_pref[0])))
+    rendement = moteur.rendement_sol_climat(anomalies, np.asarray(sol), np.asarray(intrants), np.asarray(irrigation))
+    production = capacite * rendement[:, None, :]
+    taux_final = taux_perte if taux_perte_final is None else taux_perte_final
+    taux = taux_perte + (taux_final - taux_perte) * np.minimum(t / duree, 1)                       # (Y,)
+    pertes, recupere, _ = moteur.pertes_post_recolte(
+        production, taux[:, None, None], moteur.GAIN_EFFICIENCE[np.asarray(transfo)])
+    disponible = production - pertes + recupere
+
+    # Demande nationale (Y, F) de l'onglet 3
+    demo = croissance_demo ** t
+    besoin = colonnes['prod'] * colonnes['ratio_besoin'] * demo[:, None]
+    disponible_national = disponible.sum(axis=2)
+    return {
+        'annees': annees, 'filieres': filieres,
+        'tendance': tendance, 'capacite': capacite, 'rendement': rendement,
+        'production': production, 'pertes': pertes, 'recupere': recupere, 'disponible': disponible,
+        'taux_perte': taux, 'besoin': besoin,
+        'couverture': disponible_national / besoin,
+        'dispo_hab': disponible_national * moteur.PART_CONSOMMABLE * 1000 / (population * demo[:, None]),
+    }
+
+
+def annee_couverture(resultat):
+    """Première année où le disponible couvre le besoin, par filière (None si jamais sur l'horizon)."""
+    indices = moteur.premier_croisement(resultat['couverture'].T, 1.0)
+    return [int(resultat['annees'][i]) if i >= 0 else None for i in indices]
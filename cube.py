@@ -0,0 +1,198 @@
+"""Cube de scénarios précalculé : les entrées discrètes des onglets 2, 3 et 5, lues en mémoire projetée.
+
+Le produit cartésien des curseurs est évalué une fois par `python cube.py --precalculer` :
+- rendement (onglet 2) : sol × intensification × irrigation × pluie entière de -50 à +50 %
+  (indépendant de la filière : la production est base_prod × rendement) ;
+- chemins (onglet 3) : filière × taux de 1,0 à 15,0 % par pas de 0,1 × année jusqu'en 2100,
+  production et disponibilité par habitant ; besoin : filière × année ;
+- pertes (onglet 5) : filière × taux de pertes entier de 5 à 50 % × niveau de transformation.
+
+Tous les tableaux sont écrits bout à bout dans un seul `.npy` (float64), décrit par un
+`.json` voisin (formes, décalages, empreinte). L'application l'ouvre en mémoire
+projetée : un curseur devient une lecture indexée, et les pages sont partagées entre
+processus par le cache du système. Hors grille, sans fichier ou si l'empreinte ne
+correspond plus au référentiel et aux paramètres de moteur.py, la valeur est calculée.
+
+    python cube.py --precalculer   # écrit donnees/cube/cube.npy et cube.json
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+import moteur
+import referentiel
+from cache import memoiser
+
+FICHIER_DEFAUT = Path(__file__).resolve().parent / "donnees" / "cube" / "cube.npy"
+# Grilles régulières (début, pas, nombre de valeurs) : l'indice d'une valeur se calcule
+GRILLE_PLUIE = (-50, 1, 101)
+GRILLE_CROISSANCE = (1.0, 0.1, 141)
+GRILLE_PERTE = (5, 1, 46)
+ANNEE_MAX = 2100
+DELAI_VERIFICATION_S = 1.0  # Le fichier est re-stat() au plus une fois par seconde
+_COURANT = [float("-inf"), None]  # (instant de la dernière vérification, cube)
+
+
+def valeurs(grille):
+    debut, pas, n = grille
+    return np.round(debut + pas * np.arange(n), 6)
+
+
+def fichier_defaut():
+    return Path(os.environ.get("UPDIA_CUBE") or FICHIER_DEFAUT)
+
+
+@functools.lru_cache(maxsize=4)
+def _empreinte(version):
+    """Empreinte des entrées du cube : filières du référentiel, paramètres de moteur.py et grilles."""
+    h = hashlib.sha1()
+    h.update("|".join(referentiel.options_culture).encode("utf-8"))
+    for tableau in (referentiel.FILIERES['prod'], referentiel.FILIERES['ratio_besoin'], moteur.FACTEURS_SOL,
+                    moteur.SENSIBILITE_SOL, moteur.BOOST_INTRANTS, moteur.GAIN_EFFICIENCE,
+                    valeurs(GRILLE_PLUIE), valeurs(GRILLE_CROISSANCE), valeurs(GRILLE_PERTE)):
+        h.update(np.ascontiguousarray(tableau, dtype=float).tobytes())
+    h.update(repr((moteur.BONUS_IRRIGATION, moteur.PROTECTION_IRRIGATION, moteur.RENDEMENT_PLANCHER,
+                   moteur.CROISSANCE_DEMOGRAPHIQUE, moteur.POPULATION_GUINEE, moteur.PART_CONSOMMABLE,
+                   moteur.ANNEE_ACTUELLE, ANNEE_MAX)).encode())
+    return h.hexdigest()
+
+
+def empreinte():
+    return _empreinte(referentiel.VERSION)
+
+
+def calculer():
+    """Tableaux du cube (dict nom → ndarray), évalués par diffusion sur toute la grille."""
+    colonnes = referentiel.FILIERES  # Lignes dans l'ordre de options_culture, "Tout" compris
+    s, i, r, p = np.ix_(np.arange(len(moteur.TYPES_SOL)), np.arange(len(moteur.NIVEAUX_INTRANTS)),
+                        np.array([0, 1]), valeurs(GRILLE_PLUIE))
+    rendement = moteur.rendement_sol_climat(p, s, i, r.astype(bool))
+    prod_path, besoin_path, dispo_hab = moteur.chemins_vision(
+        colonnes['prod'][:, None], colonnes['ratio_besoin'][:, None], valeurs(GRILLE_CROISSANCE)[None, :],
+        ANNEE_MAX - moteur.ANNEE_ACTUELLE + 1
+    )
+    pertes = np.stack(np.broadcast_arrays(*moteur.pertes_post_recolte(
+        colonnes['prod'][:, None, None], valeurs(GRILLE_PERTE)[None, :, None], moteur.GAIN_EFFICIENCE[None, None, :]
+    )), axis=-1)
+    return {
+        'rendement': rendement,                                  # (sol, intrants, irrigation, pluie)
+        'chemins': np.stack([prod_path, dispo_hab], axis=-1),    # (filière, taux, année, 2)
+        'besoin': besoin_path[:, 0],                             # (filière, année)
+        'pertes': pertes,                                        # (filière, taux, transformation, 3)
+    }
+
+
+def precalculer(chemin=None):
+    """Écrit le cube (.npy) et sa description (.json) ; renvoie le chemin du .npy."""
+    chemin = Path(chemin or fichier_defaut())
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    tableaux = calculer()
+    description, debut = {}, 0
+    for nom, tableau in tableaux.items():
+        description[nom] = {'debut': debut, 'forme': list(tableau.shape)}
+        debut += tableau.size
+    np.save(chemin, np.concatenate([t.ravel() for t in tableaux.values()]))
+    chemin.with_suffix(".json").write_text(json.dumps({'empreinte': empreinte(), 'tableaux': description}, indent=1),
+                                           encoding="utf-8")
+    return chemin
+
+
+class Cube:
+    """Tableaux du cube : vues en lecture seule sur un seul fichier en mémoire projetée."""
+
+    def __init__(self, chemin):
+        self.chemin = Path(chemin)
+        meta = json.loads(self.chemin.with_suffix(".json").read_text(encoding="utf-8"))
+        self.empreinte = meta['empreinte']
+        donnees = np.load(self.chemin, mmap_mode="r")
+        self.tableaux = {
+            nom: donnees[t['debut']:t['debut'] + int(np.prod(t['forme']))].reshape(t['forme'])
+            for nom, t in meta['tableaux'].items()
+        }
+        self.octets = donnees.nbytes
+
+
+@memoiser(taille_max=2, ttl=None)
+def _ouvrir(chemin, date_modification):
+    return Cube(chemin)
+
+
+def courant():
+    """Cube du fichier par défaut s'il existe et correspond au référentiel chargé, sinon None."""
+    maintenant = time.monotonic()
+    if maintenant - _COURANT[0] > DELAI_VERIFICATION_S:
+        chemin = fichier_defaut()
+        try:
+            _COURANT[1] = _ouvrir(str(chemin), chemin.stat().st_mtime_ns)
+        except (OSError, ValueError, KeyError):
+            _COURANT[1] = None
+        _COURANT[0] = maintenant
+    cube = _COURANT[1]
+    return cube if cube is not None and cube.empreinte == empreinte() else None
+
+
+def _indice(grille, valeur):
+    """Indice de `valeur` dans une grille régulière, ou None si elle n'en fait pas partie."""
+    debut, pas, n = grille
+    i = round((valeur - debut) / pas)
+    return i if 0 <= i < n and abs(debut + i * pas - valeur) < 1e-6 else None
+
+
+def rendement(sol, intrants, irrigation, pluie):
+    """Multiplicateur de rendement de l'onglet 2 (indices de sol et d'intensification)."""
+    cube, j = courant(), _indice(GRILLE_PLUIE, pluie)
+    if cube is None or j is None:
+        return float(moteur.rendement_sol_climat(pluie, sol, intrants, irrigation))
+    return float(cube.tableaux['rendement'][sol, intrants, int(irrigation), j])
+
+
+def chemins(culture, tx_croissance, nombre_annees):
+    """Chemins de production, de besoin et de disponibilité de l'onglet 3 (voir moteur.chemins_vision)."""
+    cube, j = courant(), _indice(GRILLE_CROISSANCE, tx_croissance)
+    if cube is None or j is None or nombre_annees > ANNEE_MAX - moteur.ANNEE_ACTUELLE + 1:
+        d = referentiel.profil_filiere(culture)
+        return moteur.chemins_vision(d['prod'], d['ratio_besoin'], tx_croissance, nombre_annees)
+    f = referentiel.indice_culture(culture)
+    vues = cube.tableaux['chemins'][f, j, :nombre_annees]
+    return vues[:, 0], cube.tableaux['besoin'][f, :nombre_annees], vues[:, 1]
+
+
+def pertes(culture, taux_perte, transfo):
+    """Pertes, tonnage récupéré et disponible de l'onglet 5 (indice du niveau de transformation)."""
+    cube, j = courant(), _indice(GRILLE_PERTE, taux_perte)
+    if cube is None or j is None:
+        d = referentiel.profil_filiere(culture)
+        return tuple(map(float, moteur.pertes_post_recolte(d['prod'], taux_perte, moteur.GAIN_EFFICIENCE[transfo])))
+    return tuple(map(float, cube.tableaux['pertes'][referentiel.indice_culture(culture), j, transfo]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cube de scénarios précalculé (mémoire projetée).")
+    parser.add_argument("chemin", nargs="?", help="Fichier .npy (défaut : donnees/cube/cube.npy)")
+    parser.add_argument("--precalculer", action="store_true", help="Évalue la grille et écrit le cube")
+    args = parser.parse_args(argv)
+    if args.chemin:
+        os.environ["UPDIA_CUBE"] = args.chemin
+    referentiel.synchroniser()
+
+    if args.precalculer:
+        precalculer()
+    cube = courant()
+    if cube is None:
+        print(f"{fichier_defaut()} : absent ou obsolète (python cube.py --precalculer)")
+        return 1
+    for nom, tableau in cube.tableaux.items():
+        print(f"{nom:<10} {' × '.join(map(str, tableau.shape)):<20} {tableau.nbytes / 1024:>8.1f} Ko")
+    print(f"{cube.chemin} : {cube.octets / 1024:.1f} Ko, empreinte {cube.empreinte[:8]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""Projection démographique par préfecture et par âge (méthode des composantes, matrice de Leslie).
+
+L'onglet 3 faisait croître une population nationale unique de 2,5 % par an. Ici, chaque
+préfecture a sa pyramide par année d'âge (0 à 89 ans, puis 90 ans et plus) et les
+hypothèses de sa région : fécondité (ISF, en baisse régulière), espérance de vie, et un
+exode des jeunes adultes vers Conakry. Chaque année, la pyramide est multipliée par la
+matrice de Leslie de la préfecture : la sous-diagonale (survie d'un âge au suivant) est
+appliquée par un décalage, la première ligne (naissances) par un produit matriciel sur
+toutes les préfectures à la fois. La projection complète (34 préfectures × 91 âges
+jusqu'en 2060) prend ≈ 2 ms, et elle est mémoïsée par horizon.
+
+Population de départ : population nationale de moteur.py en 2026, répartie entre les
+régions selon le recensement de 2014 puis à parts égales entre les préfectures d'une
+région (le référentiel ne donne pas leur population) ; structure par âge : structure
+stable des taux de la préfecture, avec la fécondité plus forte de la génération passée.
+
+    python demographie.py --annee-fin 2060   # durée, population par région, croissance implicite
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import moteur
+import referentiel
+from cache import memoiser
+
+# --- 1. HYPOTHÈSES (par région, dans l'ordre de referentiel.REGIONS) ---
+AGE_MAX = 90                      # dernier groupe : 90 ans et plus
+ANNEE_FIN = 2060
+# RGPH 2014 (milliers d'habitants) : ne sert qu'à répartir la population nationale
+POPULATION_REGIONS = np.array([1083, 1560, 732, 943, 1987, 995, 1578, 1667], dtype=float)
+ISF_REGIONS = np.array([5.1, 4.6, 5.0, 5.4, 5.6, 4.6, 5.0, 3.4])          # enfants par femme (EDS 2018)
+ESPERANCE_REGIONS = np.array([60.0, 61.0, 60.0, 59.0, 59.0, 61.0, 59.0, 64.0])  # années
+BAISSE_FECONDITE = 0.01           # baisse relative de l'ISF par an
+FECONDITE_PASSEE = 1.2            # ISF d'il y a une génération / ISF actuel (structure de départ)
+TAUX_EXODE = 0.01                 # part des 15-29 ans hors Conakry partant pour Conakry chaque année
+AGES_EXODE = slice(15, 30)
+AGES_FECONDITE = (15, 50)
+PART_FEMMES = 0.5                 # part des femmes à chaque âge
+
+# Forme du risque de décès (mortalité infantile, accidentelle, sénescence), multipliée
+# par un niveau ajusté à l'espérance de vie de chaque région
+_RISQUE_TYPE = (0.08, 1.0, 0.002, 2e-5, 0.1)
+
+
+def _risque(ages, niveau):
+    a0, b0, c, a, b = _RISQUE_TYPE
+    return np.asarray(niveau)[..., None] * (a0 * np.exp(-b0 * ages) + c + a * np.exp(b * ages))
+
+
+def _esperance(survie):
+    """Espérance de vie à la naissance d'une table de survie annuelle (dernier âge ouvert)."""
+    survivants = np.concatenate([np.ones(survie.shape[:-1] + (1,)), np.cumprod(survie[..., :-1], axis=-1)], axis=-1)
+    annees_vecues = (survivants[..., :-1] + survivants[..., 1:]) / 2
+    return annees_vecues.sum(axis=-1) + survivants[..., -1] / (1 - survie[..., -1])
+
+
+def survie(esperance):
+    """Quotients de survie d'un âge au suivant (…, AGE_MAX + 1) ; le dernier reste dans le groupe ouvert."""
+    esperance = np.asarray(esperance, dtype=float)
+    milieux = np.arange(AGE_MAX + 1) + 0.5
+    milieux[-1] = AGE_MAX + 5
+    bas, haut = np.full(esperance.shape, -6.0), np.full(esperance.shape, 4.0)
+    # Dichotomie sur le logarithme du niveau, toutes les régions à la fois
+    for _ in range(50):
+        milieu = (bas + haut) / 2
+        trop_longue = _esperance(np.exp(-_risque(milieux, np.exp(milieu)))) > esperance
+        bas, haut = np.where(trop_longue, milieu, bas), np.where(trop_longue, haut, milieu)
+    return np.exp(-_risque(milieux, np.exp((bas + haut) / 2)))
+
+
+def fecondite(isf):
+    """Taux de fécondité par âge (…, AGE_MAX + 1) : calendrier en cloche culminant vers 28 ans."""
+    debut, fin = AGES_FECONDITE
+    x = (np.arange(AGE_MAX + 1) + 0.5 - debut) / (fin - debut)
+    forme = np.where((x > 0) & (x < 1), np.clip(x, 0, 1) ** 2 * np.clip(1 - x, 0, 1) ** 3.5, 0.0)
+    return np.asarray(isf, dtype=float)[..., None] * forme / forme.sum()
+
+
+def naissances_par_habitant(fec, surv):
+    """Première ligne de la matrice de Leslie : naissances de l'année survivantes au 31 décembre, par habitant d'âge x."""
+    # Les femmes d'âge x passent la moitié de l'année à x et l'autre moitié à x + 1
+    suivant = np.concatenate([fec[..., 1:], np.zeros(fec.shape[:-1] + (1,))], axis=-1)
+    survie_nourrissons = np.sqrt(surv[..., :1])
+    return survie_nourrissons * PART_FEMMES * (fec + surv * suivant) / 2
+
+
+def matrices_leslie(annee=moteur.ANNEE_ACTUELLE):
+    """Matrices de Leslie de toutes les préfectures pour une année (préfectures × âges × âges)."""
+    surv, ligne = _taux_prefectures()
+    ligne = ligne * (1 - BAISSE_FECONDITE) ** (annee - moteur.ANNEE_ACTUELLE)
+    ages = AGE_MAX + 1
+    matrices = np.zeros((len(surv), ages, ages))
+    matrices[:, 0] = ligne
+    matrices[:, np.arange(1, ages), np.arange(ages - 1)] = surv[:, :-1]
+    matrices[:, -1, -1] += surv[:, -1]
+    return matrices
+
+
+# --- 2. POPULATION DE DÉPART ---
+
+@memoiser(taille_max=1, ttl=None, depend_de=('prefectures',))
+def _taux_prefectures():
+    """Survie et première ligne de Leslie de chaque préfecture (préfectures × âges), en lecture seule."""
+    regions = referentiel.PREFECTURES['region']
+    surv = survie(ESPERANCE_REGIONS)
+    taux = surv[regions], naissances_par_habitant(fecondite(ISF_REGIONS), surv)[regions]
+    for tableau in taux:
+        tableau.flags.writeable = False
+    return taux
+
+
+def structure_stable(surv, ligne):
+    """Structure par âge stable (somme 1) des matrices de Leslie (survie, première ligne), par ligne."""
+    survivants = np.concatenate([np.ones(surv.shape[:-1] + (1,)), np.cumprod(surv[..., :-1], axis=-1)], axis=-1)
+    ages = np.arange(AGE_MAX + 1)
+    # Taux de croissance λ : Σ ligne_x · survivants_x · λ^-(x+1) = 1 (le dernier âge ouvert compte peu)
+    bas, haut = np.full(surv.shape[:-1], 0.8), np.full(surv.shape[:-1], 1.3)
+    for _ in range(50):
+        lam = (bas + haut) / 2
+        trop_petit = (ligne * survivants * lam[..., None] ** -(ages + 1.0)).sum(axis=-1) > 1
+        bas, haut = np.where(trop_petit, lam, bas), np.where(trop_petit, haut, lam)
+    lam = (bas + haut)[..., None] / 2
+    structure = survivants * lam ** -ages
+    structure[..., -1] /= 1 - surv[..., -1] / lam[..., 0]
+    return structure / structure.sum(axis=-1, keepdims=True)
+
+
+@memoiser(taille_max=1, ttl=None, depend_de=('prefectures',))
+def population_depart():
+    """Population par préfecture et par âge en ANNEE_ACTUELLE (préfectures × âges)."""
+    regions = referentiel.PREFECTURES['region']
+    parts = POPULATION_REGIONS / POPULATION_REGIONS.sum()
+    par_prefecture = moteur.POPULATION_GUINEE * parts[regions] / np.bincount(regions, minlength=len(parts))[regions]
+    # Fécondité passée plus forte : la pyramide de départ est plus jeune que celle des taux actuels
+    surv, ligne = _taux_prefectures()
+    depart = par_prefecture[:, None] * structure_stable(surv, ligne * FECONDITE_PASSEE)
+    depart.flags.writeable = False
+    return depart
+
+
+# --- 3. PROJECTION ---
+
+@memoiser(taille_max=4, ttl=None, depend_de=('prefectures',))
+def projection(annee_fin=ANNEE_FIN):
+    """Population (années × préfectures × âges) de ANNEE_ACTUELLE à `annee_fin`, en lecture seule."""
+    surv, ligne = _taux_prefectures()
+    urbaine = referentiel.PREFECTURES['region'] == referentiel.REGIONS.index("Conakry")
+    exode = np.where(urbaine, 0.0, TAUX_EXODE)
+    annees = annee_fin - moteur.ANNEE_ACTUELLE + 1
+    baisse = (1 - BAISSE_FECONDITE) ** np.arange(annees)
+    pop = np.empty((annees, len(surv), AGE_MAX + 1))
+    pop[0] = population_depart()
+    for t in range(1, annees):
+        precedente, courante = pop[t - 1], pop[t]
+        # Produit par la matrice de Leslie : naissances (première ligne), puis vieillissement
+        courante[:, 0] = np.einsum('pa,pa->p', ligne, precedente) * baisse[t]
+        np.multiply(surv[:, :-1], precedente[:, :-1], out=courante[:, 1:])
+        courante[:, -1] += surv[:, -1] * precedente[:, -1]
+        # Exode : les départs des préfectures rurales arrivent à Conakry, au même âge
+        if urbaine.any():
+            jeunes = courante[:, AGES_EXODE]
+            departs = exode @ jeunes
+            accueil = np.where(urbaine, courante.sum(axis=1), 0.0)
+            jeunes -= exode[:, None] * jeunes
+            jeunes += (accueil / accueil.sum())[:, None] * departs
+    pop.flags.writeable = False
+    return pop
+
+
+def population_prefectures(annee_debut=moteur.ANNEE_ACTUELLE, annee_fin=ANNEE_FIN):
+    """Population totale (années × préfectures) de `annee_debut` à `annee_fin`."""
+    return projection(annee_fin)[annee_debut - moteur.ANNEE_ACTUELLE:].sum(axis=2)
+
+
+def population_nationale(annee_debut=moteur.ANNEE_ACTUELLE, annee_fin=ANNEE_FIN):
+    """Population nationale (années,) de `annee_debut` à `annee_fin`."""
+    return population_prefectures(annee_debut, annee_fin).sum(axis=1)
+
+
+def disponibilite_prefectures(prod_path, parts, annee_debut=moteur.ANNEE_ACTUELLE):
+    """Disponibilité (kg/hab/an, années × préfectures) si chaque préfecture consomme sa propre production.
+
+    `prod_path` : production nationale par année ; `parts` : part de chaque préfecture.
+    """
+    prod_path = np.asarray(prod_path, dtype=float)
+    population = population_prefectures(annee_debut, annee_debut + len(prod_path) - 1)
+    return prod_path[:, None] * np.asarray(parts)[None, :] * moteur.PART_CONSOMMABLE * 1000 / population
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Projection démographique par préfecture et par âge.")
+    parser.add_argument("--annee-fin", type=int, default=ANNEE_FIN)
+    parser.add_argument("--repetitions", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    debut = time.perf_counter()
+    for _ in range(args.repetitions):
+        projection.__wrapped__(args.annee_fin)
+    duree = (time.perf_counter() - debut) / args.repetitions
+    pop = projection(args.annee_fin)
+    annees = args.annee_fin - moteur.ANNEE_ACTUELLE
+    print(f"Projection {moteur.ANNEE_ACTUELLE}-{args.annee_fin} : {pop.shape[1]} préfectures × {pop.shape[2]} âges, "
+          f"{duree * 1000:.2f} ms")
+    # Contrôle : un pas de la projection sans exode est le produit par la matrice de Leslie
+    ecart = np.abs(np.einsum('pij,pj->pi', matrices_leslie(moteur.ANNEE_ACTUELLE + 1), pop[0])[:, 1:AGES_EXODE.start]
+                   - pop[1][:, 1:AGES_EXODE.start]).max()
+    print(f"Écart au produit matriciel de Leslie (âges 1-14) : {ecart:.2e}")
+    totaux = pop.sum(axis=2)
+    regions = referentiel.PREFECTURES['region']
+    print(f"{'Région':<12}{moteur.ANNEE_ACTUELLE:>12}{moteur.ANNEE_CIBLE:>12}{args.annee_fin:>12}")
+    for r, nom in enumerate(referentiel.REGIONS):
+        ligne = totaux[:, regions == r].sum(axis=1)
+        print(f"{nom:<12}{ligne[0]:>12,.0f}{ligne[moteur.ANNEE_CIBLE - moteur.ANNEE_ACTUELLE]:>12,.0f}{ligne[-1]:>12,.0f}")
+    national = totaux.sum(axis=1)
+    print(f"{'Guinée':<12}{national[0]:>12,.0f}{national[moteur.ANNEE_CIBLE - moteur.ANNEE_ACTUELLE]:>12,.0f}"
+          f"{national[-1]:>12,.0f}")
+    print(f"Croissance moyenne : {((national[-1] / national[0]) ** (1 / annees) - 1) * 100:.2f} %/an "
+          f"(hypothèse uniforme : {(moteur.CROISSANCE_DEMOGRAPHIQUE - 1) * 100:.1f} %/an)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
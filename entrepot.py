@@ -0,0 +1,145 @@
+"""Entrepôt du référentiel sur disque : partitions Parquet relues à chaud, fichier par fichier.
+
+Dossier `donnees/referentiel` (ou variable d'environnement UPDIA_REFERENTIEL) :
+- `filieres.parquet` : filiere, annee, prod, obj_2040, ratio_besoin, coef_roi, seuil_fao,
+  prix_import (la dernière année renseignée de chaque filière fait foi) ;
+- `potentiels.parquet` : culture, region, part (culture "Tout" comprise) ;
+- `poids.parquet` : culture, region, poids (culture "*" : répartition par défaut) ;
+- `prefectures.parquet` : region, pref, lat, lon ;
+- `communes/<région>.parquet` (facultatif) : pref, commune, lat, lon, part (part de la
+  production de la préfecture revenant à la commune).
+
+Chaque fichier est une partition. `Entrepot.synchroniser` compare la date de
+modification et la taille de chaque fichier à celles de la lecture précédente :
+seules les partitions ajoutées, modifiées ou supprimées sont relues.
+
+    python entrepot.py --initialiser   # écrit le référentiel intégré dans le dossier
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import threading
+from pathlib import Path
+
+# Entrepôt optionnel : sans pyarrow, le référentiel intégré s'applique. pandas et pyarrow ne
+# sont importés qu'à la première lecture : sans dossier d'entrepôt, le démarrage s'en passe.
+PARQUET = importlib.util.find_spec("pyarrow") is not None
+
+DOSSIER_DEFAUT = Path(__file__).resolve().parent / "donnees" / "referentiel"
+CHAMPS_FILIERE = ('prod', 'obj_2040', 'ratio_besoin', 'coef_roi', 'seuil_fao', 'prix_import')
+COLONNES = {
+    'filieres': ('filiere', 'annee') + CHAMPS_FILIERE,
+    'potentiels': ('culture', 'region', 'part'),
+    'poids': ('culture', 'region', 'poids'),
+    'prefectures': ('region', 'pref', 'lat', 'lon'),
+    'communes': ('pref', 'commune', 'lat', 'lon', 'part'),
+}
+OBLIGATOIRES = ('filieres', 'potentiels', 'poids', 'prefectures')
+
+
+def dossier_defaut():
+    return Path(os.environ.get("UPDIA_REFERENTIEL") or DOSSIER_DEFAUT)
+
+
+def _table(partition):
+    """Table d'une partition : 'communes/Boké' → 'communes'."""
+    return partition.split("/")[0]
+
+
+def _lire(chemin, table):
+    import pandas as pd
+
+    df = pd.read_parquet(chemin)
+    manquantes = [c for c in COLONNES[table] if c not in df.columns]
+    if manquantes:
+        raise ValueError(f"{chemin.name} : colonnes manquantes {', '.join(manquantes)}")
+    return df[list(COLONNES[table])]
+
+
+class Entrepot:
+    """Partitions Parquet d'un dossier, gardées en mémoire et relues seulement si leur fichier change."""
+
+    def __init__(self, dossier):
+        if not PARQUET:
+            raise ImportError("L'entrepôt Parquet exige pyarrow (pip install pyarrow).")
+        self.dossier = Path(dossier)
+        self._partitions = {}  # partition -> ((mtime_ns, taille), DataFrame)
+        self._verrou = threading.Lock()
+
+    def _fichiers(self):
+        fichiers = {p.stem: p for p in self.dossier.glob("*.parquet") if p.stem in COLONNES}
+        fichiers.update({f"communes/{p.stem}": p for p in (self.dossier / "communes").glob("*.parquet")})
+        return fichiers
+
+    def synchroniser(self):
+        """Relit les partitions modifiées depuis l'appel précédent ; renvoie les tables touchées.
+
+        Tout ou rien : si une partition est illisible (fichier en cours d'écriture,
+        colonne manquante), l'erreur remonte et l'état précédent est conservé.
+        """
+        with self._verrou:
+            fichiers = self._fichiers()
+            manquantes = [t for t in OBLIGATOIRES if t not in fichiers]
+            if manquantes:
+                raise ValueError(f"{self.dossier} : partitions manquantes {', '.join(manquantes)}")
+            relues = {}
+            for partition, chemin in fichiers.items():
+                stat = chemin.stat()
+                signature = (stat.st_mtime_ns, stat.st_size)
+                connue = self._partitions.get(partition)
+                if connue is None or connue[0] != signature:
+                    relues[partition] = (signature, _lire(chemin, _table(partition)))
+            supprimees = set(self._partitions) - set(fichiers)
+            for partition in supprimees:
+                del self._partitions[partition]
+            self._partitions.update(relues)
+            return {_table(p) for p in relues.keys() | supprimees}
+
+    def table(self, nom):
+        """DataFrame d'une table ; les communes sont réunies depuis leurs partitions (colonne region)."""
+        import pandas as pd
+
+        if nom != 'communes':
+            return self._partitions[nom][1]
+        morceaux = [df.assign(region=p.split("/", 1)[1]) for p, (_, df) in sorted(self._partitions.items())
+                    if _table(p) == 'communes']
+        if not morceaux:
+            return pd.DataFrame(columns=('region',) + COLONNES['communes'])
+        return pd.concat(morceaux, ignore_index=True)
+
+
+def ecrire(tables, dossier):
+    """Écrit des tables (dict nom → DataFrame) en partitions ; les communes par région."""
+    if not PARQUET:
+        raise ImportError("L'entrepôt Parquet exige pyarrow (pip install pyarrow).")
+    dossier = Path(dossier)
+    dossier.mkdir(parents=True, exist_ok=True)
+    for nom, df in tables.items():
+        if nom == 'communes':
+            (dossier / "communes").mkdir(exist_ok=True)
+            for region, morceau in df.groupby('region'):
+                morceau[list(COLONNES[nom])].to_parquet(dossier / "communes" / f"{region}.parquet", index=False)
+        else:
+            df[list(COLONNES[nom])].to_parquet(dossier / f"{nom}.parquet", index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Entrepôt Parquet du référentiel UPDIA.")
+    parser.add_argument("dossier", nargs="?", help="Dossier de l'entrepôt (défaut : donnees/referentiel)")
+    parser.add_argument("--initialiser", action="store_true", help="Écrit le référentiel intégré")
+    args = parser.parse_args(argv)
+    dossier = Path(args.dossier) if args.dossier else dossier_defaut()
+
+    if args.initialiser:
+        import referentiel
+        ecrire(referentiel.tables(integre=True), dossier)
+    entrepot = Entrepot(dossier)
+    entrepot.synchroniser()
+    for nom in COLONNES:
+        print(f"{nom:<12} {len(entrepot.table(nom)):>6} lignes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
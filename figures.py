@@ -0,0 +1,713 @@
+"""Construction des tableaux dérivés et des figures Plotly, mémoïsée entre les reruns.
+
+Chaque constructeur ne dépend que de ses arguments (les vraies entrées de la
+figure) : tant qu'ils ne changent pas, la figure déjà construite est réutilisée.
+Ceux qui lisent aussi le référentiel le déclarent (`depend_de`) : leur cache est
+vidé quand l'entrepôt recharge l'une de ces tables.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+import carte
+import climat
+import couplage
+import demographie
+import grille
+import logistique
+import moteur
+import ndvi
+import optimisation
+from cache import memoiser
+import proximite
+import referentiel
+import scenarios
+import sensibilite
+
+
+# --- 1. ONGLET 1 : DIAGNOSTIC TERRITORIAL ---
+
+@memoiser(taille_max=16, depend_de=('prefectures', 'poids', 'potentiels', 'filieres'))
+def tableau_territorial(culture, base_prod):
+    """Répartition de la production par préfecture (df_pref) et par région (df_reg).
+
+    La production d'une préfecture est la somme de ses mailles (grille.py), pas
+    le poids de sa région appliqué uniformément.
+    """
+    prefectures = referentiel.PREFECTURES
+    codes_region = prefectures['region']
+    df_pref = pd.DataFrame({
+        'Region': pd.Categorical.from_codes(codes_region, referentiel.REGIONS),
+        'Pref': prefectures['pref'], 'lat': prefectures['lat'], 'lon': prefectures['lon'],
+    })
+    df_pref['poids'] = referentiel.POIDS_REGIONAUX[referentiel.indice_culture(culture)][codes_region]
+    df_pref['Production'] = grille.grille().sommes_prefectures(culture, base_prod)
+    df_pref['Efficacité'] = (df_pref['poids'] / df_pref['poids'].max()) * 100
+    df_reg = df_pref.groupby('Region', observed=True)['Production'].sum().reset_index()
+    # Égalités (à la tonne près : sommes de mailles) départagées par ordre alphabétique, comme l'ancien regroupement sur chaînes
+    df_reg = df_reg.assign(_tonnes=df_reg['Production'].round(), _nom=df_reg['Region'].astype(str)).sort_values(
+        ['_tonnes', '_nom'], ascending=[False, True]).drop(columns=['_tonnes', '_nom'])
+    return df_pref, df_reg
+
+
+@memoiser(taille_max=16, depend_de=('prefectures', 'poids'))
+def appariement_prefectures(culture, base_prod, ratio_besoin, k=5):
+    """Soldes par préfecture et transferts des excédentaires vers les déficitaires les plus proches.
+
+    Besoin national (production × ratio de besoin) réparti à parts égales entre les
+    préfectures : le référentiel ne donne pas leur population. Renvoie (df_transferts, bilan).
+    """
+    prefectures = referentiel.PREFECTURES
+    production = logistique.offre_nationale(culture, base_prod)
+    solde = production - base_prod * ratio_besoin / len(production)
+    deficitaire, excedentaire, distance, volume = proximite.apparier(
+        prefectures['lat'], prefectures['lon'], np.maximum(solde, 0), np.maximum(-solde, 0), k)
+    df_transferts = pd.DataFrame({
+        'Déficitaire': prefectures['pref'][deficitaire], 'Excédentaire': prefectures['pref'][excedentaire],
+        'Distance (km)': distance, 'Volume (T)': volume,
+    })
+    bilan = {
+        'excedentaires': int((solde > 0).sum()), 'deficitaires': int((solde < 0).sum()),
+        'deficit': float(np.maximum(-solde, 0).sum()), 'couvert': float(volume.sum()),
+        'distance_moyenne': float(np.average(distance, weights=volume)) if len(volume) else 0.0,
+    }
+    return df_transferts, bilan
+
+
+@memoiser(taille_max=16, depend_de=('prefectures', 'poids', 'potentiels', 'communes'))
+def tableau_communes(culture, base_prod):
+    """Production par commune : part de la commune dans la production de sa préfecture."""
+    df_pref, _ = tableau_territorial(culture, base_prod)
+    communes = referentiel.COMMUNES
+    rang = communes['pref']
+    df_com = pd.DataFrame({
+        'Region': df_pref['Region'].to_numpy()[rang], 'Pref': df_pref['Pref'].to_numpy()[rang],
+        'Commune': communes['commune'],
+        'Production': df_pref['Production'].to_numpy()[rang] * communes['part'],
+    })
+    return df_com.sort_values('Production', ascending=False, ignore_index=True)
+
+
+@memoiser(taille_max=16, depend_de=('prefectures', 'poids', 'potentiels'))
+def carte_territoriale(culture, base_prod):
+    """Carte en ligne (bulles sur tuiles carto-positron) et taille de sa charge utile (octets)."""
+    df_pref, _ = tableau_territorial(culture, base_prod)
+    fig_map = px.scatter_mapbox(
+        df_pref, lat="lat", lon="lon",
+        color="Efficacité", size="Production",
+        hover_name="Pref",
+        hover_data={"Region": True, "Production": ":,.0f T", "lat": False, "lon": False, "Efficacité": ":.1f%"},
+        color_continuous_scale="RdYlGn", size_max=18, zoom=5.8,
+        mapbox_style="carto-positron"
+    )
+    fig_map.update_layout(
+        height=500, margin={"r": 0, "t": 0, "l": 0, "b": 0},
+        mapbox=dict(center=dict(lat=10.5, lon=-11.0))
+    )
+    return fig_map, carte.octets_json(fig_map)
+
+
+@memoiser(taille_max=16, depend_de=('prefectures', 'poids', 'potentiels'))
+def carte_prefectures(culture, base_prod, geometrie_servie):
+    """Carte hors ligne : choroplèthe des préfectures sur fond blanc, et taille de sa charge utile.
+
+    Si la géométrie est servie par static/, la figure n'en porte que l'URL :
+    d'une filière à l'autre, seules les valeurs par préfecture changent.
+    """
+    df_pref, _ = tableau_territorial(culture, base_prod)
+    fig_map = go.Figure(go.Choroplethmap(
+        geojson=carte.URL_GEOMETRIE if geometrie_servie else carte.geometrie(),
+        featureidkey="properties.Pref", locations=df_pref['Pref'],
+        z=df_pref['Efficacité'].round(1), zmin=0, zmax=100, colorscale="RdYlGn",
+        customdata=np.column_stack([df_pref['Region'], df_pref['Production'].round()]),
+        hovertemplate="<b>%{location}</b><br>%{customdata[0]}<br>%{customdata[1]:,.0f} T<br>Efficacité %{z:.1f}%<extra></extra>",
+        marker=dict(line=dict(width=0.6, color="white")), colorbar=dict(title="Efficacité")
+    ))
+    fig_map.update_layout(
+        height=500, margin={"r": 0, "t": 0, "l": 0, "b": 0},
+        map=dict(style="white-bg", center=dict(lat=10.0, lon=-11.2), zoom=5.6),
+        template=None  # Le thème Streamlit s'applique côté navigateur : inutile d'envoyer celui de Plotly
+    )
+    return fig_map, carte.octets_json(fig_map)
+
+
+@memoiser(taille_max=16, depend_de=('prefectures', 'poids', 'filieres'))
+def carte_grille(culture, base_prod):
+    """Carte hors ligne de la production maillée (aperçu agrégé de la grille) et taille de sa charge utile."""
+    g = grille.grille()
+    valeurs, lat, lon = g.apercu(culture, base_prod, taille_max=100)
+    prefectures = referentiel.PREFECTURES
+    fig_map = go.Figure(go.Heatmap(
+        z=np.where(valeurs > 0, valeurs, np.nan).round(), x=lon.round(3), y=lat.round(3),
+        colorscale="YlGn", colorbar=dict(title="T / maille"),
+        hovertemplate="%{y:.2f}°, %{x:.2f}°<br>%{z:,.0f} T<extra></extra>"
+    ))
+    fig_map.add_trace(go.Scatter(
+        x=prefectures['lon'], y=prefectures['lat'], mode="markers", text=prefectures['pref'],
+        marker=dict(size=5, color="#333"), hovertemplate="<b>%{text}</b><extra></extra>", showlegend=False
+    ))
+    fig_map.update_layout(
+        height=500, margin={"r": 0, "t": 0, "l": 0, "b": 0}, plot_bgcolor="white",
+        xaxis=dict(visible=False), yaxis=dict(visible=False, scaleanchor="x"),
+        template=None
+    )
+    return fig_map, carte.octets_json(fig_map)
+
+
+@memoiser(taille_max=16, depend_de=('prefectures', 'poids', 'potentiels'))
+def barres_regions(culture, base_prod):
+    _, df_reg = tableau_territorial(culture, base_prod)
+    fig_prod = px.bar(
+        df_reg, x='Region', y='Production',
+        color='Production', color_continuous_scale='Greens',
+        text_auto='.2s'
+    )
+    fig_prod.update_layout(height=380, showlegend=False, coloraxis_showscale=False, margin=dict(t=20, b=20))
+    return fig_prod
+
+
+@memoiser(taille_max=16)
+def anneau_objectif(base_prod, obj_2040):
+    df_gap = pd.DataFrame({
+        'Indicateur': ['Production Actuelle', 'Déficit à combler'],
+        'Valeur': [base_prod, max(0, obj_2040 - base_prod)]
+    })
+    fig_gap = px.pie(
+        df_gap, values='Valeur', names='Indicateur', hole=0.5,
+        color='Indicateur',
+        color_discrete_map={'Production Actuelle': '#009460', 'Déficit à combler': '#ce1126'}
+    )
+    fig_gap.update_layout(
+        height=380, margin=dict(t=20, b=20, l=0, r=0),
+        legend=dict(orientation="h", yanchor="bottom", y=-0.15, xanchor="center", x=0.5)
+    )
+    return fig_gap
+
+
+@memoiser(taille_max=16)
+def trajectoire_reference(base_prod, obj_2040, taux_croissance, annee_actuelle, annee_cible):
+    annees_projection = list(range(annee_actuelle, annee_cible + 1))
+    prod_projection = moteur.trajectoire(base_prod, taux_croissance, annee_cible - annee_actuelle)
+
+    df_traj = pd.DataFrame({'Année': annees_projection, 'Production (T)': prod_projection})
+    fig_traj = px.line(df_traj, x='Année', y='Production (T)',
+                       title=f"Trajectoire de Référence pour l'Indépendance en {annee_cible}")
+
+    # Ligne d'objectif
+    fig_traj.add_hline(y=obj_2040, line_dash="dash", line_color="red", annotation_text="Objectif 2040")
+
+    # Point d'arrivée (Validation visuelle de la cohérence)
+    fig_traj.add_scatter(x=[annee_cible], y=[obj_2040], mode='markers+text',
+                         text=["Cible"], textposition="top center", name="Objectif")
+    return fig_traj
+
+
+# --- 2. ONGLET 2 : RÉSILIENCE AGRO-CLIMATIQUE ---
+
+@memoiser(taille_max=64)
+def comparaison_simulation(culture, base_prod, prod_simulee):
+    return px.bar(
+        x=['Production Actuelle', f'Projection IA ({culture})'],
+        y=[base_prod, prod_simulee],
+        color=['Actuel', 'IA'],
+        color_discrete_map={'Actuel': '#fcd116', 'IA': '#009460' if prod_simulee >= base_prod else '#ce1126'},
+        title=f"Comparaison : Actuel vs Simulation {culture}"
+    )
+
+
+@memoiser(taille_max=64, depend_de=('calibration',))
+def courbe_resilience(base_prod, type_sol, intrants, irrigation, meteo_actuelle):
+    i_sol = moteur.codes(type_sol, moteur.TYPES_SOL)
+    i_intrants = moteur.codes(intrants, moteur.NIVEAUX_INTRANTS)
+    pluie_range = np.linspace(-50, 50, 21)
+    rendements_courbe = base_prod * moteur.rendement_sol_climat(pluie_range, i_sol, i_intrants, irrigation)
+
+    df_sens = pd.DataFrame({'Pluie (%)': pluie_range, 'Production (T)': rendements_courbe})
+    fig_sens = px.line(
+        df_sens, x='Pluie (%)', y='Production (T)',
+        title=f"Courbe de Résilience : Impact de la Pluie sur Sol {type_sol}",
+        markers=True
+    )
+    fig_sens.add_vline(x=meteo_actuelle, line_dash="dot", line_color="red", annotation_text="Position Curseur")
+    fig_sens.add_hline(y=base_prod, line_dash="dash", line_color="orange", annotation_text="Seuil Actuel")
+    return fig_sens
+
+
+@memoiser(taille_max=64)
+def suivi_ndvi(culture, tendance_ndvi):
+    mois = ["Jan", "Fév", "Mar", "Avr", "Mai", "Juin"]
+    fig_satellite = px.area(
+        x=mois, y=list(tendance_ndvi),
+        title=f"Suivi Satellite NDVI (Tendance 6 mois) - {culture}",
+        labels={'x': 'Mois', 'y': 'Indice NDVI'},
+        color_discrete_sequence=['#1e4d2b']
+    )
+    fig_satellite.add_hrect(y0=0.1, y1=0.4, line_width=0, fillcolor="red", opacity=0.2, annotation_text="ZONE DE CRISE")
+    return fig_satellite
+
+
+@memoiser(taille_max=8, depend_de=('prefectures', 'potentiels'))
+def ndvi_prefectures(culture, origine, signature, i_date, seuil, rayon_km=100):
+    """Tableau NDVI par préfecture à une date et tendance nationale, depuis un raster local.
+
+    `origine` est le chemin ouvert (fichier ou dossier de la série) et `signature` celle de
+    ses fichiers (ndvi.py) : une date ajoutée au dossier renouvelle le résultat.
+    Vigilance : préfectures hors alerte à moins de `rayon_km` d'une préfecture en alerte.
+    """
+    suivi = ndvi.suivi_prefectures(ndvi.ouvrir(origine))
+    df_ndvi = pd.DataFrame({'Region': pd.Categorical.from_codes(referentiel.PREFECTURES['region'], referentiel.REGIONS),
+                            'Pref': referentiel.PREFECTURES['pref']})
+    df_ndvi['NDVI moyen'] = suivi['moyenne'][i_date]
+    df_ndvi['NDVI min'] = suivi['minimum'][i_date]
+    df_ndvi['Anomalie'] = suivi['anomalie'][i_date]
+    df_ndvi['Alerte'] = df_ndvi['NDVI moyen'] < seuil
+    alerte = df_ndvi['Alerte'].to_numpy()
+    lat, lon = referentiel.PREFECTURES['lat'], referentiel.PREFECTURES['lon']
+    _, voisine, distance = proximite.index_prefectures().rayon(lat[alerte], lon[alerte], rayon_km)
+    plus_proche = np.full(len(alerte), np.inf)
+    np.minimum.at(plus_proche, voisine, distance)
+    df_ndvi['Alerte à (km)'] = np.where(np.isfinite(plus_proche), plus_proche, np.nan)
+    df_ndvi['Vigilance'] = ~alerte & np.isfinite(plus_proche)
+    df_ndvi = df_ndvi.sort_values('NDVI moyen').reset_index(drop=True)
+
+    # Tendance nationale pondérée par le nombre de pixels de chaque préfecture
+    pixels = suivi['pixels']
+    national = np.nansum(suivi['moyenne'] * pixels, axis=1) / np.maximum(pixels.sum(axis=1), 1)
+    fig_satellite = go.Figure()
+    fig_satellite.add_trace(go.Scatter(x=suivi['dates'], y=national, name="Moyenne nationale",
+                                       fill='tozeroy', line=dict(color='#1e4d2b')))
+    fig_satellite.add_trace(go.Scatter(x=suivi['dates'], y=np.nanmin(suivi['moyenne'], axis=1),
+                                       name="Préfecture la plus basse", line=dict(color='#ce1126', dash='dot')))
+    fig_satellite.add_hrect(y0=0.1, y1=0.4, line_width=0, fillcolor="red", opacity=0.2, annotation_text="ZONE DE CRISE")
+    fig_satellite.update_layout(title=f"Suivi Satellite NDVI par préfecture - {culture}",
+                                xaxis_title="Date", yaxis_title="Indice NDVI", hovermode="x unified")
+    return df_ndvi, fig_satellite
+
+
+def _resume_risque(resultat):
+    """Indicateurs 2040 et bandes annuelles de toutes les filières : quelques Ko au lieu des tirages."""
+    return {
+        'cultures': resultat['cultures'], 'base_prod': resultat['base_prod'],
+        'n_tirages': len(resultat['production']),
+        'indicateurs': climat.indicateurs_risque(resultat),
+        'bandes': {c: climat.bandes_annuelles(resultat, c) for c in resultat['cultures']},
+    }
+
+
+def calcul_risque(type_sol, intrants, irrigation, loi, ecart_type, correlation, tendance, n_tirages,
+                  suivi=None, intervalle_partiel=0.5):
+    """Tâche de fond (taches.py) : simulation Monte Carlo résumée, résumés partiels au fil des lots.
+
+    Un résumé partiel est publié au plus toutes les `intervalle_partiel` secondes :
+    les quantiles sur les tirages déjà faits ne ralentissent pas la simulation.
+    """
+    parametres = climat.loi_pluie(loi, ecart_type=ecart_type, correlation=correlation, tendance=tendance)
+    rapporter = None
+    if suivi is not None:
+        dernier = [time.monotonic()]
+
+        def rapporter(fraction, partiel):
+            if fraction < 1 and time.monotonic() - dernier[0] > intervalle_partiel:
+                suivi(fraction, _resume_risque(partiel))
+                dernier[0] = time.monotonic()
+            else:
+                suivi(fraction)
+
+    resultat = climat.simuler_risque(
+        moteur.codes(type_sol, moteur.TYPES_SOL), moteur.codes(intrants, moteur.NIVEAUX_INTRANTS),
+        irrigation, parametres, n_tirages=n_tirages, suivi=rapporter
+    )
+    return _resume_risque(resultat)
+
+
+@memoiser(taille_max=32)
+def risque_climatique(culture, resume):
+    """Tableau de risque 2040 par filière et éventail P5-P95 annuel de la filière choisie (voir calcul_risque)."""
+    ind = resume['indicateurs']
+    df_risque = pd.DataFrame({
+        'Filière': ind['cultures'],
+        'P5 (T)': ind['p5'], 'P50 (T)': ind['p50'], 'P95 (T)': ind['p95'],
+        'P(< Actuel)': ind['proba_sous_base'],
+        'Déficit attendu (T)': ind['deficit_attendu'],
+        'ES 5% (T)': ind['es_5'],
+    })
+
+    annees, p5, p50, p95 = resume['bandes'][culture]
+    fig_risque = go.Figure([
+        go.Scatter(x=annees, y=p95, line=dict(width=0), showlegend=False, hoverinfo='skip'),
+        go.Scatter(x=annees, y=p5, fill='tonexty', fillcolor='rgba(0,148,96,0.25)', line=dict(width=0),
+                   name='P5 - P95'),
+        go.Scatter(x=annees, y=p50, line=dict(color='#009460'), name='Médiane (P50)'),
+    ])
+    fig_risque.add_hline(y=resume['base_prod'][resume['cultures'].index(culture)], line_dash="dash",
+                         line_color="orange", annotation_text="Production Actuelle")
+    fig_risque.update_layout(
+        title=f"Éventail de production sous aléa climatique : {culture} ({resume['n_tirages']:,} tirages)",
+        yaxis_title="Production (T)", hovermode="x unified"
+    )
+    return df_risque, fig_risque
+
+
+def calcul_sensibilite(methode, sortie, base_prod, coef_roi, taille, amplitude, suivi=None):
+    """Tâche de fond (taches.py) : indices de Sobol ou de Morris des coefficients du moteur."""
+    contexte = dict(sortie=sortie, base_prod=base_prod, coef_roi=coef_roi, suivi=suivi)
+    if methode == "Sobol":
+        return sensibilite.sobol(taille, amplitude, **contexte)
+    return sensibilite.morris(taille, amplitude=amplitude, **contexte)
+
+
+@memoiser(taille_max=8)
+def analyse_sensibilite(methode, sortie, amplitude, res):
+    """Tableau et barres triées des indices (résultat complet ou partiel de calcul_sensibilite)."""
+    if methode == "Sobol":
+        df = pd.DataFrame({'Coefficient': res['parametres'], 'S1': res['S1'], 'ST': res['ST']})
+        if 'ST_ic' in res:
+            df['ST (IC 95%)'] = [f"[{b:.3f} ; {h:.3f}]" for b, h in zip(*res['ST_ic'])]
+        df = df.sort_values('ST', ascending=False)
+        fig = go.Figure([
+            go.Bar(y=df['Coefficient'], x=df['ST'], orientation='h', name='Total (ST)', marker_color='#009460'),
+            go.Bar(y=df['Coefficient'], x=df['S1'], orientation='h', name='Premier ordre (S1)', marker_color='#FCD116'),
+        ])
+        fig.update_layout(barmode='group', xaxis_title="Part de la variance expliquée", yaxis_autorange='reversed')
+    else:
+        df = pd.DataFrame({
+            'Coefficient': res['parametres'], 'μ* (T)': res['mu_etoile'], 'μ (T)': res['mu'], 'σ (T)': res['sigma'],
+        }).sort_values('μ* (T)', ascending=False)
+        fig = px.scatter(df, x='μ* (T)', y='σ (T)', text='Coefficient')
+        fig.update_traces(marker=dict(color='#009460', size=10), textposition='top center')
+    fig.update_layout(title=f"{sensibilite.SORTIES[sortie]} : coefficients les plus influents (±{amplitude:.0%})",
+                      height=520)
+    return df, fig, {'evaluations': res['evaluations'], 'duree_s': res['duree_s']}
+
+
+# --- 3. ONGLET 3 : VISION 2040 ---
+
+def _chemins(base_prod, ratio_besoin, tx_croissance, annee_debut, annee_fin, cohortes=False):
+    """Chemins de l'onglet 3 ; `cohortes` : démographie de demographie.py au lieu de la croissance uniforme."""
+    years = list(range(annee_debut, annee_fin + 1))
+    if cohortes:
+        population = demographie.population_nationale(annee_debut, annee_fin)
+        chemins = moteur.chemins_vision(base_prod, ratio_besoin, tx_croissance, len(years),
+                                        population=population[0], demo=population / population[0])
+    else:
+        chemins = moteur.chemins_vision(base_prod, ratio_besoin, tx_croissance, len(years))
+    return (years, *chemins)
+
+
+@memoiser(taille_max=64, depend_de=('prefectures',))
+def equilibre_offre_demande(culture, base_prod, ratio_besoin, tx_croissance, annee_debut, annee_fin, cohortes=False):
+    years, prod_path, besoin_path, _ = _chemins(base_prod, ratio_besoin, tx_croissance, annee_debut, annee_fin, cohortes)
+    if cohortes:
+        _, annee_civile = moteur.croisement_chemins(prod_path, besoin_path, annee_debut)
+    else:
+        _, annee_civile = moteur.annee_autosuffisance(ratio_besoin, tx_croissance, annee_debut)
+    annee_auto = int(annee_civile) if annee_civile <= annee_fin else None
+
+    df_vision = pd.DataFrame({
+        'Année': years,
+        'Production': prod_path,
+        'Besoins Population': besoin_path
+    })
+
+    fig_vision = px.line(
+        df_vision, x='Année', y=['Production', 'Besoins Population'],
+        title=f"Équilibre Offre/Demande : {culture} (Projection 2040)",
+        color_discrete_map={'Production': '#009460', 'Besoins Population': '#ce1126'}
+    )
+
+    # Ajout de la ligne verticale d'autosuffisance si elle existe
+    if annee_auto:
+        fig_vision.add_vline(x=annee_auto, line_dash="dot", line_color="blue",
+                             annotation_text=f"Autosuffisance {annee_auto}")
+
+    fig_vision.update_layout(yaxis_title="Volume (Tonnes)", hovermode="x unified")
+    return fig_vision
+
+
+@memoiser(taille_max=64, depend_de=('prefectures',))
+def ration_par_habitant(base_prod, ratio_besoin, tx_croissance, annee_debut, annee_fin, seuil_fao, cohortes=False):
+    years, _, _, dispo_hab = _chemins(base_prod, ratio_besoin, tx_croissance, annee_debut, annee_fin, cohortes)
+    fig_nutri = px.area(
+        x=years, y=dispo_hab,
+        title="Évolution de la ration projetée (kg/hab/an)",
+        labels={'x': 'Année', 'y': 'kg/hab/an'},
+        color_discrete_sequence=['#fcd116']
+    )
+    fig_nutri.add_hline(y=seuil_fao, line_dash="dash", line_color="red",
+                        annotation_text=f"Seuil FAO ({seuil_fao}kg)")
+    return fig_nutri
+
+
+@memoiser(taille_max=32, depend_de=('prefectures', 'poids', 'filieres'))
+def disponibilite_prefectures(culture, base_prod, tx_croissance, annee_debut, annee_fin, seuil_fao):
+    """Disponibilité par préfecture et par année (projection par cohortes, production maillée).
+
+    Chaque préfecture consomme sa propre production : pas d'échanges entre préfectures.
+    Renvoie (df de l'année finale, carte de chaleur préfectures × années, bilan).
+    """
+    years = list(range(annee_debut, annee_fin + 1))
+    prod_path, _, _ = moteur.chemins_vision(base_prod, 1.0, tx_croissance, len(years))
+    parts = grille.grille().sommes_prefectures(culture, 1.0)
+    dispo = demographie.disponibilite_prefectures(prod_path, parts, annee_debut)         # (années, préfectures)
+    population = demographie.population_prefectures(annee_debut, annee_fin)
+    prefectures = referentiel.PREFECTURES
+    df = pd.DataFrame({
+        'Region': pd.Categorical.from_codes(prefectures['region'], referentiel.REGIONS),
+        'Pref': prefectures['pref'],
+        'Population': population[-1].round(), 'Production': prod_path[-1] * parts,
+        'kg/hab/an': dispo[-1], 'Sous le seuil FAO': dispo[-1] < seuil_fao,
+    }).sort_values('kg/hab/an')
+    # Échelle centrée sur le seuil FAO : rouge en dessous, vert au-dessus
+    ordre = np.argsort(dispo[-1])
+    fig = go.Figure(go.Heatmap(
+        z=dispo[:, ordre].T.round(1), x=years, y=prefectures['pref'][ordre],
+        colorscale="RdYlGn", zmid=seuil_fao, colorbar=dict(title="kg/hab/an"),
+        hovertemplate="%{y} %{x}<br>%{z:.1f} kg/hab/an<extra></extra>"
+    ))
+    fig.update_layout(title=f"Disponibilité par préfecture (seuil FAO : {seuil_fao} kg)", height=650,
+                      yaxis=dict(dtick=1), template=None)
+    sous_seuil = dispo < seuil_fao
+    bilan = {
+        'sous_seuil': int(sous_seuil[-1].sum()),
+        'population_sous_seuil': float(population[-1][sous_seuil[-1]].sum()),
+        'population': float(population[-1].sum()),
+        # Préfectures sous le seuil chaque année : le pic et son année
+        'pic': int(sous_seuil.sum(axis=1).max()), 'annee_pic': years[int(sous_seuil.sum(axis=1).argmax())],
+    }
+    return df, fig, bilan
+
+
+@memoiser(taille_max=4, depend_de=('filieres',))
+def table_arbitrages(annee_debut, taux_min=1.0, taux_max=15.0, pas=0.1):
+    """Année d'autosuffisance par taux de croissance (lignes) et par filière (colonnes)."""
+    colonnes = referentiel.colonnes_filieres()
+    taux = np.round(np.arange(taux_min, taux_max + pas / 2, pas), 1)
+    # Un seul appel diffusé : (taux, 1) × (filières,)
+    _, annees = moteur.annee_autosuffisance(colonnes['ratio_besoin'][None, :], taux[:, None], annee_debut)
+    df = pd.DataFrame(annees, index=pd.Index(taux, name="Taux (%)"), columns=referentiel.options_culture)
+    # "Jamais" (croissance ≤ démographie) devient une cellule vide
+    return df.where(np.isfinite(df)).astype("Int64")
+
+
+@memoiser(taille_max=32, depend_de=('filieres', 'poids', 'prefectures'))
+def trajectoire_couplee(culture, annee_fin, tx_croissance, pluie, loi_climat, graine, sol, intrants, irrigation,
+                        budget, part_semences, part_engrais, taux_perte, taux_perte_final, transfo):
+    """Bilan par filière à l'horizon et trajectoires couplées de la filière choisie ("Tout" : somme).
+
+    `loi_climat` : None (pluie constante) ou (loi, écart-type, corrélation, tendance) de climat.loi_pluie.
+    """
+    n_annees = annee_fin - moteur.ANNEE_ACTUELLE + 1
+    parametres = None
+    if loi_climat is not None:
+        loi, ecart_type, correlation, tendance = loi_climat
+        parametres = climat.loi_pluie(loi, ecart_type=ecart_type, correlation=correlation, tendance=tendance)
+    res = couplage.simuler(
+        annee_fin, tx_croissance, couplage.anomalies_pluie(n_annees, pluie, parametres, graine),
+        moteur.codes(sol, moteur.TYPES_SOL), moteur.codes(intrants, moteur.NIVEAUX_INTRANTS), irrigation,
+        budget, part_semences, part_engrais, taux_perte=taux_perte, taux_perte_final=taux_perte_final,
+        transfo=moteur.codes(transfo, moteur.NIVEAUX_TRANSFO)
+    )
+    df_bilan = pd.DataFrame({
+        'Filière': res['filieres'],
+        f'Production {annee_fin} (T)': res['production'][-1].sum(axis=1),
+        f'Disponible {annee_fin} (T)': res['disponible'][-1].sum(axis=1),
+        f'Besoin {annee_fin} (T)': res['besoin'][-1],
+        'Couverture': res['couverture'][-1],
+        'kg/hab/an': res['dispo_hab'][-1],
+        'Année de couverture': pd.array(couplage.annee_couverture(res), dtype="Int64"),
+    })
+
+    # Série annuelle de la filière choisie, ou somme de toutes les filières (et préfectures)
+    colonnes = slice(None) if culture == "Tout" else [res['filieres'].index(culture)]
+    def serie(nom):
+        return res[nom][:, colonnes].reshape(n_annees, -1).sum(axis=1)
+
+    annees = res['annees']
+    fig = go.Figure([
+        go.Scatter(x=annees, y=serie('tendance'), name="Tendance seule (onglet 3)", line=dict(color='gray', dash='dot')),
+        go.Scatter(x=annees, y=serie('production'), name="Production (climat + investissement)",
+                   line=dict(color='#009460')),
+        go.Scatter(x=annees, y=serie('disponible'), name="Disponible après pertes", line=dict(color='#fcd116', width=3)),
+        go.Scatter(x=annees, y=serie('besoin'), name="Besoins Population", line=dict(color='#ce1126')),
+    ])
+    fig.update_layout(title=f"Trajectoire couplée : {culture} ({annees[0]}-{annee_fin})",
+                      yaxis_title="Volume (Tonnes)", hovermode="x unified")
+    return df_bilan, fig
+
+
+# --- 4. ONGLET 4 : FINANCE ---
+
+@memoiser(taille_max=64)
+def structure_investissement(s_sem, s_eng, s_mac):
+    df_pie = pd.DataFrame({
+        'Levier': moteur.LEVIERS,
+        'Valeur': [s_sem, s_eng, s_mac]
+    })
+    fig_pie = px.pie(
+        df_pie, values='Valeur', names='Levier',
+        hole=0.4,
+        color='Levier',
+        color_discrete_map={'Semences': '#ce1126', 'Engrais': '#fcd116', 'Machines': '#009460'}
+    )
+    fig_pie.update_layout(margin=dict(t=20, b=20, l=0, r=0))
+    return fig_pie
+
+
+@memoiser(taille_max=32, depend_de=('filieres',))
+def allocation_optimale(budget, poids_tonnage, plafonds, minimums):
+    """Allocation optimale filières × leviers et frontière de Pareto tonnage / devises."""
+    optimum = optimisation.optimiser_budget(budget, poids_tonnage, plafonds, minimums)
+    frontiere = optimisation.frontiere_pareto(budget, plafonds=plafonds, minimums=minimums)
+
+    df_alloc = pd.DataFrame(optimum['allocation'], index=optimum['filieres'], columns=optimum['leviers'])
+    df_alloc['Gain (T)'] = optimum['tonnes'].sum(axis=1)
+
+    fig_pareto = go.Figure()
+    fig_pareto.add_trace(go.Scatter(
+        x=frontiere['tonnage'], y=frontiere['economie_devises'] / 1e6, mode='lines+markers',
+        name="Frontière de Pareto", line=dict(color='#009460'),
+        customdata=frontiere['poids_tonnage'],
+        hovertemplate="Poids tonnage %{customdata:.2f}<br>%{x:,.0f} T<br>%{y:,.1f} M USD<extra></extra>"
+    ))
+    fig_pareto.add_trace(go.Scatter(
+        x=[optimum['tonnage']], y=[optimum['economie_devises'] / 1e6], mode='markers',
+        name="Allocation retenue", marker=dict(color='#ce1126', size=14, symbol='star')
+    ))
+    fig_pareto.update_layout(title="Arbitrage Tonnage / Économie de devises",
+                             xaxis_title="Gain de production (T)", yaxis_title="Économie de devises (M USD)")
+    return df_alloc, fig_pareto, optimum
+
+
+# --- 5. ONGLET 5 : TRANSFORMATION ---
+
+@memoiser(taille_max=64)
+def flux_de_valeur(culture, base_prod, perte_tonnes, dispo_reelle):
+    fig_valeur = go.Figure(go.Waterfall(
+        name="Flux de production",
+        orientation="v",
+        measure=["relative", "relative", "total"],
+        x=["Production Champ", "Pertes Post-Récolte", "Disponible Final"],
+        textposition="outside",
+        text=[f"+{int(base_prod):,} T", f"-{int(perte_tonnes):,} T", f"={int(dispo_reelle):,} T"],
+        y=[base_prod, -perte_tonnes, 0],  # Le 0 avec 'total' déclenche le calcul automatique
+        connector={"line": {"color": "rgb(63, 63, 63)"}},
+        increasing={"marker": {"color": "#009460"}},  # Vert Guinée
+        decreasing={"marker": {"color": "#ce1126"}},  # Rouge Guinée
+        totals={"marker": {"color": "#fcd116"}}       # Jaune Guinée
+    ))
+
+    fig_valeur.update_layout(
+        title=f"Analyse des pertes et disponibilité : {culture}",
+        showlegend=False,
+        height=450
+    )
+    return fig_valeur
+
+
+@memoiser(taille_max=32, depend_de=('prefectures', 'poids', 'communes'))
+def reseau_logistique(culture, base_prod, taux_perte, n_sites, capacite, perte_silo, perte_km, imposes=(),
+                      communes=False):
+    """Sites de stockage retenus (tableau), carte des flux et bilan du réseau (voir logistique.optimiser).
+
+    `imposes` : noms de préfectures dont le site est ouvert d'office, `n_sites` sites optimaux en plus.
+    """
+    reseau = logistique.reseau_national(communes)
+    indices = tuple(reseau.noms_sites.index(nom) for nom in imposes)
+    res = logistique.optimiser(culture, base_prod, taux_perte, n_sites, capacite, perte_silo, perte_km,
+                               indices, communes)
+    sites = res['indices_sites']
+    noeud_site = reseau.sites[sites]
+
+    df_sites = pd.DataFrame({
+        'Site': res['sites'],
+        'Stocké (T)': res['charge'],
+        'Remplissage (%)': res['charge'] / capacite * 100,
+        'Distance moyenne (km)': res['distance_moyenne'],
+    })
+
+    # Liaisons nœud → site portant au moins 1 % de la production du nœud (segments séparés par None)
+    flux = res['flux'][:, :-1]
+    origine, cible = np.nonzero(flux > 0.01 * res['flux'].sum(axis=1, keepdims=True))
+    lat_l = np.column_stack([reseau.lat[origine], reseau.lat[noeud_site[cible]], np.full(len(origine), np.nan)])
+    lon_l = np.column_stack([reseau.lon[origine], reseau.lon[noeud_site[cible]], np.full(len(origine), np.nan)])
+    reste = res['flux'][:, -1]
+    fig_reseau = go.Figure([
+        go.Scattermapbox(lat=lat_l.ravel(), lon=lon_l.ravel(), mode='lines', line=dict(width=1, color='#1e4d2b'),
+                         name="Acheminement", hoverinfo='skip'),
+        go.Scattermapbox(lat=reseau.lat, lon=reseau.lon, mode='markers', name="Reste à la ferme",
+                         marker=dict(size=5 + 15 * np.sqrt(reste / max(reste.max(), 1.0)), color='#ce1126'),
+                         text=[f"{t:,.0f} T à la ferme" for t in reste], hoverinfo='text'),
+        go.Scattermapbox(lat=reseau.lat[noeud_site], lon=reseau.lon[noeud_site], mode='markers+text',
+                         name="Sites de stockage", marker=dict(size=16, color='#009460'),
+                         text=res['sites'], textposition='top right',
+                         hovertext=[f"{n} : {c:,.0f} T" for n, c in zip(res['sites'], res['charge'])],
+                         hoverinfo='text'),
+    ])
+    fig_reseau.update_layout(
+        height=500, margin={"r": 0, "t": 0, "l": 0, "b": 0}, legend=dict(x=0, y=1),
+        mapbox=dict(style="carto-positron", zoom=5.8, center=dict(lat=10.5, lon=-11.0)),
+    )
+
+    bilan = {cle: res[cle] for cle in ('pertes', 'pertes_sans_reseau', 'stocke', 'production', 'evaluations',
+                                       'noeuds', 'duree_s')}
+    return df_sites, fig_reseau, bilan
+
+
+# --- 6. COMPARAISON DES SCÉNARIOS (onglets 3, 4 et 5) ---
+
+COULEURS_SCENARIOS = ['#ce1126', '#fcd116', '#009460', '#1e4d2b', '#7f7f7f', '#1f77b4', '#9467bd']
+
+
+@memoiser(taille_max=16, depend_de=('filieres',))
+def comparaison_scenarios(culture, budget, annee_fin, scenarios_compares):
+    """Synthèse et figures superposées de plusieurs scénarios : chemins, ROI et tonnage récupéré.
+
+    `scenarios_compares` : paires (nom, paramètres) (voir scenarios.CHAMPS), dans l'ordre d'affichage.
+    """
+    scenarios_compares = dict(scenarios_compares)
+    resultats = scenarios.comparer(culture, budget, annee_fin, scenarios_compares)
+    noms = list(resultats)
+    couleurs = {nom: COULEURS_SCENARIOS[i % len(COULEURS_SCENARIOS)] for i, nom in enumerate(noms)}
+
+    df = pd.DataFrame({
+        'Scénario': noms,
+        'Croissance (%/an)': [scenarios_compares[n]['tx_croissance'] for n in noms],
+        f'Production {annee_fin} (T)': [r['production'][-1] for r in resultats.values()],
+        'Autosuffisance': pd.array([r['annee_autosuffisance'] for r in resultats.values()], dtype="Int64"),
+        f'kg/hab/an {annee_fin}': [r['dispo_hab'][-1] for r in resultats.values()],
+        'Gain investissement (T)': [r['gain_tonnes'] for r in resultats.values()],
+        'Économie (M USD)': [r['economie_devises'] / 1e6 for r in resultats.values()],
+        'Efficacité GNF': [r['rentabilite'] for r in resultats.values()],
+        'Récupéré (T)': [r['recupere'] for r in resultats.values()],
+        'Disponible (T)': [r['disponible'] for r in resultats.values()],
+    })
+
+    premier = next(iter(resultats.values()))
+    fig_chemins = go.Figure([
+        go.Scatter(x=r['annees'], y=r['production'], name=nom, line=dict(color=couleurs[nom]))
+        for nom, r in resultats.items()
+    ])
+    fig_chemins.add_trace(go.Scatter(x=premier['annees'], y=premier['besoin'], name="Besoins Population",
+                                     line=dict(color='black', dash='dash')))
+    fig_chemins.update_layout(title=f"Production projetée par scénario : {culture}", yaxis_title="Volume (Tonnes)",
+                              hovermode="x unified")
+
+    fig_roi = go.Figure(go.Bar(
+        x=noms, y=df['Gain investissement (T)'], marker_color=[couleurs[n] for n in noms],
+        text=[f"{e:.2f}x" for e in df['Efficacité GNF']], textposition='outside',
+    ))
+    fig_roi.update_layout(title=f"Gain de l'investissement ({budget:,} Mds GNF) et efficacité du GNF",
+                          yaxis_title="Gain de production (T)")
+
+    fig_pertes = go.Figure([
+        go.Bar(x=noms, y=[r['disponible'] for r in resultats.values()], name="Disponible après pertes",
+               marker_color='#fcd116'),
+        go.Bar(x=noms, y=[r['recupere'] for r in resultats.values()], name="Récupéré par l'industrie",
+               marker_color='#009460'),
+    ])
+    fig_pertes.update_layout(barmode='stack', title="Disponible et tonnage récupéré (onglet 5)",
+                             yaxis_title="Volume (Tonnes)")
+    return df, fig_chemins, fig_roi, fig_pertes
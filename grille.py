@@ -0,0 +1,255 @@
+"""Production maillée : la production de chaque filière répartie sur une grille régulière.
+
+Le référentiel donne le même poids à toutes les préfectures d'une région. Ici, la
+part nationale de chaque région (somme des poids de ses préfectures) est répartie
+entre ses mailles par des noyaux gaussiens centrés sur ses chefs-lieux, multipliés
+par un masque d'aptitude des sols s'il y en a un. Chaque maille appartient
+à la région du chef-lieu le plus proche (même affectation que les pixels NDVI, ndvi.py).
+
+Le résultat (filières × lignes × colonnes, float32, parts de la production nationale)
+est écrit par bandes de lignes dans un `.npy` projeté en mémoire, avec les sommes
+zonales par préfecture dans le `.json` voisin : cartes, sommes et exports le relisent
+sans recalcul, et seule une bande à la fois passe en mémoire, quelle que soit la
+résolution. Le nom du fichier porte une empreinte du référentiel, de la résolution,
+du noyau et du masque : il est reconstruit quand l'un d'eux change.
+
+Masque d'aptitude (facultatif) : `donnees/grille/aptitude.npy`, valeurs de 0 à 1, de
+forme (lignes, colonnes) ou (filières, lignes, colonnes) à la résolution de la grille.
+
+    python grille.py --resolution 0.0025   # ≈ 6,7 millions de mailles : durée, taille, mémoire
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+import referentiel
+from cache import memoiser
+from ndvi import HORS_ZONE, _affecter
+
+DOSSIER_DEFAUT = Path(__file__).resolve().parent / "donnees" / "grille"
+EMPRISE = (-15.1, 12.7, -7.6, 7.1)  # lon0, lat0 (nord), lon1, lat1 (sud), comme ndvi.generer_demo
+RESOLUTION = 0.05   # Degrés
+SIGMA_KM = 40.0     # Portée des noyaux autour des chefs-lieux
+MAILLES_BANDE = 1 << 20  # Mailles traitées à la fois (≈ 4 Mo par tableau float32)
+KM_DEGRE_LAT = 110.57
+KM_DEGRE_LON_EQUATEUR = 111.32
+
+
+def dossier_defaut():
+    return Path(os.environ.get("UPDIA_GRILLE") or DOSSIER_DEFAUT)
+
+
+def geometrie(resolution=RESOLUTION):
+    """(lignes, colonnes) et transform [lon0, dlon, lat0, dlat] de la grille sur l'emprise."""
+    lon0, lat0, lon1, lat1 = EMPRISE
+    forme = (int(round((lat0 - lat1) / resolution)), int(round((lon1 - lon0) / resolution)))
+    return forme, (lon0, resolution, lat0, -resolution)
+
+
+def _aptitude(dossier, forme):
+    """Masque d'aptitude projeté en mémoire (filières ou 1, lignes, colonnes), ou None."""
+    chemin = Path(dossier) / "aptitude.npy"
+    if not chemin.exists():
+        return None
+    masque = np.load(chemin, mmap_mode="r")
+    masque = masque[None] if masque.ndim == 2 else masque
+    if masque.shape[1:] != tuple(forme) or masque.shape[0] not in (1, len(referentiel.options_culture)):
+        raise ValueError(f"{chemin} : forme {masque.shape}, attendu {tuple(forme)} "
+                         f"ou ({len(referentiel.options_culture)}, {forme[0]}, {forme[1]})")
+    return masque
+
+
+def _empreinte(resolution, sigma_km, dossier):
+    h = hashlib.sha1()
+    h.update("|".join(referentiel.options_culture).encode("utf-8"))
+    for tableau in (referentiel.PREFECTURES['lat'], referentiel.PREFECTURES['lon'], referentiel.PREFECTURES['region'],
+                    referentiel.POIDS_REGIONAUX):
+        h.update(np.ascontiguousarray(tableau, dtype=float).tobytes())
+    h.update(repr((resolution, sigma_km, EMPRISE)).encode())
+    aptitude = Path(dossier) / "aptitude.npy"
+    if aptitude.exists():
+        h.update(str(aptitude.stat().st_mtime_ns).encode())
+    return h.hexdigest()[:10]
+
+
+def _parts_regionales():
+    """Part nationale de chaque région (filières × régions) : poids des préfectures sommés par région."""
+    poids = referentiel.poids_prefectures(referentiel.options_culture)
+    regions = referentiel.PREFECTURES['region']
+    parts = np.stack([np.bincount(regions, weights=ligne, minlength=len(referentiel.REGIONS)) for ligne in poids])
+    return parts / parts.sum(axis=1, keepdims=True)
+
+
+def _noyau(lat, lon, mailles, sigma_km):
+    """Somme des noyaux des chefs-lieux de la région de chaque maille (bande lignes × colonnes)."""
+    prefectures = referentiel.PREFECTURES
+    regions = prefectures['region'].astype(np.int16)
+    region_maille = np.where(mailles == HORS_ZONE, -1, regions[np.minimum(mailles, len(regions) - 1)])
+    noyau = np.zeros(mailles.shape, dtype=np.float32)
+    for k, (lat_k, lon_k, region_k) in enumerate(zip(prefectures['lat'], prefectures['lon'], prefectures['region'])):
+        # Noyau séparable : un produit extérieur de deux gaussiennes par chef-lieu
+        dy = ((lat - lat_k) * KM_DEGRE_LAT / sigma_km) ** 2
+        dx = ((lon - lon_k) * KM_DEGRE_LON_EQUATEUR * np.cos(np.radians(lat_k)) / sigma_km) ** 2
+        contribution = np.exp(-0.5 * dy).astype(np.float32)[:, None] * np.exp(-0.5 * dx).astype(np.float32)[None, :]
+        noyau += np.where(region_maille == region_k, contribution, np.float32(0))
+    return noyau, region_maille
+
+
+def construire(resolution=RESOLUTION, sigma_km=SIGMA_KM, dossier=None):
+    """Écrit la grille (filières × lignes × colonnes, float32) et son .json ; renvoie le chemin du .npy.
+
+    Deux passages par bandes : noyaux × aptitude et sommes par région, puis mise à
+    l'échelle des parts régionales et sommes zonales par préfecture.
+    """
+    dossier = Path(dossier or dossier_defaut())
+    dossier.mkdir(parents=True, exist_ok=True)
+    debut_chrono = time.perf_counter()
+    (hauteur, largeur), transform = geometrie(resolution)
+    lon0, dlon, lat0, dlat = transform
+    lon = lon0 + dlon * (np.arange(largeur) + 0.5)
+    cultures = referentiel.options_culture
+    n_regions, n_pref = len(referentiel.REGIONS), len(referentiel.PREFECTURES['pref'])
+    aptitude = _aptitude(dossier, (hauteur, largeur))
+    hauteur_bande = max(1, MAILLES_BANDE // largeur)
+
+    chemin = dossier / f"production-{resolution:g}-{_empreinte(resolution, sigma_km, dossier)}.npy"
+    provisoire = chemin.with_name(f"{chemin.stem}.{os.getpid()}.tmp.npy")
+    forme = (len(cultures), hauteur, largeur)
+    entete = np.lib.format.open_memmap(provisoire, mode="w+", dtype=np.float32, shape=forme).offset
+
+    def bande_fichier(f, debut, fin):
+        # Seule la bande est projetée : les pages écrites quittent la mémoire du processus avec elle
+        decalage = entete + (f * hauteur + debut) * largeur * 4
+        return np.memmap(provisoire, dtype=np.float32, mode="r+", offset=decalage, shape=(fin - debut, largeur))
+
+    try:
+        # 1. Noyaux × aptitude (non normalisés) et leur somme par filière et par région
+        mailles = np.empty((hauteur, largeur), dtype=np.uint8)
+        sommes = np.zeros((len(cultures), n_regions))
+        for debut in range(0, hauteur, hauteur_bande):
+            fin = min(hauteur, debut + hauteur_bande)
+            lat = lat0 + dlat * (np.arange(debut, fin) + 0.5)
+            mailles[debut:fin] = _affecter(lat, lon)
+            noyau, region_maille = _noyau(lat, lon, mailles[debut:fin], sigma_km)
+            dans_zone = region_maille >= 0
+            for f in range(len(cultures)):
+                bande = noyau if aptitude is None else noyau * aptitude[f % len(aptitude), debut:fin]
+                bande_fichier(f, debut, fin)[:] = bande
+                sommes[f] += np.bincount(region_maille[dans_zone], weights=bande[dans_zone], minlength=n_regions)
+
+        # 2. Parts régionales réparties au prorata des noyaux ; une région sans maille est redistribuée
+        parts_regionales = _parts_regionales() * (sommes > 0)
+        parts_regionales /= parts_regionales.sum(axis=1, keepdims=True)
+        facteur = np.divide(parts_regionales, sommes, out=np.zeros_like(sommes), where=sommes > 0)
+        zonales = np.zeros((len(cultures), n_pref))
+        for debut in range(0, hauteur, hauteur_bande):
+            fin = min(hauteur, debut + hauteur_bande)
+            bande_mailles = mailles[debut:fin]
+            dans_zone = bande_mailles != HORS_ZONE
+            region_maille = referentiel.PREFECTURES['region'][np.where(dans_zone, bande_mailles, 0)]
+            for f in range(len(cultures)):
+                bande = bande_fichier(f, debut, fin)
+                bande *= np.where(dans_zone, facteur[f][region_maille], 0).astype(np.float32)
+                zonales[f] += np.bincount(bande_mailles[dans_zone], weights=bande[dans_zone], minlength=n_pref)
+                bande.flush()
+        # Les mailles sont en float32 : sommes zonales recalées en float64 sur les parts régionales exactes
+        regions = referentiel.PREFECTURES['region']
+        par_region = np.stack([np.bincount(regions, weights=ligne, minlength=n_regions) for ligne in zonales])
+        zonales *= np.divide(parts_regionales, par_region, out=np.zeros_like(par_region), where=par_region > 0)[:, regions]
+        np.save(chemin.with_name(f"{chemin.stem}.mailles.npy"), mailles)
+        os.replace(provisoire, chemin)
+    finally:
+        provisoire.unlink(missing_ok=True)
+    chemin.with_suffix(".json").write_text(json.dumps({
+        'transform': list(transform), 'forme': [hauteur, largeur], 'cultures': list(cultures),
+        'sigma_km': sigma_km, 'aptitude': aptitude is not None,
+        'zonales': zonales.tolist(), 'duree_s': round(time.perf_counter() - debut_chrono, 3),
+    }, ensure_ascii=False), encoding="utf-8")
+    return chemin
+
+
+class Grille:
+    """Parts de production maillées (lecture seule, projetées en mémoire) et sommes zonales."""
+
+    def __init__(self, chemin):
+        self.chemin = Path(chemin)
+        meta = json.loads(self.chemin.with_suffix(".json").read_text(encoding="utf-8"))
+        self.parts = np.load(self.chemin, mmap_mode="r")
+        self.mailles = np.load(self.chemin.with_name(f"{self.chemin.stem}.mailles.npy"), mmap_mode="r")
+        self.transform = tuple(meta['transform'])
+        self.forme = tuple(meta['forme'])
+        self.cultures = list(meta['cultures'])
+        self.zonales = np.array(meta['zonales'])
+        self.duree_s = meta['duree_s']
+
+    def sommes_prefectures(self, culture, base_prod):
+        """Production (T) de chaque préfecture : somme de ses mailles."""
+        return self.zonales[self.cultures.index(culture)] * base_prod
+
+    def apercu(self, culture, base_prod, taille_max=200):
+        """Production (T) agrégée en blocs d'au plus `taille_max` × `taille_max` : (valeurs, lat, lon)."""
+        hauteur, largeur = self.forme
+        pas = max(1, -(-max(hauteur, largeur) // taille_max))
+        h, w = -(-hauteur // pas), -(-largeur // pas)
+        agrege = np.zeros((h, w))
+        couche = self.parts[self.cultures.index(culture)]
+        # Bandes de `pas` lignes alignées sur les blocs : la couche n'est jamais lue en entier
+        lignes_bande = pas * max(1, MAILLES_BANDE // (pas * largeur))
+        for debut in range(0, hauteur, lignes_bande):
+            bande = np.asarray(couche[debut:debut + lignes_bande], dtype=float)
+            bande = np.pad(bande, ((0, -len(bande) % pas), (0, w * pas - largeur)))
+            agrege[debut // pas:debut // pas + len(bande) // pas] = bande.reshape(-1, pas, w, pas).sum(axis=(1, 3))
+        lon0, dlon, lat0, dlat = self.transform
+        lat = lat0 + dlat * pas * (np.arange(h) + 0.5)
+        lon = lon0 + dlon * pas * (np.arange(w) + 0.5)
+        return agrege * base_prod, lat, lon
+
+
+@memoiser(taille_max=2, ttl=None, depend_de=('prefectures', 'poids', 'filieres'))
+def _ouvrir(resolution, sigma_km, dossier, empreinte):
+    chemin = Path(dossier) / f"production-{resolution:g}-{empreinte}.npy"
+    if not (chemin.exists() and chemin.with_suffix(".json").exists()):
+        chemin = construire(resolution, sigma_km, dossier)
+    return Grille(chemin)
+
+
+def grille(resolution=RESOLUTION, sigma_km=SIGMA_KM):
+    """Grille courante du dossier par défaut, construite au premier appel si son fichier manque."""
+    dossier = dossier_defaut()
+    return _ouvrir(resolution, sigma_km, str(dossier), _empreinte(resolution, sigma_km, dossier))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Production maillée : construction et lecture de la grille.")
+    parser.add_argument("--resolution", type=float, default=RESOLUTION, help="Pas de la grille (degrés)")
+    parser.add_argument("--sigma", type=float, default=SIGMA_KM, help="Portée des noyaux (km)")
+    parser.add_argument("--dossier", help="Dossier de sortie (défaut : donnees/grille)")
+    args = parser.parse_args(argv)
+    import resource
+
+    referentiel.synchroniser()
+    debut = time.perf_counter()
+    chemin = construire(args.resolution, args.sigma, args.dossier)
+    duree = time.perf_counter() - debut
+    g = Grille(chemin)
+    mailles = g.forme[0] * g.forme[1]
+    print(f"{chemin} : {len(g.cultures)} filières × {g.forme[0]} × {g.forme[1]} = {mailles:,} mailles, "
+          f"{chemin.stat().st_size / 2 ** 20:.1f} Mo, {duree:.2f} s")
+    print(f"Mémoire résidente maximale : {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} Mo")
+    for culture in g.cultures:
+        base_prod = referentiel.profil_filiere(culture)['prod']
+        debut = time.perf_counter()
+        g.apercu(culture, base_prod)
+        print(f"  {culture:<8} somme des mailles {g.sommes_prefectures(culture, base_prod).sum():>12,.0f} T "
+              f"(filière : {base_prod:,.0f} T), aperçu {(time.perf_counter() - debut) * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,438 @@
+"""Réseau logistique post-récolte (onglet 5) : acheminement vers les silos et choix des sites.
+
+La récolte de chaque nœud (préfecture, ou commune si l'entrepôt en fournit) reste à la
+ferme, où elle subit le taux de pertes national de l'onglet 5, ou part vers un site de
+stockage et de transformation de capacité limitée : elle y perd le taux du silo plus
+un taux par kilomètre de route. Les sites candidats sont les chefs-lieux de préfecture.
+
+- Routes : graphe creux des plus proches voisins (index de proximite.py, liaisons
+  symétriques), longueur = distance à vol d'oiseau × facteur de détour ; plus courts
+  chemins depuis tous les sites à la fois, par relaxations vectorisées (Bellman-Ford
+  sur des tableaux N × k).
+- Acheminement : flot de coût minimal (pertes totales) du problème de transport
+  nœuds → sites, la ferme étant un site sans limite. Sans site saturé, chaque nœud
+  part vers son option la moins coûteuse. Sinon, les sites se remplissent depuis la
+  ferme par plus courts chemins successifs dans le graphe résiduel réduit aux sites
+  (un arc a → b = réaffecter au site b un nœud servi par a) : un graphe de S + 1
+  sommets, quel que soit le nombre de nœuds, dont les arcs sont lus dans des tas.
+- Sites optimaux : ajout glouton du site qui réduit le plus les pertes, évaluations
+  paresseuses (un gain ne peut que baisser quand le réseau s'étoffe).
+
+    python logistique.py --noeuds 5000   # réseau aléatoire : temps de résolution
+    python logistique.py --verifier 500  # acheminement comparé à un flot de référence
+"""
+import argparse
+import heapq
+import sys
+import time
+
+import numpy as np
+
+import referentiel
+from cache import memoiser
+from proximite import Index, haversine_km
+
+DETOUR_ROUTE = 1.3      # Longueur de route / distance à vol d'oiseau
+VOISINS_ROUTE = 4       # Liaisons routières par nœud (avant symétrisation)
+PERTE_SILO = 5.0        # Pertes en silo moderne (%)
+PERTE_KM = 2.0          # Pertes de transport (% par 100 km)
+CAPACITE_SITE = 100_000  # Capacité d'un site (T)
+
+
+def graphe_routier(lat, lon, voisins=VOISINS_ROUTE):
+    """Liaisons routières : (voisins (N, d), longueurs km (N, d)), complétées par des boucles de longueur infinie.
+
+    Chaque nœud est relié à ses `voisins` plus proches ; les liaisons sont rendues
+    symétriques, d'où un degré variable d (au plus quelques fois `voisins`).
+    """
+    lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+    n = len(lat)
+    k = min(voisins, n - 1)
+    if k <= 0:
+        return np.zeros((n, 1), dtype=np.int64), np.full((n, 1), np.inf)
+    # Plus proches voisins (index spatial) : chaque nœud se trouve lui-même, ou un doublon à 0 km
+    proches, _ = Index(lat, lon).voisins(lat, lon, k + 1)
+    soi = proches == np.arange(n)[:, None]
+    soi[~soi.any(axis=1), -1] = True
+    proches = proches[~soi].reshape(n, k)
+    origine = np.repeat(np.arange(n), k)
+    codes = np.unique(np.concatenate([origine * n + proches.ravel(), proches.ravel() * n + origine]))
+    de, vers = codes // n, codes % n  # Triées par origine
+    degre = np.bincount(de, minlength=n)
+    rang = np.arange(len(codes)) - np.repeat(np.cumsum(degre) - degre, degre)
+    voisins_idx = np.repeat(np.arange(n)[:, None], degre.max(), axis=1)
+    voisins_idx[de, rang] = vers
+    longueurs = np.full(voisins_idx.shape, np.inf)
+    longueurs[de, rang] = DETOUR_ROUTE * haversine_km(lat[de], lon[de], lat[vers], lon[vers])
+    return voisins_idx, longueurs
+
+
+def distances_routieres(voisins, longueurs, origines):
+    """Plus courtes distances (km) de chaque origine à chaque nœud, (len(origines), N).
+
+    Relaxations Bellman-Ford de toutes les origines à la fois, limitées aux voisins des
+    nœuds améliorés au tour précédent ; un nœud non relié reste à distance infinie.
+    """
+    n = len(voisins)
+    dist = np.full((len(origines), n), np.inf)
+    dist[np.arange(len(origines)), origines] = 0.0
+    actifs = np.unique(np.asarray(origines))
+    while len(actifs):
+        # Liaisons symétriques : les nœuds à relaxer sont les voisins des nœuds améliorés
+        a_relaxer = np.unique(voisins[actifs])
+        relaxe = (dist[:, voisins[a_relaxer]] + longueurs[a_relaxer]).min(axis=2)
+        ameliore = (relaxe < dist[:, a_relaxer]).any(axis=0)
+        actifs = a_relaxer[ameliore]
+        dist[:, actifs] = np.minimum(dist[:, actifs], relaxe[:, ameliore])
+    return dist
+
+
+def acheminer(offre, cout, capacite, cout_local):
+    """Flot de coût minimal : offre des nœuds répartie entre sites et ferme.
+
+    `offre` (N,) en T ; `cout` (N, S) : taux de pertes vers chaque site ; `capacite` (S,)
+    en T ; `cout_local` (N,) ou scalaire : taux de pertes à la ferme. Renvoie le flux
+    (N, S + 1), la dernière colonne étant la part restée à la ferme.
+
+    Sans site saturé, chaque nœud va à son option la moins coûteuse. Sinon, tout part de
+    la ferme et les sites se remplissent par plus courts chemins successifs depuis la
+    ferme (graphe résiduel réduit aux sites : a → b réaffecte à b un nœud servi par a),
+    tant qu'un chemin réduit les pertes. Un chemin direct ferme → site déplace d'un coup
+    tous les nœuds qui restent moins coûteux que tout autre chemin.
+    """
+    offre = np.asarray(offre, dtype=float)
+    n, s = np.shape(cout)
+    ferme, m = s, s + 1
+    c = np.concatenate([np.asarray(cout, dtype=float), np.broadcast_to(cout_local, (n,))[:, None]], axis=1)
+    cap = np.append(np.asarray(capacite, dtype=float), np.inf)
+    tolerance = 1e-9 * max(offre.sum(), 1.0)
+    flux = np.zeros((n, m))
+
+    premier = c.argmin(axis=1)
+    if (np.bincount(premier, weights=offre, minlength=m) <= cap + tolerance).all():
+        flux[np.arange(n), premier] = offre
+        return flux
+
+    flux[:, ferme] = offre
+    charge = np.zeros(m)
+    membres = [set() for _ in range(s)]
+    ecart_ferme = c[:, :s] - c[:, ferme:]
+
+    # Tant qu'aucun site n'est plein, le plus court chemin est l'arc direct du nœud au plus
+    # fort gain vers son meilleur site : ces premières augmentations se font d'un bloc
+    meilleur_site = ecart_ferme.argmin(axis=1)
+    gain = ecart_ferme[np.arange(n), meilleur_site]
+    rangs = np.argsort(gain, kind='stable')
+    rangs = rangs[gain[rangs] < -1e-15]
+    cumul = np.cumsum(np.eye(s)[meilleur_site[rangs]] * offre[rangs, None], axis=0)
+    deborde = np.flatnonzero(cumul[np.arange(len(rangs)), meilleur_site[rangs]] > cap[meilleur_site[rangs]])
+    fin = deborde[0] if len(deborde) else len(rangs)
+    pris = rangs[:fin]
+    flux[pris, meilleur_site[pris]] = offre[pris]
+    flux[pris, ferme] = 0.0
+    np.add.at(charge, meilleur_site[pris], offre[pris])
+    if len(deborde):
+        i, j = rangs[fin], meilleur_site[rangs[fin]]
+        flux[i, j] = cap[j] - charge[j]
+        flux[i, ferme] -= flux[i, j]
+        charge[j] = cap[j]
+        pris = rangs[:fin + 1]
+
+    # Tas (variation de pertes, nœud) par arc a → b : la variation d'un nœud est fixe, les
+    # nœuds partis de a sont écartés à la lecture
+    tas = [[[] for _ in range(m)] for _ in range(s)]
+    for a in range(s):
+        servis = pris[meilleur_site[pris] == a]
+        membres[a].update(servis.tolist())
+        ecart = c[servis] - c[servis, a][:, None]
+        for b in range(m):
+            if b != a:
+                tri = np.argsort(ecart[:, b], kind='stable')
+                tas[a][b] = list(zip(ecart[tri, b].tolist(), servis[tri].tolist()))
+
+    def ajouter(i, a):
+        if i not in membres[a]:
+            membres[a].add(i)
+            for b in range(m):
+                if b != a:
+                    heapq.heappush(tas[a][b], (c[i, b] - c[i, a], i))
+
+    # Nœuds de la ferme triés, pour chaque site, par variation de pertes s'ils y partent
+    ordre = np.argsort(ecart_ferme, axis=0, kind='stable')
+    curseur = np.zeros(s, dtype=np.int64)
+    tout = np.arange(m)
+
+    while True:
+        poids, noeud = np.full((m, m), np.inf), np.zeros((m, m), dtype=np.int64)
+        for j in range(s):
+            while curseur[j] < n and flux[ordre[curseur[j], j], ferme] <= tolerance:
+                curseur[j] += 1
+            if curseur[j] < n:
+                noeud[ferme, j] = ordre[curseur[j], j]
+                poids[ferme, j] = ecart_ferme[noeud[ferme, j], j]
+        for a in range(s):
+            for b in range(m):
+                t = tas[a][b]
+                while t and t[0][1] not in membres[a]:
+                    heapq.heappop(t)
+                if t:
+                    poids[a, b], noeud[a, b] = t[0]
+        # Bellman-Ford depuis la ferme (arcs négatifs, aucun cycle négatif)
+        dist, pred = np.full(m, np.inf), np.full(m, -1)
+        dist[ferme] = 0.0
+        for _ in range(m - 1):
+            candidat = dist[:, None] + poids
+            meilleur = candidat.argmin(axis=0)
+            nouveau = candidat[meilleur, tout]
+            ameliore = nouveau < dist - 1e-15
+            if not ameliore.any():
+                break
+            dist[ameliore], pred[ameliore] = nouveau[ameliore], meilleur[ameliore]
+        libre = cap - charge
+        cible = np.where((libre > tolerance) & (tout != ferme), dist, np.inf)
+        arrivee = int(cible.argmin())
+        if not cible[arrivee] < -1e-15:
+            return flux  # Plus aucun chemin ne réduit les pertes
+
+        if pred[arrivee] == ferme:
+            # Chemin direct : nœuds de la ferme pris dans l'ordre tant qu'aucun autre chemin n'est plus court
+            autres = np.delete(cible, arrivee)
+            via = np.delete(dist + poids[:, arrivee], [ferme, arrivee])
+            borne = min(0.0, autres.min(initial=np.inf), via.min(initial=np.inf))
+            place = libre[arrivee]
+            j = arrivee
+            for rang in range(curseur[j], n):
+                i = ordre[rang, j]
+                if place <= tolerance or (rang > curseur[j] and ecart_ferme[i, j] > borne + 1e-15):
+                    break
+                if ecart_ferme[i, j] >= -1e-15:
+                    break
+                quantite = min(flux[i, ferme], place)
+                if quantite <= tolerance:
+                    continue
+                flux[i, ferme] -= quantite
+                flux[i, j] += quantite
+                ajouter(i, j)
+                place -= quantite
+                charge[j] += quantite
+            continue
+
+        arcs, b = [], arrivee
+        while b != ferme:
+            a = pred[b]
+            arcs.append((a, b, noeud[a, b]))
+            b = a
+        quantite = min(libre[arrivee], *(flux[i, a] for a, b, i in arcs))
+        for a, b, i in arcs:
+            flux[i, a] -= quantite
+            flux[i, b] += quantite
+            if b != ferme:
+                ajouter(i, b)
+            if a != ferme and flux[i, a] <= tolerance:
+                flux[i, a] = 0.0
+                membres[a].discard(i)
+        charge[arrivee] += quantite
+
+
+class Reseau:
+    """Nœuds producteurs, sites candidats et distances routières nœud × site."""
+
+    def __init__(self, lat, lon, sites, noms_sites):
+        self.lat, self.lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+        self.sites = np.asarray(sites)  # Indices des nœuds candidats
+        self.noms_sites = list(noms_sites)
+        self.voisins, self.longueurs = graphe_routier(self.lat, self.lon)
+        dist = distances_routieres(self.voisins, self.longueurs, self.sites).T
+        # Composante non reliée : repli sur la distance à vol d'oiseau × détour
+        repli = DETOUR_ROUTE * haversine_km(self.lat[:, None], self.lon[:, None],
+                                            self.lat[self.sites], self.lon[self.sites])
+        self.distances = np.where(np.isfinite(dist), dist, repli)
+        self.distances.flags.writeable = False
+
+    def pertes(self, offre, sites, capacite, taux_ferme, perte_silo=PERTE_SILO, perte_km=PERTE_KM):
+        """Flux (N, len(sites) + 1) et pertes totales (T) pour un jeu de sites ouverts (indices de candidats)."""
+        cout = (perte_silo + perte_km * self.distances[:, sites] / 100) / 100
+        flux = acheminer(offre, cout, np.broadcast_to(capacite, (len(sites),)), taux_ferme / 100)
+        taux = np.concatenate([cout, np.full((len(offre), 1), taux_ferme / 100)], axis=1)
+        return flux, float((flux * taux).sum())
+
+    def sites_optimaux(self, offre, n_sites, capacite, taux_ferme, perte_silo=PERTE_SILO, perte_km=PERTE_KM,
+                       imposes=()):
+        """Ajout glouton des `n_sites` sites (en plus des `imposes`) qui réduisent le plus les pertes.
+
+        Évaluations paresseuses : le gain d'un candidat, calculé quand le réseau était plus
+        petit, majore son gain actuel ; seul le candidat en tête est réévalué.
+        """
+        ouverts = list(imposes)
+        _, courant = self.pertes(offre, ouverts, capacite, taux_ferme, perte_silo, perte_km)
+        tas = [(-np.inf, j) for j in range(len(self.sites)) if j not in ouverts]
+        heapq.heapify(tas)
+        evaluations = 0
+        while len(ouverts) < len(imposes) + n_sites and tas:
+            while True:
+                _, j = heapq.heappop(tas)
+                _, pertes_j = self.pertes(offre, ouverts + [j], capacite, taux_ferme, perte_silo, perte_km)
+                evaluations += 1
+                gain = courant - pertes_j
+                if not tas or gain >= -tas[0][0]:
+                    break
+                heapq.heappush(tas, (-gain, j))
+            ouverts.append(j)
+            courant = pertes_j
+        return ouverts, evaluations
+
+
+@memoiser(taille_max=4, ttl=None, depend_de=('prefectures', 'communes'))
+def reseau_national(communes=False):
+    """Réseau des préfectures, ou des communes et chefs-lieux ; sites candidats : les chefs-lieux."""
+    prefectures = referentiel.PREFECTURES
+    lat, lon = prefectures['lat'], prefectures['lon']
+    if communes:
+        lat = np.concatenate([referentiel.COMMUNES['lat'], lat])
+        lon = np.concatenate([referentiel.COMMUNES['lon'], lon])
+    n_pref = len(prefectures['pref'])
+    return Reseau(lat, lon, np.arange(len(lat) - n_pref, len(lat)), prefectures['pref'])
+
+
+def offre_nationale(culture, base_prod, communes=False):
+    """Production (T) de chaque nœud de reseau_national : préfectures (poids de l'onglet 1) ou communes."""
+    poids = referentiel.poids_prefectures([culture])[0]
+    production = base_prod * poids / poids.sum()
+    if not communes:
+        return production
+    rang = referentiel.COMMUNES['pref']
+    # Une préfecture dont les communes sont connues répartit sa production entre elles
+    couverte = np.bincount(rang, weights=referentiel.COMMUNES['part'], minlength=len(production)) > 0
+    return np.concatenate([production[rang] * referentiel.COMMUNES['part'], np.where(couverte, 0.0, production)])
+
+
+def optimiser(culture, base_prod, taux_ferme, n_sites=4, capacite=CAPACITE_SITE, perte_silo=PERTE_SILO,
+              perte_km=PERTE_KM, imposes=(), communes=False):
+    """Sites retenus, flux et bilan du réseau (pertes comparées au taux national appliqué partout)."""
+    debut = time.perf_counter()
+    reseau = reseau_national(communes)
+    offre = offre_nationale(culture, base_prod, communes)
+    sites, evaluations = reseau.sites_optimaux(offre, n_sites, capacite, taux_ferme, perte_silo, perte_km,
+                                               list(imposes))
+    flux, pertes = reseau.pertes(offre, sites, capacite, taux_ferme, perte_silo, perte_km)
+    return {
+        'sites': [reseau.noms_sites[j] for j in sites], 'indices_sites': sites, 'flux': flux,
+        'charge': flux[:, :-1].sum(axis=0), 'capacite': capacite,
+        'distance_moyenne': np.divide((flux[:, :-1] * reseau.distances[:, sites]).sum(axis=0), flux[:, :-1].sum(axis=0),
+                                      out=np.zeros(len(sites)), where=flux[:, :-1].sum(axis=0) > 0),
+        'pertes': pertes, 'pertes_sans_reseau': float(offre.sum() * taux_ferme / 100),
+        'stocke': float(flux[:, :-1].sum()), 'production': float(offre.sum()),
+        'evaluations': evaluations, 'noeuds': len(offre), 'duree_s': time.perf_counter() - debut,
+    }
+
+
+def _flot_naif(offre, cout, capacite, cout_local):
+    """Référence pour `verifier` : plus courts chemins successifs sur le graphe complet.
+
+    Source → nœuds → sites et ferme → puits, graphe résiduel dense et Bellman-Ford à chaque
+    augmentation : lent (petits réseaux seulement) mais sans aucun des raccourcis d'`acheminer`.
+    """
+    n, s = np.shape(cout)
+    m = s + 1
+    source, puits = n + m, n + m + 1
+    v = n + m + 2
+    residu, poids = np.zeros((v, v)), np.full((v, v), np.inf)
+    c = np.concatenate([np.asarray(cout, dtype=float), np.broadcast_to(cout_local, (n,))[:, None]], axis=1)
+    residu[source, :n], poids[source, :n] = offre, 0.0
+    residu[:n, n:n + m], poids[:n, n:n + m] = np.inf, c
+    poids[n:n + m, :n] = -c.T  # Arcs de retour, ouverts quand un flux passe
+    residu[n:n + m, puits] = np.append(np.asarray(capacite, dtype=float), np.inf)
+    poids[n:n + m, puits], poids[puits, n:n + m] = 0.0, 0.0
+    tolerance = 1e-9 * max(np.sum(offre), 1.0)
+    while residu[source].sum() > tolerance:
+        ouvert = np.where(residu > tolerance, poids, np.inf)
+        dist, pred = np.full(v, np.inf), np.full(v, -1)
+        dist[source] = 0.0
+        for _ in range(v - 1):
+            candidat = dist[:, None] + ouvert
+            meilleur = candidat.argmin(axis=0)
+            nouveau = candidat[meilleur, np.arange(v)]
+            ameliore = nouveau < dist - 1e-12
+            if not ameliore.any():
+                break
+            dist[ameliore], pred[ameliore] = nouveau[ameliore], meilleur[ameliore]
+        chemin = [puits]
+        while chemin[-1] != source:
+            chemin.append(pred[chemin[-1]])
+        arcs = list(zip(chemin[:0:-1], chemin[-2::-1]))
+        quantite = min(residu[a, b] for a, b in arcs)
+        for a, b in arcs:
+            residu[a, b] -= quantite
+            residu[b, a] += quantite
+    return residu[n:n + m, :n].T  # Flux nœud → site : capacité ouverte sur l'arc de retour
+
+
+def verifier(instances=200, graine=0):
+    """Compare `acheminer` au flot de référence sur des réseaux aléatoires ; renvoie les écarts."""
+    rng = np.random.default_rng(graine)
+    ecarts = []
+    for k in range(instances):
+        n, s = int(rng.integers(1, 25)), int(rng.integers(1, 6))
+        offre = rng.lognormal(3, 1, n)
+        cout = rng.uniform(0.02, 0.4, (n, s))
+        if k % 4 == 0:
+            cout = np.round(cout, 1)  # Égalités de coûts
+        cout_local = rng.uniform(0.1, 0.5) if k % 2 else rng.uniform(0.1, 0.5, n)
+        capacite = rng.uniform(0.05, 0.6, s) * offre.sum()
+        flux = acheminer(offre, cout, capacite, cout_local)
+        c = np.concatenate([cout, np.broadcast_to(cout_local, (n,))[:, None]], axis=1)
+        tolerance = 1e-7 * offre.sum()
+        realisable = ((flux >= -tolerance).all() and np.allclose(flux.sum(axis=1), offre)
+                      and (flux[:, :s].sum(axis=0) <= capacite + tolerance).all())
+        obtenu, attendu = (flux * c).sum(), (_flot_naif(offre, cout, capacite, cout_local) * c).sum()
+        if not realisable or obtenu > attendu + 1e-9 * max(attendu, 1.0):
+            ecarts.append({'instance': k, 'noeuds': n, 'sites': s, 'realisable': realisable,
+                           'pertes': obtenu, 'reference': attendu})
+    return ecarts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Réseau logistique post-récolte : temps de résolution.")
+    parser.add_argument("--noeuds", type=int, default=0, help="Réseau aléatoire de N nœuds (défaut : préfectures)")
+    parser.add_argument("--sites", type=int, default=6, help="Sites à ouvrir")
+    parser.add_argument("--capacite", type=float, default=CAPACITE_SITE, help="Capacité par site (T)")
+    parser.add_argument("--verifier", type=int, metavar="N",
+                        help="Compare l'acheminement à un flot de référence sur N réseaux aléatoires et s'arrête")
+    args = parser.parse_args(argv)
+
+    if args.verifier:
+        debut = time.perf_counter()
+        ecarts = verifier(args.verifier)
+        for e in ecarts:
+            print(f"Instance {e['instance']} ({e['noeuds']} nœuds, {e['sites']} sites) : pertes {e['pertes']:.6f} "
+                  f"contre {e['reference']:.6f}" + ("" if e['realisable'] else ", flux non réalisable"))
+        print(f"{args.verifier} réseaux aléatoires, {len(ecarts)} écart(s) ({time.perf_counter() - debut:.1f} s)")
+        return 1 if ecarts else 0
+    referentiel.synchroniser()
+
+    if args.noeuds:
+        rng = np.random.default_rng(0)
+        # Emprise approximative de la Guinée ; autant de sites candidats que de chefs-lieux
+        candidats = np.linspace(0, args.noeuds - 1, len(referentiel.PREFECTURES['pref'])).astype(int)
+        debut = time.perf_counter()
+        reseau = Reseau(rng.uniform(7.2, 12.6, args.noeuds), rng.uniform(-15.0, -7.7, args.noeuds),
+                        candidats, [f"site {j}" for j in candidats])
+        print(f"Graphe routier et distances : {time.perf_counter() - debut:.3f} s "
+              f"({args.noeuds} nœuds, {len(candidats)} sites candidats)")
+        offre = rng.lognormal(8, 1, args.noeuds)
+        debut = time.perf_counter()
+        sites, evaluations = reseau.sites_optimaux(offre, args.sites, args.capacite, 30.0)
+        _, pertes = reseau.pertes(offre, sites, args.capacite, 30.0)
+        print(f"Sites optimaux : {time.perf_counter() - debut:.3f} s ({evaluations} résolutions de flot)")
+        production = offre.sum()
+    else:
+        res = optimiser("Tout", referentiel.profil_filiere("Tout")['prod'], 30.0, args.sites, args.capacite)
+        print(f"Sites : {', '.join(res['sites'])}")
+        print(f"{res['noeuds']} nœuds, {res['evaluations']} résolutions de flot en {res['duree_s'] * 1000:.1f} ms")
+        pertes, production = res['pertes'], res['production']
+    print(f"Pertes : {pertes:,.0f} T sur {production:,.0f} T")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
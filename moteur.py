@@ -0,0 +1,243 @@
+"""Moteur de simulation UPDIA : formules des onglets, vectorisées avec NumPy.
+
+Toutes les fonctions acceptent des scalaires ou des tableaux et suivent les règles
+de diffusion (broadcasting) de NumPy : une grille pluie × sol × intensification ×
+irrigation × filière s'évalue en un seul appel, sans démarrer l'interface.
+"""
+import numpy as np
+
+# --- 1. PARAMÈTRES TEMPORELS ---
+ANNEE_ACTUELLE = 2026
+ANNEE_CIBLE = 2040
+
+# --- 2. PARAMÈTRES AGRONOMIQUES (INRAE) ---
+TYPES_SOL = ["Alluvial (Fertile)", "Latéritique (Ferralitique)", "Sableux/Limoneux"]
+FACTEURS_SOL = np.array([1.2, 0.8, 0.9])
+# Sensibilité au déficit hydrique (Sableux = très sensible au manque d'eau).
+# Lecture seule : une calibration (referentiel.synchroniser) publie un nouveau tableau,
+# qu'un calcul lit une seule fois (argument `sensibilite` de rendement_sol_climat).
+SENSIBILITE_SOL = np.array([1.0, 1.3, 1.6])
+SENSIBILITE_SOL.flags.writeable = False
+
+NIVEAUX_INTRANTS = ["Traditionnel", "Semi-Mécanisé", "Intensif"]
+BOOST_INTRANTS = np.array([1.0, 1.4, 1.9])
+
+BONUS_IRRIGATION = 0.3       # Bonus fixe irrigation
+PROTECTION_IRRIGATION = 3.0  # Le déficit de pluie est divisé par 3 sous eau maîtrisée
+RENDEMENT_PLANCHER = 0.1
+
+# Surface de référence servant au calcul du rendement moyen (T/Ha)
+SURFACE_REFERENCE_HA = 800000
+
+# --- 3. PARAMÈTRES DÉMOGRAPHIQUES (Vision 2040) ---
+CROISSANCE_DEMOGRAPHIQUE = 1.025  # +2.5% par an
+POPULATION_GUINEE = 14000000
+PART_CONSOMMABLE = 0.7
+
+# --- 4. PARAMÈTRES FINANCIERS ---
+SCENARIOS = ["Stagnation", "PNIASAN (Modéré)", "Vision 2040 (Ambitieux)"]
+LEVIERS = ["Semences", "Engrais", "Machines"]
+# L'engrais a un boost de 1.2, la machine de 0.8 sur le tonnage immédiat
+POIDS_LEVIERS = np.array([1.0, 1.2, 0.8])
+PRIX_IMPORT_USD = 550  # Prix moyen d'une tonne importée (Riz/Maïs)
+TAUX_CHANGE_GNF = 8600
+# Rendements décroissants (optimiseur) : dépense par filière (Mds GNF) à laquelle un levier
+# a produit 63 % de son plein effet. Hypothèse : les semences saturent vite, la mécanisation lentement.
+SATURATION_LEVIERS = np.array([300.0, 500.0, 800.0])
+
+# --- 5. PARAMÈTRES DE TRANSFORMATION ---
+NIVEAUX_TRANSFO = ["Manuel (Faible)", "Artisanal (Moyen)", "Industriel (Élevé)"]
+GAIN_EFFICIENCE = np.array([0.05, 0.15, 0.30])
+
+
+def codes(libelles, options):
+    """Convertit un libellé (ou un tableau de libellés) en indices dans `options`."""
+    index = {o: i for i, o in enumerate(options)}
+    if isinstance(libelles, str):
+        return index[libelles]
+    return np.array([index[l] for l in np.ravel(libelles)]).reshape(np.shape(libelles))
+
+
+# --- A. RENDEMENT SOL-CLIMAT (Onglet 2) ---
+
+def boost_base(sol, intrants):
+    """Multiplicateur technique de base : intensification × facteur sol (indices)."""
+    return BOOST_INTRANTS[intrants] * FACTEURS_SOL[sol]
+
+
+def rendement_complet(v_pluie, irrigation, b_base, sens_sol,
+                      bonus=BONUS_IRRIGATION, protection=PROTECTION_IRRIGATION):
+    """Multiplicateur de rendement pour une variation de pluie (%) donnée.
+
+    `bonus` et `protection` (irrigation) sont diffusables, comme `b_base` et `sens_sol` :
+    l'analyse de sensibilité les fait varier tirage par tirage.
+    """
+    irrigation = np.asarray(irrigation, dtype=bool)
+    impact = np.asarray(v_pluie) / 100  # un tableau float32 reste en float32 (tirages Monte Carlo)
+    facteur_deficit = np.where(irrigation, 1 / np.asarray(protection), sens_sol).astype(impact.dtype)
+    # Seul le déficit de pluie est modulé ; min/max évitent un masque (coûteux sur des millions de tirages)
+    impact = np.minimum(impact, 0) * facteur_deficit + np.maximum(impact, 0)
+    base = np.asarray(b_base + bonus * irrigation, dtype=impact.dtype)
+    return np.maximum(RENDEMENT_PLANCHER, base + impact, dtype=impact.dtype)
+
+
+def rendement_sol_climat(v_pluie, sol, intrants, irrigation, sensibilite=None):
+    """Rendement complet à partir des indices de sol et d'intensification.
+
+    `sensibilite` : tableau SENSIBILITE_SOL lu par l'appelant, pour qu'un calcul en
+    plusieurs lots garde la même calibration du début à la fin (défaut : celle en place).
+    """
+    sensibilite = SENSIBILITE_SOL if sensibilite is None else sensibilite
+    return rendement_complet(v_pluie, irrigation, boost_base(sol, intrants), sensibilite[sol])
+
+
+def grille_production(base_prod, v_pluie, sol=None, intrants=None, irrigation=(False, True)):
+    """Production simulée sur le produit cartésien filière × pluie × sol × intensification × irrigation.
+
+    Chaque argument est un vecteur 1D ; le résultat a la forme
+    (len(base_prod), len(v_pluie), len(sol), len(intrants), len(irrigation)).
+    """
+    sol = np.arange(len(TYPES_SOL)) if sol is None else np.asarray(sol)
+    intrants = np.arange(len(NIVEAUX_INTRANTS)) if intrants is None else np.asarray(intrants)
+    b, p, s, t, i = np.ix_(
+        np.asarray(base_prod, dtype=float), np.asarray(v_pluie, dtype=float),
+        sol, intrants, np.asarray(irrigation, dtype=int),  # np.ix_ lirait un booléen comme un masque
+    )
+    return b * rendement_sol_climat(p, s, t, i.astype(bool))
+
+
+# --- B. PLAN DE RATTRAPAGE (Stratégie 2026-2040) ---
+
+def taux_croissance_requis(obj_2040, base_prod, nombre_annees=ANNEE_CIBLE - ANNEE_ACTUELLE):
+    """CAGR qui garantit l'atteinte de l'objectif à l'échéance."""
+    return (np.asarray(obj_2040, dtype=float) / base_prod) ** (1 / nombre_annees) - 1
+
+
+def trajectoire(base_prod, taux, nombre_annees):
+    """Production composée à taux constant ; dernier axe = années 0..nombre_annees."""
+    t = np.arange(nombre_annees + 1)
+    return np.asarray(base_prod, dtype=float)[..., None] * (1 + np.asarray(taux, dtype=float)[..., None]) ** t
+
+
+def besoins_ressources(deficit_t, rendement_moyen, semences_ha, engrais_ha):
+    """Terres à mobiliser (Ha), semences et engrais nécessaires (T) pour combler un déficit."""
+    ha_supp = np.asarray(deficit_t, dtype=float) / rendement_moyen
+    return ha_supp, ha_supp * semences_ha / 1000, ha_supp * engrais_ha / 1000
+
+
+# --- C. ÉQUILIBRE OFFRE/DEMANDE (Onglet 3) ---
+
+def chemins_vision(base_prod, ratio_besoin, tx_croissance, nombre_annees,
+                   croissance_demo=CROISSANCE_DEMOGRAPHIQUE, population=POPULATION_GUINEE, demo=None):
+    """Chemins de production, de besoin et de disponibilité (kg/hab/an).
+
+    `tx_croissance` est exprimé en %, comme le curseur de l'onglet 3.
+    `demo` : population de chaque année rapportée à `population` (ex. projection par
+    cohortes de demographie.py) ; par défaut, croissance uniforme `croissance_demo`.
+    Le dernier axe des tableaux renvoyés porte les `nombre_annees` années.
+    """
+    i = np.arange(nombre_annees)
+    base_prod = np.asarray(base_prod, dtype=float)[..., None]
+    demo = croissance_demo ** i if demo is None else np.asarray(demo, dtype=float)
+    prod_path = base_prod * (1 + np.asarray(tx_croissance, dtype=float)[..., None] / 100) ** i
+    besoin_path = base_prod * np.asarray(ratio_besoin, dtype=float)[..., None] * demo
+    dispo_hab = prod_path * PART_CONSOMMABLE * 1000 / (population * demo)
+    return prod_path, besoin_path, dispo_hab
+
+
+def premier_croisement(prod_path, besoin_path):
+    """Indice de la première année où la production couvre le besoin (-1 si jamais)."""
+    couvert = np.asarray(prod_path) >= np.asarray(besoin_path)
+    return np.where(couvert.any(axis=-1), couvert.argmax(axis=-1), -1)
+
+
+def delai_autosuffisance(ratio_besoin, tx_croissance, croissance_demo=CROISSANCE_DEMOGRAPHIQUE):
+    """Délai (années, fractionnaire) avant que la production couvre le besoin ; inf si jamais.
+
+    Résout base·(1+g)^t = base·ratio·p^t, soit t* = ln(ratio) / (ln(1+g) - ln(p)).
+    `tx_croissance` en %, diffusable (ex. filières × taux pour un balayage complet).
+    """
+    ratio = np.asarray(ratio_besoin, dtype=float)
+    ecart = np.log1p(np.asarray(tx_croissance, dtype=float) / 100) - np.log(croissance_demo)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Écart nul à l'arrondi près (ex. 2.5 % face à +2.5 %/an) : les courbes restent parallèles
+        delai = np.where(ecart > 1e-12, np.log(ratio) / ecart, np.inf)
+    # Besoin déjà couvert dès l'année de départ
+    return np.where(ratio <= 1, 0.0, delai)
+
+
+def annee_autosuffisance(ratio_besoin, tx_croissance, annee_debut=ANNEE_ACTUELLE,
+                         croissance_demo=CROISSANCE_DEMOGRAPHIQUE):
+    """Année de croisement (fractionnaire) et première année civile couverte (inf si jamais)."""
+    delai = delai_autosuffisance(ratio_besoin, tx_croissance, croissance_demo)
+    # Tolérance : un croisement exact à l'année t ne doit pas basculer en t+1 par arrondi
+    return annee_debut + delai, annee_debut + np.ceil(delai - 1e-9)
+
+
+def croisement_chemins(prod_path, besoin_path, annee_debut=ANNEE_ACTUELLE):
+    """Année de croisement (interpolée) et première année civile couverte, lues sur les chemins.
+
+    Pour une démographie sans forme fermée (cohortes) ; inf si le croisement n'a pas lieu
+    avant la fin des chemins.
+    """
+    ecart = np.log(np.asarray(prod_path, dtype=float) / np.asarray(besoin_path, dtype=float))
+    t = premier_croisement(prod_path, besoin_path)
+    if t < 0:
+        return np.inf, np.inf
+    if t == 0:
+        return float(annee_debut), float(annee_debut)
+    # Interpolation linéaire du log-écart entre l'année qui précède et l'année couverte
+    return annee_debut + t - 1 + ecart[t - 1] / (ecart[t - 1] - ecart[t]), float(annee_debut + t)
+
+
+def ration_habitant(base_prod, tx_croissance, annee, annee_debut=ANNEE_ACTUELLE,
+                    croissance_demo=CROISSANCE_DEMOGRAPHIQUE, population=POPULATION_GUINEE):
+    """Disponibilité (kg/hab/an) à une année donnée, sans construire le chemin complet."""
+    t = np.asarray(annee, dtype=float) - annee_debut
+    facteur = ((1 + np.asarray(tx_croissance, dtype=float) / 100) / croissance_demo) ** t
+    return np.asarray(base_prod, dtype=float) * PART_CONSOMMABLE * 1000 / population * facteur
+
+
+# --- D. EFFICACITÉ BUDGÉTAIRE (Onglet 4) ---
+
+def gain_investissement(s_sem, s_eng, s_mac, coef_roi, poids=POIDS_LEVIERS):
+    """Gain de production (T) pour une allocation Semences/Engrais/Machines (Mds GNF).
+
+    `poids` : poids des trois leviers sur le dernier axe (un jeu par ligne si 2D).
+    """
+    poids = np.asarray(poids, dtype=float)
+    return coef_roi * (poids[..., 0] * np.asarray(s_sem, dtype=float)
+                       + poids[..., 1] * np.asarray(s_eng, dtype=float)
+                       + poids[..., 2] * np.asarray(s_mac, dtype=float))
+
+
+def gain_decroissant(depense, coef_roi, poids, saturation):
+    """Gain de production (T) d'une dépense (Mds GNF) sur un levier, à rendements décroissants.
+
+    coef·poids·S·(1 - exp(-x/S)) : même pente que gain_investissement à l'origine,
+    plafonné à coef·poids·S ; une saturation infinie redonne le modèle linéaire.
+    """
+    x = np.asarray(depense, dtype=float)
+    saturation = np.asarray(saturation, dtype=float)
+    with np.errstate(invalid='ignore'):
+        courbe = np.where(np.isinf(saturation), x, -saturation * np.expm1(-x / saturation))
+    return np.asarray(coef_roi, dtype=float) * poids * courbe
+
+
+def impact_devises(gain_tonnes, budget_total, prix_import=PRIX_IMPORT_USD):
+    """Économie de devises (USD) et efficacité du GNF investi."""
+    economie_devises = np.asarray(gain_tonnes, dtype=float) * prix_import
+    investissement_gnf = np.asarray(budget_total, dtype=float) * 1_000_000_000
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rentabilite = np.where(investissement_gnf > 0,
+                               economie_devises * TAUX_CHANGE_GNF / investissement_gnf, 0.0)
+    return economie_devises, rentabilite
+
+
+# --- E. PERTES POST-RÉCOLTE (Onglet 5) ---
+
+def pertes_post_recolte(base_prod, taux_perte, gain_efficience):
+    """Pertes (T), tonnage récupéré par l'industrie et disponible final."""
+    base_prod = np.asarray(base_prod, dtype=float)
+    perte_tonnes = base_prod * np.asarray(taux_perte, dtype=float) / 100
+    return perte_tonnes, perte_tonnes * gain_efficience, base_prod - perte_tonnes
@@ -0,0 +1,276 @@
+"""Statistiques zonales NDVI par préfecture, à partir de rasters locaux lus par bandes.
+
+Sources acceptées (dossier `donnees/ndvi`, ou variable d'environnement UPDIA_NDVI) :
+- une pile `.npy` (dates, lignes, colonnes), ouverte en mémoire projetée, avec un
+  fichier `.json` voisin : {"transform": [lon0, dlon, lat0, dlat], "dates": [...],
+  "echelle": 0.0001, "nodata": -32768} ;
+- une série de GeoTIFF (un fichier par date, triés par nom), lue par fenêtres avec
+  rasterio s'il est installé.
+
+Chaque pixel est affecté une fois pour toutes à une préfecture (chef-lieu le plus
+proche, index uint8 mis en cache à côté du raster) : une nouvelle date ne coûte
+qu'un passage sur le raster, par bandes de lignes découpées en tuiles, sans jamais
+le charger en entier.
+
+    python ndvi.py --demo donnees/ndvi/demo.npy   # pile synthétique pour essayer l'onglet 2
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+import referentiel
+from cache import memoiser
+
+try:
+    import rasterio
+    from rasterio.windows import Window
+except ImportError:  # GeoTIFF optionnel : piles .npy seulement
+    rasterio = None
+
+DOSSIER_DEFAUT = Path(__file__).resolve().parent / "donnees" / "ndvi"
+HORS_ZONE = 255
+DISTANCE_MAX_DEG = 0.9  # Au-delà, un pixel n'appartient à aucune préfecture
+HAUTEUR_BANDE = 512
+LARGEUR_TUILE = 512
+
+
+class PileNpy:
+    """Pile NDVI (dates, lignes, colonnes) en mémoire projetée, métadonnées dans le .json voisin."""
+
+    def __init__(self, chemin):
+        self.chemin = self.origine = Path(chemin)
+        meta = json.loads(self.chemin.with_suffix(".json").read_text(encoding="utf-8"))
+        self._pile = np.load(self.chemin, mmap_mode="r")
+        if self._pile.ndim == 2:
+            self._pile = self._pile[None]
+        self.forme = self._pile.shape[1:]
+        self.transform = tuple(meta['transform'])
+        self.dates = list(meta.get('dates') or range(self._pile.shape[0]))
+        self.echelle = meta.get('echelle', 1.0)
+        self.nodata = meta.get('nodata')
+
+    def signature(self):
+        return _signature([self.chemin, self.chemin.with_suffix(".json")])
+
+    def bande(self, t, debut, fin):
+        return _valeurs(self._pile[t, debut:fin], self.echelle, self.nodata)
+
+
+class SerieGeoTIFF:
+    """Un GeoTIFF par date (bande 1), lu par fenêtres de lignes avec rasterio."""
+
+    def __init__(self, fichiers, origine=None):
+        if rasterio is None:
+            raise ImportError("La lecture des GeoTIFF exige rasterio (pip install rasterio).")
+        self.fichiers = sorted(Path(f) for f in fichiers)
+        self.chemin = self.fichiers[0]  # L'index des préfectures est rangé à côté du premier fichier
+        self.origine = Path(origine) if origine else self.chemin
+        with rasterio.open(self.fichiers[0]) as src:
+            self.forme = (src.height, src.width)
+            t = src.transform
+            self.transform = (t.c, t.a, t.f, t.e)
+            self.nodata = src.nodata
+            self.echelle = src.scales[0] if src.dtypes[0].startswith("int") else 1.0
+        self.dates = [f.stem for f in self.fichiers]
+
+    def signature(self):
+        return _signature(self.fichiers)
+
+    def bande(self, t, debut, fin):
+        with rasterio.open(self.fichiers[t]) as src:
+            brut = src.read(1, window=Window(0, debut, self.forme[1], fin - debut))
+        return _valeurs(brut, self.echelle, self.nodata)
+
+
+def _signature(fichiers):
+    """Noms et dates de modification des fichiers d'une source : change dès qu'une date est ajoutée ou réécrite."""
+    return tuple((f.name, f.stat().st_mtime_ns) for f in fichiers)
+
+
+def _valeurs(brut, echelle, nodata):
+    """NDVI float32, NaN pour les pixels sans donnée."""
+    valeurs = brut.astype(np.float32)
+    if nodata is not None:
+        valeurs[brut == nodata] = np.nan
+    if echelle != 1.0:
+        valeurs *= np.float32(echelle)
+    return valeurs
+
+
+def ouvrir(chemin=None):
+    """Source NDVI du chemin donné (fichier .npy, dossier de .npy ou de .tif), ou None si absente."""
+    chemin = Path(chemin or os.environ.get("UPDIA_NDVI") or DOSSIER_DEFAUT)
+    if chemin.is_dir():
+        piles = sorted(p for p in chemin.glob("*.npy") if ".prefectures" not in p.name)
+        if piles:
+            source = PileNpy(piles[0])
+            source.origine = chemin
+            return source
+        tifs = sorted(chemin.glob("*.tif")) + sorted(chemin.glob("*.tiff"))
+        return SerieGeoTIFF(tifs, origine=chemin) if tifs else None
+    if chemin.suffix == ".npy" and chemin.exists():
+        return PileNpy(chemin)
+    if chemin.suffix in (".tif", ".tiff") and chemin.exists():
+        return SerieGeoTIFF([chemin])
+    return None
+
+
+def _affecter(lat, lon, distance_max=DISTANCE_MAX_DEG):
+    """Préfecture la plus proche de chaque pixel d'une grille lat × lon (distance en degrés corrigée)."""
+    lat_cl, lon_cl = referentiel.PREFECTURES['lat'], referentiel.PREFECTURES['lon']
+    cos_lat = np.cos(np.radians(lat_cl.mean()))
+    meilleur = np.full((lat.size, lon.size), np.inf, dtype=np.float32)
+    index = np.full((lat.size, lon.size), HORS_ZONE, dtype=np.uint8)
+    # Distance séparable en lignes/colonnes : une addition par préfecture, pas de tableau (pixels × 34)
+    for k in range(len(lat_cl)):
+        d2 = ((lat - lat_cl[k]) ** 2)[:, None].astype(np.float32) + (((lon - lon_cl[k]) * cos_lat) ** 2)[None, :].astype(np.float32)
+        plus_proche = d2 < meilleur
+        meilleur[plus_proche] = d2[plus_proche]
+        index[plus_proche] = k
+    index[meilleur > distance_max ** 2] = HORS_ZONE
+    return index
+
+
+def index_prefectures(source, hauteur_bande=HAUTEUR_BANDE):
+    """Index pixel → préfecture (uint8, 255 = hors zone), calculé une fois et projeté en mémoire.
+
+    Le nom du fichier porte une empreinte des chefs-lieux : si l'entrepôt du référentiel
+    déplace ou ajoute une préfecture, l'index est recalculé.
+    """
+    prefectures = referentiel.PREFECTURES
+    empreinte = hashlib.sha1(prefectures['lat'].tobytes() + prefectures['lon'].tobytes()).hexdigest()[:8]
+    chemin = source.chemin.with_name(f"{source.chemin.stem}.prefectures-{empreinte}.npy")
+    if chemin.exists():
+        index = np.load(chemin, mmap_mode="r")
+        if index.shape == tuple(source.forme):
+            return index
+    lon0, dlon, lat0, dlat = source.transform
+    hauteur, largeur = source.forme
+    lon = lon0 + dlon * (np.arange(largeur) + 0.5)
+    index = np.lib.format.open_memmap(chemin, mode="w+", dtype=np.uint8, shape=(hauteur, largeur))
+    for debut in range(0, hauteur, hauteur_bande):
+        fin = min(hauteur, debut + hauteur_bande)
+        index[debut:fin] = _affecter(lat0 + dlat * (np.arange(debut, fin) + 0.5), lon)
+    index.flush()
+    return np.load(chemin, mmap_mode="r")
+
+
+def statistiques_zonales(source, t, index, hauteur_bande=HAUTEUR_BANDE, largeur_tuile=LARGEUR_TUILE):
+    """Moyenne, minimum et nombre de pixels valides par préfecture pour la date `t` (un passage)."""
+    n = len(referentiel.PREFECTURES['lat'])
+    somme = np.zeros(n)
+    compte = np.zeros(n, dtype=np.int64)
+    minimum = np.full(n, np.inf)
+    hauteur, largeur = source.forme
+    for debut in range(0, hauteur, hauteur_bande):
+        fin = min(hauteur, debut + hauteur_bande)
+        bande = source.bande(t, debut, fin)
+        # Tuiles : une tuile ne touche en général qu'une ou deux préfectures
+        for gauche in range(0, largeur, largeur_tuile):
+            droite = min(largeur, gauche + largeur_tuile)
+            etiquettes = np.asarray(index[debut:fin, gauche:droite])
+            valeurs = bande[:, gauche:droite]
+            valide = (etiquettes != HORS_ZONE) & np.isfinite(valeurs)
+            e, v = etiquettes[valide], valeurs[valide]
+            compte_tuile = np.bincount(e, minlength=n)
+            somme += np.bincount(e, weights=v, minlength=n)
+            compte += compte_tuile
+            presentes = np.flatnonzero(compte_tuile)
+            if len(presentes) == 1:
+                k = presentes[0]
+                minimum[k] = min(minimum[k], float(v.min()))
+            else:
+                for k in presentes:
+                    minimum[k] = min(minimum[k], float(v[e == k].min()))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        moyenne = somme / compte
+    minimum[compte == 0] = np.nan
+    return {'moyenne': moyenne, 'minimum': minimum, 'pixels': compte}
+
+
+@memoiser(taille_max=4, depend_de=('prefectures',))
+def _suivi(origine, signature):
+    source = ouvrir(origine)
+    index = index_prefectures(source)
+    stats = [statistiques_zonales(source, t, index) for t in range(len(source.dates))]
+    moyenne = np.array([s['moyenne'] for s in stats])
+    # Anomalie : écart à la moyenne des dates précédentes de la même préfecture
+    connue = np.isfinite(moyenne)
+    somme_avant = np.cumsum(np.where(connue, moyenne, 0), axis=0) - np.where(connue, moyenne, 0)
+    n_avant = np.cumsum(connue, axis=0) - connue
+    with np.errstate(invalid='ignore', divide='ignore'):
+        reference = np.where(n_avant > 0, somme_avant / n_avant, np.nan)
+    return {
+        'dates': [str(d) for d in source.dates],
+        'moyenne': moyenne,
+        'minimum': np.array([s['minimum'] for s in stats]),
+        'pixels': np.array([s['pixels'] for s in stats]),
+        'anomalie': moyenne - reference,
+    }
+
+
+def suivi_prefectures(source):
+    """Statistiques (dates × préfectures), mémoïsées tant qu'aucun fichier de la source n'est ajouté ni modifié."""
+    return _suivi(str(source.origine), source.signature())
+
+
+def alertes(suivi, seuil, t=-1):
+    """Indices des préfectures dont le NDVI moyen à la date `t` passe sous le seuil."""
+    return np.flatnonzero(suivi['moyenne'][t] < seuil)
+
+
+def generer_demo(chemin, resolution=0.01, n_dates=6, graine=0):
+    """Pile NDVI synthétique sur l'emprise de la Guinée (gradient forêt → savane, saison, sécheresse au nord-est)."""
+    chemin = Path(chemin)
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    lon0, lat0, lon1, lat1 = -15.1, 12.7, -7.6, 7.1
+    hauteur, largeur = int(round((lat0 - lat1) / resolution)), int(round((lon1 - lon0) / resolution))
+    lat = lat0 - resolution * (np.arange(hauteur) + 0.5)
+    lon = lon0 + resolution * (np.arange(largeur) + 0.5)
+    rng = np.random.default_rng(graine)
+    pile = np.lib.format.open_memmap(chemin, mode="w+", dtype=np.int16, shape=(n_dates, hauteur, largeur))
+    base = (0.78 - 0.05 * (lat - lat1))[:, None] * np.ones(largeur)
+    secheresse = np.exp(-(((lat - 11.2)[:, None] / 0.7) ** 2 + ((lon + 9.4)[None, :] / 0.9) ** 2))
+    for t in range(n_dates):
+        saison = 0.08 * np.sin(np.pi * t / max(1, n_dates - 1))
+        champ = base + saison - (0.3 * secheresse if t == n_dates - 1 else 0.0)
+        champ = champ + rng.normal(0, 0.03, champ.shape)
+        pile[t] = np.round(np.clip(champ, -0.2, 0.95) / 1e-4).astype(np.int16)
+    pile.flush()
+    mois = ["Jan", "Fév", "Mar", "Avr", "Mai", "Juin", "Juil", "Août", "Sep", "Oct", "Nov", "Déc"]
+    chemin.with_suffix(".json").write_text(json.dumps({
+        'transform': [lon0, resolution, lat0, -resolution],
+        'dates': [f"2026-{mois[t % 12]}" for t in range(n_dates)],
+        'echelle': 1e-4, 'nodata': -32768,
+    }, ensure_ascii=False), encoding="utf-8")
+    return chemin
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="NDVI zonal par préfecture.")
+    parser.add_argument("chemin", nargs="?", help="Pile .npy, GeoTIFF ou dossier (défaut : donnees/ndvi)")
+    parser.add_argument("--demo", metavar="NPY", help="Écrit une pile synthétique et s'arrête")
+    parser.add_argument("--seuil", type=float, default=0.45)
+    args = parser.parse_args(argv)
+
+    if args.demo:
+        print(f"Pile de démonstration écrite : {generer_demo(args.demo)}")
+        return 0
+    source = ouvrir(args.chemin)
+    if source is None:
+        parser.error("aucun raster NDVI trouvé")
+    suivi = suivi_prefectures(source)
+    for k, nom in enumerate(referentiel.PREFECTURES['pref']):
+        drapeau = "  ALERTE" if suivi['moyenne'][-1, k] < args.seuil else ""
+        print(f"{nom:<14} moy. {suivi['moyenne'][-1, k]:.3f}  min {suivi['minimum'][-1, k]:.3f}  "
+              f"anomalie {suivi['anomalie'][-1, k]:+.3f}{drapeau}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
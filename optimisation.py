@@ -0,0 +1,128 @@
+"""Optimisation du budget national (onglet 4) : répartition entre filières et leviers.
+
+Chaque couple (filière, levier) a un gain concave (moteur.gain_decroissant). Le budget
+est découpé en `n_pas` incréments et chaque incrément va au couple dont le gain marginal
+est le plus fort : pour des gains concaves séparables sous un budget et des plafonds par
+levier, ce choix glouton est optimal à un incrément près, et il se ramène à des tris de
+gains marginaux (aucune boucle Python sur les incréments). Les minimums par filière sont
+réservés d'abord, sur les meilleurs incréments de chaque filière : si un minimum et un
+plafond sont tous deux actifs, l'allocation peut rester légèrement sous l'optimum exact.
+
+La frontière de Pareto tonnage / économie de devises pondère les deux objectifs : le
+problème étant concave, chaque pondération donne une allocation efficace, et toutes les
+pondérations sont résolues dans le même lot de tableaux.
+"""
+import numpy as np
+
+import moteur
+import referentiel
+
+
+def filieres():
+    """Filières optimisées : celles du référentiel en place."""
+    return list(referentiel.filières_db)
+
+
+def _gains_marginaux(pas, n_pas, coef_roi, saturation):
+    """Gain (T) de chaque incrément : tableau (filières, leviers, incréments), décroissant sur le dernier axe."""
+    bornes = pas * np.arange(n_pas + 1)
+    cumul = moteur.gain_decroissant(bornes, coef_roi[:, None, None],
+                                    moteur.POIDS_LEVIERS[None, :, None], saturation[None, :, None])
+    return np.diff(cumul, axis=-1)
+
+
+def _repartir(valeur, n_pas, plafonds, minimums):
+    """Nombre d'incréments par (pondération, filière, levier) maximisant la somme des valeurs.
+
+    `valeur` : (W, F, L, K) ; `plafonds` : incréments max par levier (L,) ;
+    `minimums` : incréments réservés par filière (F,).
+    """
+    W, F, L, K = valeur.shape
+    compte = np.zeros((W, F, L), dtype=np.int64)
+
+    # 1. Réservation des minimums : meilleurs incréments de la filière, tous leviers confondus
+    for f in np.flatnonzero(minimums):
+        m = int(minimums[f])
+        meilleurs = np.argpartition(-valeur[:, f].reshape(W, L * K), m - 1, axis=1)[:, :m]
+        compte[:, f] = (meilleurs[..., None] // K == np.arange(L)).sum(axis=1)
+
+    # Les incréments réservés (préfixes, les gains étant décroissants) sortent de la course
+    restant = np.where(np.arange(K) >= compte[..., None], valeur, -np.inf)
+    reste_plafond = np.maximum(plafonds - compte.sum(axis=1), 0)  # (W, L)
+
+    # 2. Plafonds par levier : seuls les meilleurs incréments de chaque levier restent candidats
+    par_levier = restant.transpose(0, 2, 1, 3).reshape(W, L, F * K)
+    ordre = np.argsort(-par_levier, axis=-1, kind='stable')
+    candidats = np.take_along_axis(par_levier, ordre, axis=-1)
+    candidats[np.arange(F * K) >= reste_plafond[..., None]] = -np.inf
+
+    # 3. Le reste du budget va aux meilleurs candidats, tous leviers confondus
+    n_reste = n_pas - int(minimums.sum())
+    choix = np.argsort(-candidats.reshape(W, L * F * K), axis=-1, kind='stable')[:, :n_reste]
+    retenu = np.isfinite(np.take_along_axis(candidats.reshape(W, -1), choix, axis=-1))
+    levier = choix // (F * K)
+    filiere = np.take_along_axis(ordre.reshape(W, -1), choix, axis=-1) // K
+    w = np.broadcast_to(np.arange(W)[:, None], choix.shape)
+    # Plafonds trop serrés : les incréments sans candidat restent non alloués
+    np.add.at(compte, (w[retenu], filiere[retenu], levier[retenu]), 1)
+    return compte
+
+
+def _resoudre(budget, poids_tonnage, plafonds=None, minimums=None, saturation=None, n_pas=1000):
+    """Allocations optimales (W, filières, leviers) pour chaque pondération du tonnage."""
+    if budget <= 0:
+        raise ValueError("Le budget doit être strictement positif.")
+    noms = filieres()
+    colonnes = referentiel.colonnes_filieres(noms)
+    saturation = moteur.SATURATION_LEVIERS if saturation is None else np.asarray(saturation, dtype=float)
+    plafonds = np.full(len(moteur.LEVIERS), budget, dtype=float) if plafonds is None else np.asarray(plafonds, dtype=float)
+    minimums = np.zeros(len(noms)) if minimums is None else np.asarray(minimums, dtype=float)
+    if minimums.sum() > budget:
+        raise ValueError("La somme des minimums par filière dépasse le budget.")
+
+    pas = budget / n_pas
+    gains = _gains_marginaux(pas, n_pas, colonnes['coef_roi'], saturation)
+    # Valeur d'une tonne : mélange tonnage / devises (prix relatif au prix moyen)
+    poids_tonnage = np.atleast_1d(np.asarray(poids_tonnage, dtype=float))
+    prix_relatif = colonnes['prix_import'] / colonnes['prix_import'].mean()
+    valeur_tonne = poids_tonnage[:, None] + (1 - poids_tonnage[:, None]) * prix_relatif
+    valeur = valeur_tonne[:, :, None, None] * gains
+
+    compte = _repartir(valeur, n_pas,
+                       np.floor(plafonds / pas + 1e-9).astype(np.int64),
+                       np.ceil(minimums / pas - 1e-9).astype(np.int64))
+    allocation = compte * pas
+    tonnes = moteur.gain_decroissant(allocation, colonnes['coef_roi'][:, None],
+                                     moteur.POIDS_LEVIERS, saturation)
+    return allocation, tonnes, colonnes['prix_import']
+
+
+def optimiser_budget(budget, poids_tonnage=1.0, plafonds=None, minimums=None, saturation=None, n_pas=1000):
+    """Allocation optimale du budget (Mds GNF) entre filières × leviers.
+
+    `poids_tonnage` : 1 maximise les tonnes, 0 l'économie de devises (USD).
+    `plafonds` : dépense max par levier, toutes filières (Mds GNF) ;
+    `minimums` : dépense min par filière (Mds GNF), prioritaire sur les plafonds.
+    """
+    allocation, tonnes, prix = _resoudre(budget, [poids_tonnage], plafonds, minimums, saturation, n_pas)
+    tonnes_filiere = tonnes[0].sum(axis=1)
+    return {
+        'filieres': filieres(), 'leviers': moteur.LEVIERS,
+        'allocation': allocation[0], 'tonnes': tonnes[0],
+        'tonnage': float(tonnes_filiere.sum()),
+        'economie_devises': float(tonnes_filiere @ prix),
+        'non_alloue': float(budget - allocation[0].sum()),
+    }
+
+
+def frontiere_pareto(budget, n_points=21, plafonds=None, minimums=None, saturation=None, n_pas=1000):
+    """Frontière tonnage / économie de devises : une allocation optimale par pondération."""
+    poids = np.linspace(0, 1, n_points)
+    allocation, tonnes, prix = _resoudre(budget, poids, plafonds, minimums, saturation, n_pas)
+    tonnes_filiere = tonnes.sum(axis=2)
+    return {
+        'poids_tonnage': poids,
+        'tonnage': tonnes_filiere.sum(axis=1),
+        'economie_devises': tonnes_filiere @ prix,
+        'allocation': allocation,
+    }
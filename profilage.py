@@ -0,0 +1,97 @@
+"""Chronométrage des sections de l'application, agrégé par session.
+
+Un `Profileur` vit dans la session Streamlit. Désactivé, il ne coûte rien :
+`section` renvoie un contexte vide partagé, `mesurer` renvoie la fonction telle
+quelle et `etape` sort immédiatement. Activé, chaque section (un onglet, l'en-tête)
+est chronométrée, ainsi que ses étapes successives (sections A–G d'un onglet) :
+`etape` clôt l'étape en cours et ouvre la suivante, sans réindenter le code.
+"""
+import contextlib
+import functools
+import json
+import time
+
+_INACTIF = contextlib.nullcontext()
+
+
+class Profileur:
+    """Durées cumulées par section et par étape (« Section › Étape »)."""
+
+    def __init__(self, actif=False, horloge=time.perf_counter):
+        self.actif = actif
+        self._horloge = horloge
+        self._pile = []  # [nom de section, étape en cours, début de l'étape]
+        self.mesures = {}
+
+    def _enregistrer(self, nom, duree):
+        mesure = self.mesures.get(nom)
+        if mesure is None:
+            self.mesures[nom] = {'appels': 1, 'total': duree, 'max': duree, 'dernier': duree}
+        else:
+            mesure['appels'] += 1
+            mesure['total'] += duree
+            mesure['max'] = max(mesure['max'], duree)
+            mesure['dernier'] = duree
+
+    def _clore_etape(self, cadre, maintenant):
+        if cadre[1] is not None:
+            self._enregistrer(f"{cadre[0]} › {cadre[1]}", maintenant - cadre[2])
+            cadre[1] = None
+
+    @contextlib.contextmanager
+    def _section(self, nom):
+        if self._pile:
+            nom = f"{self._pile[-1][0]} › {nom}"
+        debut = self._horloge()
+        cadre = [nom, None, debut]
+        self._pile.append(cadre)
+        try:
+            yield
+        finally:
+            maintenant = self._horloge()
+            self._clore_etape(cadre, maintenant)
+            self._pile.pop()
+            self._enregistrer(nom, maintenant - debut)
+
+    def section(self, nom):
+        """Contexte chronométrant un bloc (imbriquable)."""
+        return self._section(nom) if self.actif else _INACTIF
+
+    def mesurer(self, nom):
+        """Décorateur : chronomètre chaque appel de la fonction comme une section."""
+        def decorateur(fonction):
+            if not self.actif:
+                return fonction
+
+            @functools.wraps(fonction)
+            def enveloppe(*args, **kwargs):
+                with self._section(nom):
+                    return fonction(*args, **kwargs)
+            return enveloppe
+        return decorateur
+
+    def etape(self, nom):
+        """Clôt l'étape en cours de la section courante et en ouvre une nouvelle."""
+        if not self.actif or not self._pile:
+            return
+        cadre = self._pile[-1]
+        maintenant = self._horloge()
+        self._clore_etape(cadre, maintenant)
+        cadre[1], cadre[2] = nom, maintenant
+
+    def tableau(self):
+        """Lignes (une par section ou étape) triées par temps total décroissant, en ms."""
+        lignes = [
+            {'Section': nom, 'Appels': m['appels'], 'Total (ms)': m['total'] * 1000,
+             'Moyenne (ms)': m['total'] / m['appels'] * 1000,
+             'Max (ms)': m['max'] * 1000, 'Dernier (ms)': m['dernier'] * 1000}
+            for nom, m in self.mesures.items()
+        ]
+        return sorted(lignes, key=lambda ligne: -ligne['Total (ms)'])
+
+    def exporter(self):
+        """Export JSON des mesures de la session."""
+        return json.dumps({'unite': "ms", 'sections': self.tableau()}, indent=2, ensure_ascii=False)
+
+    def reinitialiser(self):
+        self.mesures.clear()
@@ -0,0 +1,261 @@
+"""Index spatial des préfectures et des communes : requêtes de rayon et de plus proches voisins.
+
+Chaque point est représenté par son vecteur unitaire sur la sphère : la corde entre deux
+points croît avec leur distance de grand cercle, si bien qu'un arbre k-d en trois
+dimensions sur la corde répond exactement aux requêtes en distance haversine. L'arbre
+est rangé dans des tableaux (boîtes englobantes, enfants, feuilles d'au plus
+`taille_feuille` points) et parcouru pour tout un lot de requêtes à la fois : à chaque
+niveau, les paires (requête, nœud) dont la boîte est hors de portée sont écartées, en
+une opération vectorisée par niveau et non par requête.
+
+- rayon : toutes les paires (requête, point) à moins de `rayon_km` ;
+- voisins : les k plus proches points de chaque requête (la feuille de la requête
+  fournit une borne, puis une requête de rayon à cette borne) ;
+- matrice_prefectures : distances préfecture × préfecture, calculées une fois.
+
+Les index des préfectures et des communes sont construits une fois par version du
+référentiel et partagés par toutes les sessions.
+
+    python proximite.py --points 5000 --requetes 34   # temps de construction et de requête
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import referentiel
+from cache import memoiser
+
+RAYON_TERRE_KM = 6371.0
+TAILLE_FEUILLE = 32
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distance à vol d'oiseau (km), diffusable."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RAYON_TERRE_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def unitaires(lat, lon):
+    """Vecteurs unitaires (N, 3) : le produit scalaire ordonne les points comme la distance."""
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def _corde(distance_km):
+    return 2 * np.sin(np.minimum(np.asarray(distance_km, dtype=float), np.pi * RAYON_TERRE_KM) / (2 * RAYON_TERRE_KM))
+
+
+def _km(corde2):
+    return 2 * RAYON_TERRE_KM * np.arcsin(np.minimum(np.sqrt(corde2) / 2, 1.0))
+
+
+class Index:
+    """Arbre k-d sur les vecteurs unitaires de N points (lat, lon en degrés), en lecture seule."""
+
+    def __init__(self, lat, lon, taille_feuille=TAILLE_FEUILLE):
+        self.lat, self.lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+        self.points = unitaires(self.lat, self.lon)
+        self.taille_feuille = taille_feuille
+        # Nœuds : plage [debut, fin) de `ordre`, boîte englobante, enfants (-1 pour une feuille)
+        ordre = np.arange(len(self.lat))
+        debuts, fins, gauches, droites, bas, hauts, axes, coupes = [], [], [], [], [], [], [], []
+        pile = [(0, len(ordre), -1, 0)]
+        while pile:
+            debut, fin, parent, cote = pile.pop()
+            noeud = len(debuts)
+            if parent >= 0:
+                (gauches if cote == 0 else droites)[parent] = noeud
+            pts = self.points[ordre[debut:fin]]
+            debuts.append(debut)
+            fins.append(fin)
+            gauches.append(-1)
+            droites.append(-1)
+            bas.append(pts.min(axis=0) if len(pts) else np.zeros(3))
+            hauts.append(pts.max(axis=0) if len(pts) else np.zeros(3))
+            axes.append(0)
+            coupes.append(0.0)
+            if fin - debut > taille_feuille:
+                # Coupe à la médiane de l'axe le plus étendu
+                axe = int(np.argmax(hauts[-1] - bas[-1]))
+                milieu = (fin - debut) // 2
+                rang = np.argpartition(pts[:, axe], milieu)
+                ordre[debut:fin] = ordre[debut:fin][rang]
+                axes[-1], coupes[-1] = axe, pts[rang[milieu], axe]
+                pile.append((debut + milieu, fin, noeud, 1))
+                pile.append((debut, debut + milieu, noeud, 0))
+        self.ordre = ordre
+        self.debuts, self.fins = np.array(debuts), np.array(fins)
+        self.gauches, self.droites = np.array(gauches), np.array(droites)
+        self.bas, self.hauts = np.array(bas), np.array(hauts)
+        self.axes, self.coupes = np.array(axes), np.array(coupes)
+        self.tailles = self.fins - self.debuts
+        # Feuilles rangées en blocs (L, taille_feuille) : points et indices, complétés par -1
+        feuilles = np.flatnonzero(self.gauches < 0)
+        self.rang_feuille = np.full(len(debuts), -1)
+        self.rang_feuille[feuilles] = np.arange(len(feuilles))
+        self.indices_feuilles = self._membres(feuilles, taille_feuille)
+        self.points_feuilles = np.where(self.indices_feuilles[..., None] >= 0, self.points[self.indices_feuilles], 0.0)
+        for tableau in (self.ordre, self.debuts, self.fins, self.gauches, self.droites, self.bas, self.hauts,
+                        self.axes, self.coupes, self.tailles, self.rang_feuille, self.indices_feuilles, self.points_feuilles):
+            tableau.flags.writeable = False
+
+    def __len__(self):
+        return len(self.lat)
+
+    def _membres(self, noeuds, largeur):
+        """Points (P, largeur) des nœuds, -1 au-delà de leur plage."""
+        rang = self.debuts[noeuds][:, None] + np.arange(largeur)
+        valide = rang < self.fins[noeuds][:, None]
+        return np.where(valide, self.ordre[np.minimum(rang, len(self.ordre) - 1)], -1)
+
+    def _paires(self, q, corde2):
+        """Paires (requête, point, corde²) à corde² ≤ corde2[requête], triées par requête puis distance."""
+        if not len(self) or not len(q):
+            vide = np.zeros(0, dtype=np.int64)
+            return vide, vide, np.zeros(0)
+        requete = np.arange(len(q))
+        noeud = np.zeros(len(q), dtype=np.int64)
+        feuilles_q, feuilles_n = [], []
+        while len(requete):
+            # Distance de la requête à la boîte du nœud (nulle à l'intérieur)
+            x = q[requete]
+            ecart = np.maximum(self.bas[noeud] - x, 0) + np.maximum(x - self.hauts[noeud], 0)
+            garde = (ecart ** 2).sum(axis=1) <= corde2[requete]
+            requete, noeud = requete[garde], noeud[garde]
+            feuille = self.gauches[noeud] < 0
+            feuilles_q.append(requete[feuille])
+            feuilles_n.append(noeud[feuille])
+            interne = ~feuille
+            requete = np.concatenate([requete[interne], requete[interne]])
+            noeud = np.concatenate([self.gauches[noeud[interne]], self.droites[noeud[interne]]])
+        requete, noeud = np.concatenate(feuilles_q), self.rang_feuille[np.concatenate(feuilles_n)]
+        membres = self.indices_feuilles[noeud]
+        # Corde² = 2 - 2 cos : un produit matriciel par bloc de feuille
+        d2 = np.maximum(2 - 2 * (self.points_feuilles[noeud] @ q[requete][:, :, None])[:, :, 0], 0)
+        garde = (membres >= 0) & (d2 <= corde2[requete][:, None])
+        requete = np.broadcast_to(requete[:, None], membres.shape)[garde]
+        point, d2 = membres[garde], d2[garde]
+        # Tri par distance, puis (stable) par requête
+        tri = np.argsort(d2)
+        tri = tri[np.argsort(requete[tri].astype(np.uint16 if len(q) < 2 ** 16 else np.int64), kind='stable')]
+        return requete[tri], point[tri], d2[tri]
+
+    def rayon(self, lat, lon, rayon_km):
+        """Points à moins de `rayon_km` (scalaire ou par requête) : (requête, point, distance km), triés.
+
+        Les requêtes sont numérotées dans l'ordre de `lat`, `lon` ; résultats groupés par
+        requête, du plus proche au plus lointain.
+        """
+        q = unitaires(np.atleast_1d(lat), np.atleast_1d(lon))
+        corde2 = np.broadcast_to(_corde(rayon_km), (len(q),)) ** 2 * (1 + 1e-12)
+        requete, point, d2 = self._paires(q, corde2)
+        return requete, point, _km(d2)
+
+    def voisins(self, lat, lon, k):
+        """Les k plus proches points de chaque requête : (indices (Q, k), distances km (Q, k))."""
+        q = unitaires(np.atleast_1d(lat), np.atleast_1d(lon))
+        k = min(k, len(self))
+        if k <= 0:
+            return np.zeros((len(q), 0), dtype=np.int64), np.zeros((len(q), 0))
+        # Descente vers le plus petit nœud d'au moins k points : son k-ième point borne la recherche
+        noeud = np.zeros(len(q), dtype=np.int64)
+        lignes = np.arange(len(q))
+        while True:
+            gauche = self.gauches[noeud]
+            enfant = np.where(q[lignes, self.axes[noeud]] < self.coupes[noeud], gauche, self.droites[noeud])
+            descend = (gauche >= 0) & (self.tailles[enfant] >= k)
+            if not descend.any():
+                break
+            noeud = np.where(descend, enfant, noeud)
+        largeur = int((self.fins[noeud] - self.debuts[noeud]).max())
+        membres = self._membres(noeud, largeur)
+        d2 = np.where(membres >= 0, ((self.points[np.maximum(membres, 0)] - q[:, None]) ** 2).sum(axis=2), np.inf)
+        borne = np.partition(d2, k - 1, axis=1)[:, k - 1] * (1 + 1e-12) + 1e-15
+        requete, point, d2 = self._paires(q, borne)
+        # Au moins k points par requête sous la borne : on garde les k premiers de chaque groupe
+        debut_groupe = np.searchsorted(requete, np.arange(len(q)))
+        garde = np.arange(len(requete)) - debut_groupe[requete] < k
+        return point[garde].reshape(len(q), k), _km(d2[garde]).reshape(len(q), k)
+
+
+@memoiser(taille_max=2, ttl=None, depend_de=('prefectures',))
+def index_prefectures():
+    """Index des chefs-lieux de préfecture (ordre de referentiel.PREFECTURES)."""
+    return Index(referentiel.PREFECTURES['lat'], referentiel.PREFECTURES['lon'])
+
+
+@memoiser(taille_max=2, ttl=None, depend_de=('communes',))
+def index_communes():
+    """Index des communes de l'entrepôt (ordre de referentiel.COMMUNES ; vide sans communes)."""
+    return Index(referentiel.COMMUNES['lat'], referentiel.COMMUNES['lon'])
+
+
+@memoiser(taille_max=2, ttl=None, depend_de=('prefectures',))
+def matrice_prefectures():
+    """Distances (km) préfecture × préfecture, en lecture seule."""
+    lat, lon = referentiel.PREFECTURES['lat'], referentiel.PREFECTURES['lon']
+    matrice = haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+    matrice.flags.writeable = False
+    return matrice
+
+
+def apparier(lat, lon, excedent, deficit, k=5):
+    """Transferts des unités excédentaires vers les unités déficitaires les plus proches.
+
+    `excedent`, `deficit` (N,) en T (positifs ou nuls). Chaque unité déficitaire regarde
+    ses k plus proches unités excédentaires ; les paires sont servies de la plus courte
+    à la plus longue, dans la limite des volumes restants. Renvoie (déficitaire,
+    excédentaire, distance km, volume T), dans l'ordre des distances.
+    """
+    excedent, deficit = np.array(excedent, dtype=float), np.array(deficit, dtype=float)
+    sources, besoins = np.flatnonzero(excedent > 0), np.flatnonzero(deficit > 0)
+    if not len(sources) or not len(besoins):
+        vide = np.zeros(0, dtype=np.int64)
+        return vide, vide, np.zeros(0), np.zeros(0)
+    lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+    proches, distances = Index(lat[sources], lon[sources]).voisins(lat[besoins], lon[besoins], k)
+    receveur = np.repeat(besoins, proches.shape[1])
+    donneur, distances = sources[proches.ravel()], distances.ravel()
+    tri = np.argsort(distances, kind='stable')
+    volumes = np.zeros(len(tri))
+    for rang in tri:
+        i, j = receveur[rang], donneur[rang]
+        volumes[rang] = min(deficit[i], excedent[j])
+        deficit[i] -= volumes[rang]
+        excedent[j] -= volumes[rang]
+    garde = tri[volumes[tri] > 0]
+    return receveur[garde], donneur[garde], distances[garde], volumes[garde]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index spatial : temps de construction et de requête.")
+    parser.add_argument("--points", type=int, default=5000, help="Points aléatoires indexés")
+    parser.add_argument("--requetes", type=int, default=34, help="Requêtes par lot")
+    parser.add_argument("--rayon", type=float, default=100.0, help="Rayon des requêtes (km)")
+    parser.add_argument("--k", type=int, default=5, help="Plus proches voisins")
+    parser.add_argument("--repetitions", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    # Emprise approximative de la Guinée
+    lat, lon = rng.uniform(7.2, 12.6, args.points), rng.uniform(-15.0, -7.7, args.points)
+    q_lat, q_lon = rng.uniform(7.2, 12.6, args.requetes), rng.uniform(-15.0, -7.7, args.requetes)
+    debut = time.perf_counter()
+    index = Index(lat, lon)
+    print(f"Construction : {(time.perf_counter() - debut) * 1000:.1f} ms ({args.points} points)")
+    for nom, requete in (("rayon", lambda: index.rayon(q_lat, q_lon, args.rayon)),
+                         ("voisins", lambda: index.voisins(q_lat, q_lon, args.k))):
+        requete()
+        debut = time.perf_counter()
+        for _ in range(args.repetitions):
+            requete()
+        duree = (time.perf_counter() - debut) / args.repetitions
+        print(f"{nom:<8} : {duree * 1000:.3f} ms par lot de {args.requetes} requêtes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""Rapport complet : filière × préfecture × année (2026–2040) pour chaque scénario, produit par blocs.
+
+Chaque ligne porte la trajectoire de production (onglet 1), la production ajustée au
+climat (onglet 2), le gain d'investissement (onglet 4) et les pertes post-récolte
+(onglet 5), avec les formules de moteur.py et la répartition par préfecture de
+l'onglet 1. Les lignes sont produites par un générateur, un bloc de scénarios à la
+fois, et écrites au fil de l'eau (batch.Ecrivain) : le rapport entier n'existe
+jamais sous forme de DataFrame.
+
+    python rapport.py -o rapport.parquet                          # grille nationale
+    python rapport.py -o rapport.csv --scenarios scenarios.csv    # scénarios de batch.py
+"""
+import argparse
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import grille
+import moteur
+import referentiel
+from batch import Ecrivain, codes_colonne, completer, lire_scenarios
+
+PLUIES = [-30.0, -15.0, 0.0, 15.0, 30.0]  # Variation de la pluie (%)
+CROISSANCES = [2.0, 4.0, 6.0, 8.0, 10.0]  # Croissance annuelle de la production (%)
+MESURES = ['production_tendance', 'rendement_climat', 'production_climat', 'gain_investissement',
+           'perte_tonnes', 'recupere_tonnes', 'dispo_reelle']
+
+
+def grille_nationale(budget=2500.0, taux_perte=30.0):
+    """Scénarios croisés sol × intensification × irrigation × pluie × croissance (450 scénarios)."""
+    grille = pd.MultiIndex.from_product(
+        [moteur.TYPES_SOL, moteur.NIVEAUX_INTRANTS, [False, True], PLUIES, CROISSANCES],
+        names=['sol', 'intrants', 'irrigation', 'pluie', 'tx_croissance']
+    ).to_frame(index=False)
+    grille['budget'] = float(budget)
+    grille['taux_perte'] = float(taux_perte)
+    return grille
+
+
+def nombre_scenarios():
+    """Taille de la grille nationale, sans la construire."""
+    return len(moteur.TYPES_SOL) * len(moteur.NIVEAUX_INTRANTS) * 2 * len(PLUIES) * len(CROISSANCES)
+
+
+def lignes_par_scenario(annee_fin=moteur.ANNEE_CIBLE):
+    return len(referentiel.filières_db) * len(referentiel.PREFECTURES['pref']) * (annee_fin - moteur.ANNEE_ACTUELLE + 1)
+
+
+def _lignes(scenarios, premier_id, annee_fin):
+    """Lignes (scénarios × filières × préfectures × années) d'un bloc de scénarios complétés."""
+    filieres = list(referentiel.filières_db)
+    colonnes = referentiel.colonnes_filieres(filieres)
+    prefectures = referentiel.PREFECTURES
+    annees = np.arange(moteur.ANNEE_ACTUELLE, annee_fin + 1)
+
+    # Répartition de l'onglet 1 : part de la préfecture = somme de ses mailles (grille.py)
+    g = grille.grille()
+    part_pref = np.stack([g.sommes_prefectures(f, 1.0) for f in filieres])  # (F, P), somme 1 par filière
+    base_pref = colonnes['prod'][:, None] * part_pref                   # (F, P)
+
+    tx = scenarios['tx_croissance'].to_numpy(dtype=float)
+    croissance = (1 + tx[:, None] / 100) ** (annees - moteur.ANNEE_ACTUELLE)  # (S, Y)
+    rendement = moteur.rendement_sol_climat(
+        scenarios['pluie'].to_numpy(dtype=float),
+        codes_colonne(scenarios['sol'], moteur.TYPES_SOL, 'sol'),
+        codes_colonne(scenarios['intrants'], moteur.NIVEAUX_INTRANTS, 'intrants'),
+        scenarios['irrigation'].to_numpy()
+    )                                                                   # (S,)
+
+    # Gain annuel si le budget du scénario est consacré à la filière, réparti comme la production
+    budget = scenarios['budget'].to_numpy(dtype=float)
+    s_sem = budget * scenarios['part_semences'].to_numpy(dtype=float)
+    s_eng = budget * scenarios['part_engrais'].to_numpy(dtype=float)
+    s_mac = np.maximum(0, budget - s_sem - s_eng)
+    gain = moteur.gain_investissement(s_sem[:, None], s_eng[:, None], s_mac[:, None], colonnes['coef_roi'])  # (S, F)
+
+    # Tableaux (S, F, P, Y) par diffusion, aplatis dans cet ordre
+    tendance = base_pref[None, :, :, None] * croissance[:, None, None, :]
+    climat = tendance * rendement[:, None, None, None]
+    gain_pref = np.broadcast_to((gain[:, :, None] * part_pref)[..., None], climat.shape)
+    gain_efficience = moteur.GAIN_EFFICIENCE[codes_colonne(scenarios['transfo'], moteur.NIVEAUX_TRANSFO, 'transfo')]
+    perte, recupere, dispo = moteur.pertes_post_recolte(
+        climat + gain_pref, scenarios['taux_perte'].to_numpy(dtype=float)[:, None, None, None],
+        gain_efficience[:, None, None, None]
+    )
+
+    i_s, i_f, i_p, i_y = (np.broadcast_to(i, climat.shape).ravel() for i in np.ix_(
+        np.arange(len(scenarios)), np.arange(len(filieres)), np.arange(len(prefectures['pref'])), np.arange(len(annees))))
+    df = scenarios.drop(columns=['filiere', 'scenario'], errors='ignore').iloc[i_s].reset_index(drop=True)
+    df.insert(0, 'scenario_id', premier_id + i_s)
+    df['filiere'] = pd.Categorical.from_codes(i_f, filieres)
+    df['region'] = pd.Categorical.from_codes(prefectures['region'][i_p], referentiel.REGIONS)
+    df['pref'] = pd.Categorical.from_codes(i_p, prefectures['pref'])
+    df['annee'] = annees[i_y]
+    df['production_tendance'] = tendance.ravel()
+    df['rendement_climat'] = rendement[i_s]
+    df['production_climat'] = climat.ravel()
+    df['gain_investissement'] = gain_pref.ravel()
+    df['perte_tonnes'], df['recupere_tonnes'], df['dispo_reelle'] = perte.ravel(), recupere.ravel(), dispo.ravel()
+    return df
+
+
+def blocs_rapport(scenarios, taille_bloc=200_000, annee_fin=moteur.ANNEE_CIBLE):
+    """Blocs successifs du rapport (DataFrames d'environ `taille_bloc` lignes, au moins un scénario).
+
+    `scenarios` : DataFrame ou itérable de DataFrames (blocs de batch.lire_scenarios) ;
+    les colonnes absentes prennent les valeurs par défaut de batch.COLONNES.
+    """
+    if isinstance(scenarios, pd.DataFrame):
+        scenarios = [scenarios]
+    par_bloc = max(1, taille_bloc // lignes_par_scenario(annee_fin))
+    premier_id = 0
+    for morceau in scenarios:
+        morceau = completer(morceau)
+        for debut in range(0, len(morceau), par_bloc):
+            yield _lignes(morceau.iloc[debut:debut + par_bloc], premier_id + debut, annee_fin)
+        premier_id += len(morceau)
+
+
+def ecrire_rapport(scenarios, sortie, format=None, taille_bloc=200_000, annee_fin=moteur.ANNEE_CIBLE):
+    """Écrit le rapport bloc par bloc (CSV ou Parquet) ; renvoie le bilan (lignes, durée)."""
+    debut = time.perf_counter()
+    lignes = 0
+    with Ecrivain(sortie, format) as ecrivain:
+        for bloc in blocs_rapport(scenarios, taille_bloc, annee_fin):
+            ecrivain.ecrire(bloc)
+            lignes += len(bloc)
+    duree = time.perf_counter() - debut
+    return {'lignes': lignes, 'duree_s': duree, 'debit': lignes / duree if duree else float('inf')}
+
+
+def fichier_rapport(scenarios, format="parquet", taille_bloc=200_000):
+    """Rapport écrit dans un fichier temporaire anonyme, rembobiné (pour st.download_button)."""
+    fichier = tempfile.TemporaryFile()
+    ecrire_rapport(scenarios, fichier, format, taille_bloc)
+    fichier.seek(0)
+    return fichier
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rapport complet filière × préfecture × année, par blocs.")
+    parser.add_argument("-o", "--sortie", required=True, help="Fichier de sortie (.csv ou .parquet)")
+    parser.add_argument("--scenarios", help="Scénarios (.csv ou .jsonl, colonnes de batch.py) ; défaut : grille nationale")
+    parser.add_argument("-b", "--taille-bloc", type=int, default=200_000, help="Lignes par bloc (environ)")
+    parser.add_argument("--annee-fin", type=int, default=moteur.ANNEE_CIBLE)
+    args = parser.parse_args(argv)
+    referentiel.synchroniser()
+
+    scenarios = lire_scenarios(args.scenarios) if args.scenarios else grille_nationale()
+    bilan = ecrire_rapport(scenarios, args.sortie, taille_bloc=args.taille_bloc, annee_fin=args.annee_fin)
+    print(f"{bilan['lignes']:,} lignes en {bilan['duree_s']:.2f} s ({bilan['debit']:,.0f} lignes/s) -> {args.sortie}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
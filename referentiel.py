@@ -0,0 +1,350 @@
+"""Référentiel UPDIA : données de base des filières (PNIASAN), sans dépendance Streamlit.
+
+Les tables ci-dessous forment le référentiel intégré ; un entrepôt sur disque
+(entrepot.py, section 6) peut les remplacer et être rechargé à chaud.
+"""
+import threading
+from pathlib import Path
+from types import MappingProxyType
+
+import numpy as np
+
+import cache
+import entrepot
+import moteur
+from moteur import ANNEE_ACTUELLE
+
+# --- 1. BASE DE DONNÉES MULTI-FILIÈRES (PNIASAN) ---
+# Note : 'seuil_fao' permet à l'onglet 3 de fonctionner aussi en mode "Tout"
+# 'prix_import' : prix indicatif d'une tonne importée (USD, hypothèse), pour l'économie de devises
+filières_db = {
+    'Riz': {'prod': 2250000, 'obj_2040': 5000000, 'ratio_besoin': 1.6, 'coef_roi': 850, 'seuil_fao': 100, 'prix_import': 550},
+    'Maïs': {'prod': 850000, 'obj_2040': 2000000, 'ratio_besoin': 1.4, 'coef_roi': 650, 'seuil_fao': 55, 'prix_import': 300},
+    'Fonio': {'prod': 550000, 'obj_2040': 1300000, 'ratio_besoin': 1.2, 'coef_roi': 450, 'seuil_fao': 40, 'prix_import': 700},
+    'Cassave': {'prod': 1200000, 'obj_2040': 3000000, 'ratio_besoin': 1.3, 'coef_roi': 550, 'seuil_fao': 80, 'prix_import': 350}
+}
+
+options_culture = ["Tout"] + list(filières_db.keys())
+
+# --- 2. NORMES TECHNIQUES (Besoins par hectare, en kg) ---
+normes = {
+    'Riz': {'semences': 60, 'engrais': 200, 'label': 'Riziculture intensive'},
+    'Fonio': {'semences': 25, 'engrais': 50, 'label': 'Culture résiliente'},
+    'Maïs': {'semences': 20, 'engrais': 250, 'label': 'Exigence azotée'},
+    'Cassave': {'semences': 1000, 'engrais': 100, 'label': 'Boutures'}
+}
+norme_standard = {'semences': 30, 'engrais': 150, 'label': 'Standard'}
+
+# --- 3. POTENTIELS RÉGIONAUX (Cohérence entre barres, synthèse et carte) ---
+potentiels_regionaux = {
+    'Riz': {'Boké': 0.12, 'Kindia': 0.15, 'Mamou': 0.08, 'Faranah': 0.15, 'Kankan': 0.25, 'Labé': 0.10, "N'Zérékoré": 0.14, 'Conakry': 0.01},
+    'Maïs': {'Boké': 0.10, 'Kindia': 0.12, 'Mamou': 0.15, 'Faranah': 0.20, 'Kankan': 0.18, 'Labé': 0.10, "N'Zérékoré": 0.14, 'Conakry': 0.01},
+    'Fonio': {'Boké': 0.05, 'Kindia': 0.08, 'Mamou': 0.20, 'Faranah': 0.15, 'Kankan': 0.12, 'Labé': 0.30, "N'Zérékoré": 0.09, 'Conakry': 0.01},
+    'Cassave': {'Boké': 0.15, 'Kindia': 0.18, 'Mamou': 0.05, 'Faranah': 0.10, 'Kankan': 0.08, 'Labé': 0.07, "N'Zérékoré": 0.35, 'Conakry': 0.02},
+    'Tout': {'Boké': 0.12, 'Kindia': 0.14, 'Mamou': 0.10, 'Faranah': 0.15, 'Kankan': 0.20, 'Labé': 0.12, "N'Zérékoré": 0.16, 'Conakry': 0.01}
+}
+
+# --- 4. SPÉCIALISATION RÉGIONALE (33 Préfectures) ---
+prefectures_base = [
+    # Basse Guinée
+    {'Region': 'Boké', 'Pref': 'Boké', 'lat': 11.05, 'lon': -14.28},
+    {'Region': 'Boké', 'Pref': 'Boffa', 'lat': 10.17, 'lon': -14.03},
+    {'Region': 'Boké', 'Pref': 'Fria', 'lat': 10.45, 'lon': -13.58},
+    {'Region': 'Boké', 'Pref': 'Gaoual', 'lat': 11.75, 'lon': -13.20},
+    {'Region': 'Boké', 'Pref': 'Koundara', 'lat': 12.48, 'lon': -13.30},
+    {'Region': 'Kindia', 'Pref': 'Kindia', 'lat': 10.05, 'lon': -12.85},
+    {'Region': 'Kindia', 'Pref': 'Coyah', 'lat': 9.70, 'lon': -13.38},
+    {'Region': 'Kindia', 'Pref': 'Dubréka', 'lat': 9.78, 'lon': -13.52},
+    {'Region': 'Kindia', 'Pref': 'Forécariah', 'lat': 9.43, 'lon': -13.08},
+    {'Region': 'Kindia', 'Pref': 'Télimélé', 'lat': 10.90, 'lon': -13.03},
+    # Moyenne Guinée
+    {'Region': 'Mamou', 'Pref': 'Mamou', 'lat': 10.38, 'lon': -12.08},
+    {'Region': 'Mamou', 'Pref': 'Dalaba', 'lat': 10.68, 'lon': -12.25},
+    {'Region': 'Mamou', 'Pref': 'Pita', 'lat': 11.05, 'lon': -12.40},
+    {'Region': 'Labé', 'Pref': 'Labé', 'lat': 11.32, 'lon': -12.28},
+    {'Region': 'Labé', 'Pref': 'Koubia', 'lat': 11.58, 'lon': -11.89},
+    {'Region': 'Labé', 'Pref': 'Lélouma', 'lat': 11.42, 'lon': -12.51},
+    {'Region': 'Labé', 'Pref': 'Mali', 'lat': 12.08, 'lon': -12.29},
+    {'Region': 'Labé', 'Pref': 'Tougué', 'lat': 11.44, 'lon': -11.66},
+    # Haute Guinée
+    {'Region': 'Faranah', 'Pref': 'Faranah', 'lat': 10.03, 'lon': -10.74},
+    {'Region': 'Faranah', 'Pref': 'Dabola', 'lat': 10.74, 'lon': -11.11},
+    {'Region': 'Faranah', 'Pref': 'Dinguiraye', 'lat': 11.48, 'lon': -10.71},
+    {'Region': 'Faranah', 'Pref': 'Kissidougou', 'lat': 9.18, 'lon': -10.11},
+    {'Region': 'Kankan', 'Pref': 'Kankan', 'lat': 10.38, 'lon': -9.30},
+    {'Region': 'Kankan', 'Pref': 'Kérouané', 'lat': 9.26, 'lon': -9.01},
+    {'Region': 'Kankan', 'Pref': 'Kouroussa', 'lat': 10.65, 'lon': -9.88},
+    {'Region': 'Kankan', 'Pref': 'Siguiri', 'lat': 11.42, 'lon': -9.17},
+    {'Region': 'Kankan', 'Pref': 'Mandiana', 'lat': 10.63, 'lon': -8.68},
+    # Guinée Forestière
+    {'Region': 'N\'Zérékoré', 'Pref': 'N\'Zérékoré', 'lat': 7.75, 'lon': -8.82},
+    {'Region': 'N\'Zérékoré', 'Pref': 'Beyla', 'lat': 8.68, 'lon': -8.63},
+    {'Region': 'N\'Zérékoré', 'Pref': 'Guéckédou', 'lat': 8.57, 'lon': -10.13},
+    {'Region': 'N\'Zérékoré', 'Pref': 'Lola', 'lat': 7.80, 'lon': -8.53},
+    {'Region': 'N\'Zérékoré', 'Pref': 'Macenta', 'lat': 8.54, 'lon': -9.47},
+    {'Region': 'N\'Zérékoré', 'Pref': 'Yomou', 'lat': 7.56, 'lon': -9.26},
+    # Zone Spéciale
+    {'Region': 'Conakry', 'Pref': 'Conakry', 'lat': 9.53, 'lon': -13.67}
+]
+# Communes (sous-préfectures) : aucune dans le référentiel intégré, fournies par l'entrepôt
+communes_base = []
+
+# Attribution des coefficients de poids par culture (Maïs et "Tout" : répartition par défaut)
+poids_par_culture = {
+    'Fonio': {'Labé': 0.12, 'Mamou': 0.09, 'Faranah': 0.05, 'Boké': 0.03, 'Kindia': 0.02, 'Kankan': 0.015, 'N\'Zérékoré': 0.01, 'Conakry': 0.005},
+    'Riz': {'Kankan': 0.08, 'Boké': 0.05, 'Kindia': 0.04, 'N\'Zérékoré': 0.04, 'Faranah': 0.03, 'Labé': 0.01, 'Mamou': 0.01, 'Conakry': 0.005},
+    'Cassave': {'N\'Zérékoré': 0.09, 'Kindia': 0.07, 'Boké': 0.06, 'Faranah': 0.04, 'Kankan': 0.02, 'Labé': 0.015, 'Mamou': 0.01, 'Conakry': 0.005}
+}
+poids_defaut = {'Faranah': 0.07, 'Kankan': 0.06, 'N\'Zérékoré': 0.05, 'Kindia': 0.04, 'Boké': 0.03, 'Labé': 0.02, 'Mamou': 0.02, 'Conakry': 0.005}
+
+
+def poids_map(culture):
+    """Poids régionaux utilisés pour répartir la production entre préfectures."""
+    return poids_par_culture.get(culture, poids_defaut)
+
+
+# --- 5. STRUCTURES COLONNAIRES PARTAGÉES (lecture seule) ---
+# Construites une fois par version du référentiel et partagées par toutes les sessions :
+# tableaux NumPy non modifiables, régions codées en entiers (uint8) plutôt que listes de dicts.
+# Un rechargement de l'entrepôt (section 6) remplace ces objets sans les modifier en place :
+# les modules clients les lisent donc au moment de l'appel (referentiel.PREFECTURES).
+
+def _lecture_seule(valeurs, dtype=None):
+    tableau = np.array(valeurs, dtype=dtype)
+    tableau.flags.writeable = False
+    return tableau
+
+
+def _profil(culture, filieres):
+    if culture == "Tout":
+        # On additionne les volumes et on fait la moyenne des indicateurs de rendement/besoin
+        return {
+            'prod': sum(f['prod'] for f in filieres.values()),
+            'obj_2040': sum(f['obj_2040'] for f in filieres.values()),
+            'ratio_besoin': np.mean([f['ratio_besoin'] for f in filieres.values()]),
+            'coef_roi': np.mean([f['coef_roi'] for f in filieres.values()]),
+            'seuil_fao': np.mean([f['seuil_fao'] for f in filieres.values()]),
+            'prix_import': np.mean([f['prix_import'] for f in filieres.values()])
+        }
+    return filieres[culture]
+
+
+def _appliquer(filieres, potentiels, prefectures, poids_culture, poids_def, communes):
+    """Construit les structures dérivées des tables sources, puis les publie toutes ensemble."""
+    global filières_db, potentiels_regionaux, prefectures_base, poids_par_culture, poids_defaut, communes_base
+    global options_culture, REGIONS, PREFECTURES, COMMUNES, POTENTIELS, POIDS_REGIONAUX, FILIERES
+    global _INDEX_CULTURE, _PROFILS
+
+    options = ["Tout"] + list(filieres)
+    regions = tuple(potentiels['Tout'])
+    index_pref = {p['Pref']: i for i, p in enumerate(prefectures)}
+    profils = {c: MappingProxyType(dict(_profil(c, filieres))) for c in options}
+
+    # Communes (facultatives) : préfecture codée par son rang, parts ramenées à 1 par préfecture
+    pref_communes = np.array([index_pref[c['Pref']] for c in communes], dtype=np.uint16)
+    parts = np.array([c['part'] for c in communes], dtype=float)
+    total = np.bincount(pref_communes, weights=parts, minlength=len(prefectures))[pref_communes]
+    communes_col = MappingProxyType({
+        'commune': _lecture_seule([c['Commune'] for c in communes], str),
+        'pref': _lecture_seule(pref_communes),
+        'lat': _lecture_seule([c['lat'] for c in communes], float),
+        'lon': _lecture_seule([c['lon'] for c in communes], float),
+        'part': _lecture_seule(np.divide(parts, total, out=np.zeros_like(parts), where=total > 0)),
+    })
+
+    prefectures_col = MappingProxyType({
+        'pref': _lecture_seule([p['Pref'] for p in prefectures]),
+        'region': _lecture_seule([regions.index(p['Region']) for p in prefectures], np.uint8),
+        'lat': _lecture_seule([p['lat'] for p in prefectures]),
+        'lon': _lecture_seule([p['lon'] for p in prefectures]),
+    })
+    # (filières, régions), lignes dans l'ordre de options_culture
+    potentiels_col = _lecture_seule([[potentiels[c][r] for r in regions] for c in options])
+    poids_col = _lecture_seule([[poids_culture.get(c, poids_def).get(r, 0.01) for r in regions] for c in options])
+    filieres_col = MappingProxyType({
+        champ: _lecture_seule([float(profils[c][champ]) for c in options])
+        for champ in ('prod', 'obj_2040', 'ratio_besoin', 'coef_roi', 'seuil_fao', 'prix_import')
+    })
+
+    filières_db, potentiels_regionaux, prefectures_base = filieres, potentiels, prefectures
+    poids_par_culture, poids_defaut, communes_base = poids_culture, poids_def, communes
+    options_culture, REGIONS, _INDEX_CULTURE, _PROFILS = options, regions, {c: i for i, c in enumerate(options)}, profils
+    PREFECTURES, COMMUNES, POTENTIELS, POIDS_REGIONAUX, FILIERES = (
+        prefectures_col, communes_col, potentiels_col, poids_col, filieres_col)
+
+
+_INTEGRE = (filières_db, potentiels_regionaux, prefectures_base, poids_par_culture, poids_defaut, communes_base)
+_appliquer(*_INTEGRE)
+
+
+def indice_culture(culture):
+    """Ligne d'une filière (ou de "Tout") dans POTENTIELS, POIDS_REGIONAUX et FILIERES."""
+    return _INDEX_CULTURE[culture]
+
+
+def profil_filiere(culture):
+    """Renvoie l'enregistrement (lecture seule) d'une filière, ou l'agrégat national pour "Tout"."""
+    return _PROFILS[culture]
+
+
+def colonnes_filieres(cultures=None):
+    """Colonnes NumPy (une valeur par filière, lecture seule) pour les évaluations en grille."""
+    if cultures is None:
+        return FILIERES
+    lignes = [_INDEX_CULTURE[c] for c in cultures]
+    return {champ: _lecture_seule(colonne[lignes]) for champ, colonne in FILIERES.items()}
+
+
+def poids_prefectures(cultures):
+    """Poids (filières × préfectures) de la répartition de l'onglet 1, préfecture par préfecture."""
+    return POIDS_REGIONAUX[[_INDEX_CULTURE[c] for c in cultures]][:, PREFECTURES['region']]
+
+
+# --- 6. ENTREPÔT SUR DISQUE ET RECHARGEMENT À CHAUD (entrepot.py) ---
+# Sans dossier d'entrepôt (ou sans pyarrow), le référentiel intégré ci-dessus s'applique.
+# La dernière calibration (calibration.py) remplace ensuite les champs calibrés des filières
+# et la sensibilité des sols au déficit de pluie (moteur.SENSIBILITE_SOL).
+VERSION = 0  # Incrémentée à chaque rechargement
+SOURCE = "intégré"  # Ou chemin du dossier de l'entrepôt
+CALIBRATION = None  # Nom du fichier de calibration appliqué (calibration.py), None sans calibration
+_ENTREPOT = None
+_BASE = _INTEGRE  # Tables sources avant calibration (intégrées ou lues dans l'entrepôt)
+_CALIBRATION = (None, None)  # (signature du fichier, contenu) de la calibration appliquée
+_VERROU = threading.Lock()
+
+
+def _sources(depot):
+    """Tables de l'entrepôt → tables sources des sections 1 à 4, vérifiées."""
+    import pandas as pd  # Chargé avec l'entrepôt seulement (voir entrepot.PARQUET)
+
+    df = depot.table('filieres')
+    # Dernière année renseignée de chaque filière, dans l'ordre d'apparition du fichier
+    derniere = df.sort_values('annee', kind='stable').drop_duplicates('filiere', keep='last').set_index('filiere')
+    filieres = derniere.loc[pd.unique(df['filiere']), list(entrepot.CHAMPS_FILIERE)].to_dict('index')
+
+    potentiels = {c: dict(zip(g['region'].tolist(), g['part'].tolist()))
+                  for c, g in depot.table('potentiels').groupby('culture', sort=False)}
+    if 'Tout' not in potentiels:
+        raise ValueError("potentiels : la culture 'Tout' (répartition nationale) est obligatoire")
+    regions = list(potentiels['Tout'])
+    for culture in filieres:
+        absentes = set(regions) - set(potentiels.get(culture, {}))
+        if absentes:
+            raise ValueError(f"potentiels : {culture} sans valeur pour {', '.join(sorted(absentes))}")
+
+    poids = {c: dict(zip(g['region'].tolist(), g['poids'].tolist()))
+             for c, g in depot.table('poids').groupby('culture', sort=False)}
+    poids_def = poids.pop('*', poids_defaut)
+
+    df = depot.table('prefectures')
+    inconnues = set(df['region']) - set(regions)
+    if inconnues:
+        raise ValueError(f"prefectures : régions inconnues {', '.join(sorted(inconnues))}")
+    prefectures = [{'Region': r, 'Pref': p, 'lat': la, 'lon': lo}
+                   for r, p, la, lo in zip(df['region'], df['pref'], df['lat'].tolist(), df['lon'].tolist())]
+
+    df = depot.table('communes')
+    inconnues = set(df['pref']) - {p['Pref'] for p in prefectures}
+    if inconnues:
+        raise ValueError(f"communes : préfectures inconnues {', '.join(sorted(inconnues))}")
+    communes = [{'Region': r, 'Pref': p, 'Commune': c, 'lat': la, 'lon': lo, 'part': pa}
+                for r, p, c, la, lo, pa in zip(df['region'], df['pref'], df['commune'], df['lat'].tolist(),
+                                               df['lon'].tolist(), df['part'].tolist())]
+    return filieres, potentiels, prefectures, poids, poids_def, communes
+
+
+def synchroniser(dossier=None):
+    """Recharge le référentiel si l'entrepôt ou la calibration ont changé ; renvoie les tables relues (vide sinon).
+
+    Seules les partitions dont le fichier a changé sont relues ; les structures de la
+    section 5 sont reconstruites et seuls les caches dépendant des tables relues sont vidés.
+    En cas d'erreur (fichier invalide ou en cours d'écriture), le référentiel en place est
+    conservé et la relecture complète est retentée à l'appel suivant.
+    """
+    global VERSION, SOURCE, _ENTREPOT, _BASE
+    dossier = Path(dossier) if dossier else entrepot.dossier_defaut()
+    with _VERROU:
+        tables = set()
+        if not dossier.is_dir() or not entrepot.PARQUET:
+            if _ENTREPOT is not None:
+                _ENTREPOT, SOURCE, _BASE = None, "intégré", _INTEGRE
+                tables = set(entrepot.COLONNES)
+        else:
+            if _ENTREPOT is None or _ENTREPOT.dossier != dossier:
+                _ENTREPOT = entrepot.Entrepot(dossier)
+            try:
+                tables = _ENTREPOT.synchroniser()
+                if tables:
+                    _BASE = _sources(_ENTREPOT)
+            except (OSError, ValueError, KeyError):
+                _ENTREPOT = None
+                raise
+            SOURCE = str(dossier)
+        try:
+            tables |= _recharger_calibration()
+        except (OSError, ValueError, KeyError):
+            _ENTREPOT = None  # Les tables déjà relues seront réappliquées avec la calibration
+            raise
+        if not tables:
+            return set()
+        _appliquer(*_calibre(_BASE))
+        # Publiée avec la version, sans modifier l'ancien tableau : un calcul en cours
+        # (tâche de fond, autre session) garde la sensibilité qu'il a lue
+        moteur.SENSIBILITE_SOL = _sensibilite_calibree()
+        VERSION += 1
+    cache.invalider(tables)
+    return tables
+
+
+def _recharger_calibration():
+    """Relit la dernière version de calibration.py si elle a changé ; renvoie les tables touchées."""
+    global _CALIBRATION, CALIBRATION
+    import calibration  # Chargé à la première synchronisation seulement
+
+    chemin = calibration.derniere(calibration.dossier_defaut())
+    signature = None
+    if chemin is not None:
+        etat = chemin.stat()
+        signature = (str(chemin), etat.st_mtime_ns, etat.st_size)
+    if signature == _CALIBRATION[0]:
+        return set()
+    _CALIBRATION = (signature, calibration.charger(chemin) if chemin is not None else None)
+    CALIBRATION = chemin.name if chemin is not None else None
+    return {'filieres', 'calibration'}
+
+
+def _sensibilite_calibree():
+    """Nouveau tableau (lecture seule) de sensibilité des sols au déficit de pluie."""
+    import calibration
+
+    climat = (_CALIBRATION[1] or {}).get('climat') or {}
+    return _lecture_seule(climat.get('sensibilite_sol', calibration.SENSIBILITE_INTEGREE), float)
+
+
+def _calibre(sources):
+    """Tables sources dont les champs calibrés des filières sont remplacés par la dernière calibration."""
+    contenu = _CALIBRATION[1]
+    if not contenu:
+        return sources
+    filieres = {f: {**champs, **contenu['filieres'].get(f, {})} for f, champs in sources[0].items()}
+    return (filieres, *sources[1:])
+
+
+def tables(integre=False):
+    """Référentiel en place (ou intégré) sous forme de tables, au format de l'entrepôt."""
+    import pandas as pd
+
+    filieres, potentiels, prefectures, poids_culture, poids_def, communes = _INTEGRE if integre else (
+        filières_db, potentiels_regionaux, prefectures_base, poids_par_culture, poids_defaut, communes_base)
+    return {
+        'filieres': pd.DataFrame([{'filiere': f, 'annee': ANNEE_ACTUELLE, **v} for f, v in filieres.items()]),
+        'potentiels': pd.DataFrame([{'culture': c, 'region': r, 'part': v}
+                                    for c, parts in potentiels.items() for r, v in parts.items()]),
+        'poids': pd.DataFrame([{'culture': c, 'region': r, 'poids': v}
+                               for c, table in [*poids_culture.items(), ('*', poids_def)] for r, v in table.items()]),
+        'prefectures': pd.DataFrame([{'region': p['Region'], 'pref': p['Pref'], 'lat': p['lat'], 'lon': p['lon']}
+                                     for p in prefectures]),
+        'communes': pd.DataFrame([{'region': c['Region'], 'pref': c['Pref'], 'commune': c['Commune'],
+                                   'lat': c['lat'], 'lon': c['lon'], 'part': c['part']} for c in communes],
+                                 columns=['region', 'pref', 'commune', 'lat', 'lon', 'part']),
+    }
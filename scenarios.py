@@ -0,0 +1,87 @@
+"""Scénarios d'investissement : jeux de paramètres des onglets 3, 4 et 5, évalués et comparés.
+
+Un scénario fixe les curseurs qui pilotent les trois onglets :
+- croissance annuelle de la production (onglet 3, %/an) ;
+- parts du budget allouées aux semences et aux engrais, le reste à la mécanisation (onglet 4) ;
+- taux de pertes post-récolte (%) et niveau de transformation (onglet 5).
+
+Le sélecteur de la barre latérale applique un scénario aux curseurs ; l'onglet de
+comparaison évalue plusieurs scénarios (prédéfinis, curseurs courants ou définis par
+l'utilisateur) et superpose leurs résultats. Chaque évaluation est mémoïsée sur ses
+paramètres : un scénario déjà évalué pour une filière et un budget est relu, pas recalculé.
+"""
+from types import MappingProxyType
+
+import numpy as np
+
+import cube
+import moteur
+import referentiel
+from cache import memoiser
+
+CHAMPS = ('tx_croissance', 'part_semences', 'part_engrais', 'taux_perte', 'transfo')
+
+# Stagnation : croissance sous la démographie (+2,5 %/an), budget surtout en machines, pas
+# d'effort sur les pertes. PNIASAN : cible intermédiaire du plan national. Vision 2040 :
+# croissance soutenue, intrants prioritaires, pertes ramenées à 12 % par l'industrie.
+PARAMETRES = MappingProxyType({
+    "Stagnation": MappingProxyType({
+        'tx_croissance': 2.0, 'part_semences': 0.2, 'part_engrais': 0.2,
+        'taux_perte': 35, 'transfo': moteur.NIVEAUX_TRANSFO[0],
+    }),
+    "PNIASAN (Modéré)": MappingProxyType({
+        'tx_croissance': 5.0, 'part_semences': 0.3, 'part_engrais': 0.4,
+        'taux_perte': 25, 'transfo': moteur.NIVEAUX_TRANSFO[1],
+    }),
+    "Vision 2040 (Ambitieux)": MappingProxyType({
+        'tx_croissance': 8.0, 'part_semences': 0.35, 'part_engrais': 0.45,
+        'taux_perte': 12, 'transfo': moteur.NIVEAUX_TRANSFO[2],
+    }),
+})
+
+
+def valider(parametres):
+    """Paramètres complets et cohérents (tuple dans l'ordre de CHAMPS), ou ValueError."""
+    manquants = set(CHAMPS) - set(parametres)
+    if manquants:
+        raise ValueError(f"Paramètres de scénario manquants : {', '.join(sorted(manquants))}")
+    p = {c: parametres[c] for c in CHAMPS}
+    if p['part_semences'] < 0 or p['part_engrais'] < 0 or p['part_semences'] + p['part_engrais'] > 1:
+        raise ValueError("Les parts semences et engrais doivent être positives et de somme au plus 1")
+    if p['transfo'] not in moteur.NIVEAUX_TRANSFO:
+        raise ValueError(f"Niveau de transformation inconnu : {p['transfo']}")
+    return tuple(p[c] for c in CHAMPS)
+
+
+def allocation(budget, part_semences, part_engrais):
+    """Montants (Mds GNF) Semences, Engrais, Machines, arrondis comme les curseurs de l'onglet 4."""
+    s_sem = int(budget * part_semences)
+    s_eng = min(int(budget * part_engrais), int(budget - s_sem))
+    return s_sem, s_eng, max(0, budget - s_sem - s_eng)
+
+
+@memoiser(taille_max=64, depend_de=('filieres',))
+def evaluer(culture, budget, annee_fin, tx_croissance, part_semences, part_engrais, taux_perte, transfo):
+    """Résultats d'un scénario pour une filière : chemins de l'onglet 3, ROI de l'onglet 4, pertes de l'onglet 5."""
+    d = referentiel.profil_filiere(culture)
+    annees = np.arange(moteur.ANNEE_ACTUELLE, annee_fin + 1)
+    production, besoin, dispo_hab = cube.chemins(culture, tx_croissance, len(annees))
+    _, annee_civile = moteur.annee_autosuffisance(d['ratio_besoin'], tx_croissance, annees[0])
+
+    s_sem, s_eng, s_mac = allocation(budget, part_semences, part_engrais)
+    gain = float(moteur.gain_investissement(s_sem, s_eng, s_mac, d.get('coef_roi', 500)))
+    economie_devises, rentabilite = map(float, moteur.impact_devises(gain, budget))
+
+    pertes, recupere, disponible = cube.pertes(culture, taux_perte, moteur.codes(transfo, moteur.NIVEAUX_TRANSFO))
+    return MappingProxyType({
+        'annees': annees, 'production': production, 'besoin': besoin, 'dispo_hab': dispo_hab,
+        'annee_autosuffisance': int(annee_civile) if np.isfinite(annee_civile) else None,
+        'allocation': (s_sem, s_eng, s_mac), 'gain_tonnes': gain,
+        'economie_devises': economie_devises, 'rentabilite': rentabilite,
+        'pertes': pertes, 'recupere': recupere, 'disponible': disponible,
+    })
+
+
+def comparer(culture, budget, annee_fin, scenarios):
+    """Évaluation de chaque scénario {nom: paramètres} ; {nom: résultats}, dans l'ordre donné."""
+    return {nom: evaluer(culture, budget, annee_fin, *valider(p)) for nom, p in scenarios.items()}
@@ -0,0 +1,245 @@
+"""Analyse de sensibilité globale des coefficients du moteur : indices de Sobol et criblage de Morris.
+
+Les coefficients fixés à la main dans moteur.py (facteurs de sol, multiplicateurs
+d'intensification, sensibilités à la sécheresse, bonus et protection de l'irrigation,
+poids des leviers Engrais/Machines, gains d'efficience) varient chacun dans
+±`amplitude` autour de leur valeur. La sortie étudiée est un résultat 2040 d'une
+filière, moyenné sur tous les terroirs (sols × intensification × irrigation × pluie
+de -30 % à +30 %) : production, ou disponible après pertes et récupération industrielle.
+
+- Sobol (estimateurs de Saltelli 2010 et Jansen) : indices de premier ordre S1 et
+  totaux ST, N·(k+2) évaluations, intervalles à 95 % par bootstrap ;
+- Morris : effets élémentaires sur r trajectoires d'une grille à 4 niveaux (μ*, σ),
+  r·(k+1) évaluations.
+
+Les matrices d'échantillonnage (hypercube unité) ne dépendent que de leur taille et
+de la graine : tirées une fois, gardées en cache en lecture seule, elles servent à
+toute filière, sortie ou amplitude. Le modèle est évalué par lots de paramètres, en
+une diffusion NumPy (paramètres × terroirs) par lot.
+
+    python sensibilite.py --n 65536              # ≈ 1,2 million d'évaluations
+    python sensibilite.py --methode morris --r 2000
+"""
+import argparse
+import functools
+import sys
+import time
+
+import numpy as np
+
+import moteur
+
+# (nom affiché, constante de moteur.py, indice dans la constante ou None pour un scalaire)
+PARAMETRES = (
+    [(f"f_sol · {s}", 'FACTEURS_SOL', i) for i, s in enumerate(moteur.TYPES_SOL)]
+    + [(f"boost · {n}", 'BOOST_INTRANTS', i) for i, n in enumerate(moteur.NIVEAUX_INTRANTS)]
+    + [(f"sens_sol · {s}", 'SENSIBILITE_SOL', i) for i, s in enumerate(moteur.TYPES_SOL)]
+    + [("Bonus irrigation", 'BONUS_IRRIGATION', None), ("Protection irrigation", 'PROTECTION_IRRIGATION', None)]
+    + [(f"Poids levier · {l}", 'POIDS_LEVIERS', i) for i, l in enumerate(moteur.LEVIERS) if i > 0]
+    + [(f"gain_efficience · {n}", 'GAIN_EFFICIENCE', i) for i, n in enumerate(moteur.NIVEAUX_TRANSFO)]
+)
+NOMS = [nom for nom, _, _ in PARAMETRES]
+# Colonnes de chaque constante dans la matrice des paramètres
+_COLONNES = {c: [j for j, (_, constante, _) in enumerate(PARAMETRES) if constante == c]
+             for c in dict.fromkeys(constante for _, constante, _ in PARAMETRES)}
+
+SORTIES = {
+    'production_2040': "Production 2040 (T)",
+    'disponible_2040': "Disponible 2040 après pertes et récupération (T)",
+}
+PLUIES = np.linspace(-30, 30, 5)
+
+
+def nominal():
+    """Valeurs actuelles des coefficients (vecteur de longueur k)."""
+    # Chaque constante est lue une fois : une calibration publiée entre deux lectures ne se mélange pas
+    constantes = {c: getattr(moteur, c) for c in _COLONNES}
+    return np.array([constantes[c] if i is None else constantes[c][i] for _, c, i in PARAMETRES], dtype=float)
+
+
+def bornes(amplitude=0.25):
+    """Bornes basse et haute de chaque coefficient : ±amplitude autour de la valeur actuelle."""
+    valeurs = nominal()
+    return valeurs * (1 - amplitude), valeurs * (1 + amplitude)
+
+
+@functools.lru_cache(maxsize=1)
+def _terroirs():
+    """Indices sol, intensification, irrigation et pluie de chaque terroir moyenné (3 × 3 × 2 × 5)."""
+    grille = np.meshgrid(np.arange(len(moteur.TYPES_SOL)), np.arange(len(moteur.NIVEAUX_INTRANTS)),
+                         [False, True], PLUIES, indexing='ij')
+    return tuple(g.ravel() for g in grille)
+
+
+def evaluer(theta, sortie='disponible_2040', base_prod=1_000_000.0, coef_roi=600.0, tx_croissance=6.0,
+            budget=2500.0, part_semences=0.3, part_engrais=0.4, taux_perte=30.0, taille_lot=4096):
+    """Résultat 2040 pour chaque ligne de `theta` (n × k, coefficients dans l'ordre de PARAMETRES)."""
+    if sortie not in SORTIES:
+        raise ValueError(f"Sortie inconnue : {sortie!r} (attendu : {', '.join(SORTIES)})")
+    theta = np.atleast_2d(np.asarray(theta, dtype=float))
+    sol, intrants, irrigation, pluie = _terroirs()
+    tendance = base_prod * (1 + tx_croissance / 100) ** (moteur.ANNEE_CIBLE - moteur.ANNEE_ACTUELLE)
+    s_sem, s_eng = budget * part_semences, budget * part_engrais
+    s_mac = max(0.0, budget - s_sem - s_eng)
+
+    resultat = np.empty(len(theta))
+    for debut in range(0, len(theta), taille_lot):
+        t = theta[debut:debut + taille_lot]
+        # (lot, terroirs) : une diffusion par lot
+        b_base = t[:, _COLONNES['BOOST_INTRANTS']][:, intrants] * t[:, _COLONNES['FACTEURS_SOL']][:, sol]
+        rendement = moteur.rendement_complet(
+            pluie, irrigation, b_base, t[:, _COLONNES['SENSIBILITE_SOL']][:, sol],
+            bonus=t[:, _COLONNES['BONUS_IRRIGATION']], protection=t[:, _COLONNES['PROTECTION_IRRIGATION']]
+        )
+        poids = np.column_stack([np.ones(len(t)), t[:, _COLONNES['POIDS_LEVIERS']]])
+        production = tendance * rendement.mean(axis=1) + moteur.gain_investissement(s_sem, s_eng, s_mac, coef_roi, poids)
+        if sortie == 'disponible_2040':
+            # Niveau de transformation équiprobable : la récupération est linéaire en gain_efficience
+            _, recupere, dispo = moteur.pertes_post_recolte(
+                production, taux_perte, t[:, _COLONNES['GAIN_EFFICIENCE']].mean(axis=1))
+            production = dispo + recupere
+        resultat[debut:debut + taille_lot] = production
+    return resultat
+
+
+# --- SOBOL ---
+
+@functools.lru_cache(maxsize=4)
+def matrices_sobol(n, k, graine=0):
+    """Matrices A et B (n × k, hypercube unité), en lecture seule et réutilisées d'un appel à l'autre."""
+    a, b = np.random.default_rng(graine).random((2, n, k))
+    a.flags.writeable = b.flags.writeable = False
+    return a, b
+
+
+def indices_sobol(f_a, f_b, f_ab):
+    """S1 (Saltelli 2010) et ST (Jansen) à partir de f(A), f(B) et f(AB_i) de forme (k, n).
+
+    Les sorties sont centrées sur leur moyenne : l'estimateur de S1 n'est sans biais que
+    si la moyenne est petite devant l'écart-type (ici elle en vaut plus de 10).
+    """
+    centre = np.mean(np.concatenate([f_a, f_b]))
+    f_a, f_b, f_ab = f_a - centre, f_b - centre, f_ab - centre
+    variance = np.var(np.concatenate([f_a, f_b]))
+    s1 = np.mean(f_b * (f_ab - f_a), axis=-1) / variance
+    st = 0.5 * np.mean((f_a - f_ab) ** 2, axis=-1) / variance
+    return s1, st
+
+
+def sobol(n=8192, amplitude=0.25, graine=0, n_bootstrap=100, suivi=None, **contexte):
+    """Indices de Sobol de chaque coefficient, avec intervalles à 95 % (bootstrap).
+
+    `suivi(fraction, partiel)` reçoit après chaque coefficient les indices déjà
+    estimés (NaN pour les suivants, sans intervalles) ; voir taches.py.
+    """
+    debut = time.perf_counter()
+    k = len(PARAMETRES)
+    bas, haut = bornes(amplitude)
+    u_a, u_b = matrices_sobol(n, k, graine)
+    a, b = bas + u_a * (haut - bas), bas + u_b * (haut - bas)
+    f_a, f_b = evaluer(a, **contexte), evaluer(b, **contexte)
+    f_ab = np.empty((k, n))
+    for i in range(k):
+        ab = a.copy()
+        ab[:, i] = b[:, i]
+        f_ab[i] = evaluer(ab, **contexte)
+        if suivi is not None:
+            s1, st = np.full(k, np.nan), np.full(k, np.nan)
+            s1[:i + 1], st[:i + 1] = indices_sobol(f_a, f_b, f_ab[:i + 1])
+            suivi((i + 1) / (k + 1), {'parametres': NOMS, 'S1': s1, 'ST': st,
+                                      'evaluations': n * (i + 3), 'duree_s': time.perf_counter() - debut})
+    s1, st = indices_sobol(f_a, f_b, f_ab)
+
+    rng = np.random.default_rng(graine + 1)
+    tirages = np.empty((n_bootstrap, 2, k))
+    for r in range(n_bootstrap):
+        idx = rng.integers(0, n, n)
+        tirages[r] = indices_sobol(f_a[idx], f_b[idx], f_ab[:, idx])
+    bas_ic, haut_ic = np.percentile(tirages, [2.5, 97.5], axis=0)
+    return {
+        'parametres': NOMS, 'S1': s1, 'ST': st,
+        'S1_ic': (bas_ic[0], haut_ic[0]), 'ST_ic': (bas_ic[1], haut_ic[1]),
+        'moyenne': float(np.mean(f_a)), 'ecart_type': float(np.std(f_a)),
+        'evaluations': n * (k + 2), 'duree_s': time.perf_counter() - debut,
+    }
+
+
+# --- MORRIS ---
+
+@functools.lru_cache(maxsize=4)
+def trajectoires_morris(r, k, niveaux=4, graine=0):
+    """Trajectoires de Morris dans l'hypercube unité, en lecture seule.
+
+    Renvoie les points (r, k+1, k), l'ordre des facteurs modifiés (r, k) et le signe
+    du pas de chaque facteur (r, k) ; pas Δ = niveaux / (2·(niveaux - 1)).
+    """
+    rng = np.random.default_rng(graine)
+    delta = niveaux / (2 * (niveaux - 1))
+    signe = rng.choice([-1.0, 1.0], (r, k))
+    # Départ sur la grille tel que x + Δ reste dans [0, 1] ; pas négatif : départ en x + Δ
+    depart = rng.integers(0, niveaux // 2, (r, k)) / (niveaux - 1) + delta * (signe < 0)
+    ordre = rng.permuted(np.tile(np.arange(k), (r, 1)), axis=1)
+    pas = np.zeros((r, k, k))
+    pas[np.arange(r)[:, None], np.arange(k), ordre] = delta * np.take_along_axis(signe, ordre, axis=1)
+    points = depart[:, None, :] + np.concatenate([np.zeros((r, 1, k)), np.cumsum(pas, axis=1)], axis=1)
+    for tableau in (points, ordre, signe):
+        tableau.flags.writeable = False
+    return points, ordre, signe
+
+
+def effets_elementaires(f, ordre, signe, delta):
+    """Effets élémentaires (r, k) à partir des sorties f (r, k+1) le long des trajectoires."""
+    r = len(f)
+    effets = np.empty(ordre.shape)
+    effets[np.arange(r)[:, None], ordre] = np.diff(f, axis=1) / (delta * np.take_along_axis(signe, ordre, axis=1))
+    return effets
+
+
+def morris(r=1000, niveaux=4, amplitude=0.25, graine=0, suivi=None, **contexte):
+    """Criblage de Morris : μ* (importance), μ (sens) et σ (non-linéarité, interactions).
+
+    Les effets sont exprimés pour une variation du coefficient sur toute sa plage.
+    Un seul appel vectorisé : `suivi` n'est appelé qu'avant et après l'évaluation.
+    """
+    debut = time.perf_counter()
+    k = len(PARAMETRES)
+    bas, haut = bornes(amplitude)
+    points, ordre, signe = trajectoires_morris(r, k, niveaux, graine)
+    if suivi is not None:
+        suivi(0.0)
+    f = evaluer((bas + points * (haut - bas)).reshape(-1, k), **contexte).reshape(r, k + 1)
+    effets = effets_elementaires(f, ordre, signe, niveaux / (2 * (niveaux - 1)))
+    return {
+        'parametres': NOMS, 'mu_etoile': np.abs(effets).mean(axis=0), 'mu': effets.mean(axis=0),
+        'sigma': effets.std(axis=0, ddof=1),
+        'evaluations': r * (k + 1), 'duree_s': time.perf_counter() - debut,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sensibilité globale des coefficients du moteur (Sobol, Morris).")
+    parser.add_argument("--methode", choices=["sobol", "morris"], default="sobol")
+    parser.add_argument("--sortie", choices=list(SORTIES), default='disponible_2040')
+    parser.add_argument("--n", type=int, default=8192, help="Échantillons de base (Sobol)")
+    parser.add_argument("--r", type=int, default=1000, help="Trajectoires (Morris)")
+    parser.add_argument("--amplitude", type=float, default=0.25, help="Variation relative des coefficients (défaut ±25 %%)")
+    args = parser.parse_args(argv)
+
+    if args.methode == "sobol":
+        res = sobol(args.n, args.amplitude, sortie=args.sortie)
+        ordre = np.argsort(-res['ST'])
+        print(f"{'Coefficient':<36} {'S1':>7} {'ST':>7}")
+        for i in ordre:
+            print(f"{NOMS[i]:<36} {res['S1'][i]:>7.3f} {res['ST'][i]:>7.3f}")
+    else:
+        res = morris(args.r, amplitude=args.amplitude, sortie=args.sortie)
+        ordre = np.argsort(-res['mu_etoile'])
+        print(f"{'Coefficient':<36} {'μ*':>12} {'σ':>12}")
+        for i in ordre:
+            print(f"{NOMS[i]:<36} {res['mu_etoile'][i]:>12,.0f} {res['sigma'][i]:>12,.0f}")
+    print(f"\n{res['evaluations']:,} évaluations en {res['duree_s']:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""Tâches de fond pour les simulations longues : progression, résultats partiels, annulation.
+
+Un exécuteur par processus (comme les caches de cache.py), partagé par toutes les
+sessions : les calculs lourds (Monte Carlo, sensibilité) tournent dans un pool de
+fils d'exécution, hors du fil du script Streamlit, qui se contente d'interroger leur
+état. NumPy relâche le GIL sur les gros tableaux : les fils avancent en parallèle.
+
+Une fonction de tâche reçoit un argument `suivi(progression, partiel=None, message=None)`
+qu'elle appelle régulièrement : il publie l'avancement (0 à 1) et un résultat partiel
+affichable, et lève `Annulee` si plus personne n'attend le résultat.
+
+Les tâches sont identifiées par le hachage de leurs entrées : des entrées déjà
+calculées renvoient la tâche terminée (cache des résultats, LRU), des entrées en
+cours de calcul dans une autre session rejoignent la même tâche. Chaque session tient
+ses emplacements (`suivre`) : quand les entrées d'un emplacement changent, la tâche
+précédente est libérée, et annulée si aucune autre session ne l'attend.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import _cle
+
+EN_ATTENTE, EN_COURS, TERMINEE, ANNULEE, ERREUR = "en attente", "en cours", "terminée", "annulée", "erreur"
+
+
+class Annulee(Exception):
+    """Levée dans la fonction de tâche (par `suivi`) quand son annulation est demandée."""
+
+
+class Tache:
+    """État d'une tâche, lu par les sessions pendant qu'un fil du pool l'exécute."""
+
+    def __init__(self, cle, nom):
+        self.cle = cle
+        self.id = hashlib.sha1(repr(cle).encode()).hexdigest()[:12]
+        self.nom = nom
+        self.etat = EN_ATTENTE
+        self.progression = 0.0
+        self.message = ""
+        self.partiel = None
+        self.resultat = None
+        self.erreur = None
+        self.debut = self.fin = None
+        self.abonnes = 0
+        self._annulation = threading.Event()
+        self._futur = None
+
+    @property
+    def terminee(self):
+        return self.etat in (TERMINEE, ANNULEE, ERREUR)
+
+    @property
+    def duree(self):
+        """Durée d'exécution (s), en cours ou finale."""
+        if self.debut is None:
+            return 0.0
+        return (self.fin or time.monotonic()) - self.debut
+
+    def avancer(self, progression, partiel=None, message=None):
+        """Appelé par la fonction de tâche : publie l'avancement ; lève Annulee si elle est annulée."""
+        if self._annulation.is_set():
+            raise Annulee
+        self.progression = min(1.0, max(0.0, float(progression)))
+        if partiel is not None:
+            self.partiel = partiel
+        if message is not None:
+            self.message = message
+
+
+class Executeur:
+    """Pool de fils d'exécution et registre des tâches, indexé par le hachage des entrées."""
+
+    def __init__(self, n_fils=None, taille_cache=32):
+        self.n_fils = n_fils or min(4, os.cpu_count() or 1)
+        self.taille_cache = taille_cache
+        self._pool = ThreadPoolExecutor(max_workers=self.n_fils, thread_name_prefix="tache")
+        self._taches = OrderedDict()  # cle -> Tache (en cours et terminées, LRU)
+        self._verrou = threading.Lock()
+        self.hits = self.lancees = self.annulees = 0
+
+    def soumettre(self, fonction, *args, contexte=(), **kwargs):
+        """Tâche de `fonction(*args, **kwargs)` : existante si ces entrées sont connues, sinon lancée.
+
+        `contexte` entre dans la clé sans être passé à la fonction (ex. version du référentiel).
+        Chaque appel compte un abonné, à rendre par `liberer`.
+        """
+        cle = (fonction.__module__, fonction.__qualname__, _cle(args), _cle(kwargs), _cle(contexte))
+        with self._verrou:
+            tache = self._taches.get(cle)
+            if tache is not None and tache.etat not in (ANNULEE, ERREUR) and not tache._annulation.is_set():
+                self._taches.move_to_end(cle)
+                tache.abonnes += 1
+                self.hits += 1
+                return tache
+            tache = Tache(cle, fonction.__qualname__)
+            tache.abonnes = 1
+            self._taches[cle] = tache
+            self.lancees += 1
+            self._purger()
+        tache._futur = self._pool.submit(self._executer, tache, fonction, args, kwargs)
+        return tache
+
+    def _purger(self):
+        # Seules les tâches finies sont évincées ; celles en cours restent suivies
+        finies = [c for c, t in self._taches.items() if t.terminee]
+        for cle in finies[:max(0, len(self._taches) - self.taille_cache)]:
+            del self._taches[cle]
+
+    def _executer(self, tache, fonction, args, kwargs):
+        if tache._annulation.is_set():
+            tache.etat = ANNULEE
+            return
+        tache.etat, tache.debut = EN_COURS, time.monotonic()
+        try:
+            tache.resultat = fonction(*args, suivi=tache.avancer, **kwargs)
+            tache.progression, tache.etat = 1.0, TERMINEE
+        except Annulee:
+            tache.etat = ANNULEE
+        except Exception as erreur:  # remontée à la session qui affiche la tâche
+            tache.erreur, tache.etat = erreur, ERREUR
+        finally:
+            tache.fin = time.monotonic()
+
+    def liberer(self, tache):
+        """Un abonné n'attend plus la tâche : elle est annulée si plus personne ne l'attend."""
+        with self._verrou:
+            tache.abonnes -= 1
+            if tache.abonnes <= 0 and not tache.terminee:
+                tache._annulation.set()
+                if tache._futur is not None and tache._futur.cancel():
+                    tache.etat = ANNULEE  # Jamais démarrée
+                self.annulees += 1
+
+    def statistiques(self):
+        with self._verrou:
+            etats = [t.etat for t in self._taches.values()]
+        return {
+            'fils': self.n_fils, 'en_cours': etats.count(EN_COURS), 'en_attente': etats.count(EN_ATTENTE),
+            'terminees': etats.count(TERMINEE), 'lancees': self.lancees, 'hits': self.hits,
+            'annulees': self.annulees,
+        }
+
+
+EXECUTEUR = Executeur()
+
+
+def suivre(emplacements, nom, fonction, *args, contexte=(), **kwargs):
+    """Tâche de l'emplacement `nom` d'une session (`emplacements` : dict propre à la session).
+
+    Mêmes entrées qu'au rerun précédent : la même tâche, quel que soit son état (une tâche
+    annulée par l'utilisateur n'est pas relancée d'elle-même). Entrées différentes : la
+    tâche précédente est libérée et la nouvelle soumise.
+    """
+    cle = (fonction.__module__, fonction.__qualname__, _cle(args), _cle(kwargs), _cle(contexte))
+    emplacement = emplacements.get(nom)  # [tâche, abonnement en cours]
+    if emplacement is not None and emplacement[0].cle == cle:
+        return emplacement[0]
+    abandonner(emplacements, nom)
+    tache = EXECUTEUR.soumettre(fonction, *args, contexte=contexte, **kwargs)
+    emplacements[nom] = [tache, True]
+    return tache
+
+
+def abandonner(emplacements, nom, oublier=False):
+    """Libère la tâche de l'emplacement (annulée si personne d'autre ne l'attend).
+
+    `oublier` vide l'emplacement : le prochain `suivre` relance le calcul.
+    """
+    emplacement = emplacements.get(nom)
+    if emplacement is not None and emplacement[1]:
+        EXECUTEUR.liberer(emplacement[0])
+        emplacement[1] = False
+    if oublier:
+        emplacements.pop(nom, None)